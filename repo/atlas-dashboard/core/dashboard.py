@@ -1,7 +1,8 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
 from dataclasses import dataclass
 import asyncpg
-import aiohttp
+from atlas_x402.rpc import RPCClient
+from atlas_x402.transport import HTTPTransport, get_default_transport
 
 @dataclass
 class BalanceData:
@@ -12,10 +13,16 @@ class AtlasDashboard:
     def __init__(
         self,
         db_connection_string: str,
-        rpc_urls: Dict[str, str]
+        rpc_urls: Dict[str, Union[str, List[str]]],
+        transport: Optional[HTTPTransport] = None
     ):
         self.db_connection_string = db_connection_string
         self.rpc_urls = rpc_urls
+        self.transport = transport or get_default_transport()
+        self.rpc = RPCClient(
+            {network: [urls] if isinstance(urls, str) else list(urls) for network, urls in rpc_urls.items()},
+            transport=self.transport,
+        )
         
     async def get_balances(
         self,
@@ -36,20 +43,10 @@ class AtlasDashboard:
         return balances
     
     async def _fetch_eth_balance(self, address: str) -> str:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.rpc_urls['base'],
-                json={
-                    'jsonrpc': '2.0',
-                    'method': 'eth_getBalance',
-                    'params': [address, 'latest'],
-                    'id': 1,
-                }
-            ) as response:
-                result = await response.json()
-                if result.get('result') and result['result'] != '0x':
-                    balance = int(result['result'], 16)
-                    return f"{balance / 1e18:.6f}"
+        result = await self.rpc.call('eth_getBalance', [address, 'latest'], network='base')
+        if result and result != '0x':
+            balance = int(result, 16)
+            return f"{balance / 1e18:.6f}"
         return '0.0'
     
     async def _fetch_base_usdc_balance(self, address: str) -> str:
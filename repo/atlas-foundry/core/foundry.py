@@ -1,5 +1,7 @@
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
+from atlas_x402.rpc import RPCClient, get_default_rpc_client
+from atlas_x402.transport import HTTPTransport, get_default_transport
 
 @dataclass
 class TokenParams:
@@ -21,8 +23,16 @@ class TokenResult:
     network: str
 
 class AtlasFoundry:
-    def __init__(self, facilitator_url: str):
+    def __init__(
+        self,
+        facilitator_url: str,
+        transport: Optional[HTTPTransport] = None,
+        rpc: Optional[RPCClient] = None
+    ):
         self.facilitator_url = facilitator_url
+        self.transport = transport or get_default_transport()
+        # One client per foundry, so endpoint health and latency carry over between deployments.
+        self.rpc = rpc or (RPCClient(transport=transport) if transport else get_default_rpc_client())
         self.evm_wallet = None
         self.solana_connection = None
         
@@ -41,7 +51,7 @@ class AtlasFoundry:
             'supply': params.supply,
             'owner': params.deployer_address,
             'wallet_client': self.evm_wallet,
-        })
+        }, rpc=self.rpc)
         
         mint_endpoint = f"/api/token/{deployment['contract_address']}/mint"
         
@@ -88,20 +98,18 @@ class AtlasFoundry:
         )
     
     async def _register_with_x402_scan(self, params: Dict[str, Any]):
-        import aiohttp
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.facilitator_url}/discovery/resources",
-                json={
-                    'name': params['endpoint'],
-                    'endpoint': params['endpoint'],
-                    'merchantAddress': params['merchant_address'],
-                    'network': params['network'],
-                    'price': params['price'],
-                    'category': 'Tokens',
-                }
-            ) as response:
-                response.raise_for_status()
+        async with self.transport.post(
+            f"{self.facilitator_url}/discovery/resources",
+            json={
+                'name': params['endpoint'],
+                'endpoint': params['endpoint'],
+                'merchantAddress': params['merchant_address'],
+                'network': params['network'],
+                'price': params['price'],
+                'category': 'Tokens',
+            }
+        ) as response:
+            response.raise_for_status()
 
 
 
@@ -1,29 +1,27 @@
-from typing import Dict, Any
-import aiohttp
+from typing import Dict, Any, Optional
+from atlas_x402.rpc import RPCClient, get_default_rpc_client
+from atlas_x402.transport import HTTPTransport
 
-async def deploy_erc20(params: Dict[str, Any]) -> Dict[str, Any]:
-    rpc_url = 'https://mainnet.base.org'
+async def deploy_erc20(
+    params: Dict[str, Any],
+    transport: Optional[HTTPTransport] = None,
+    rpc: Optional[RPCClient] = None
+) -> Dict[str, Any]:
+    rpc = rpc or (RPCClient(transport=transport) if transport else get_default_rpc_client())
+    tx_hash = await rpc.call(
+        'eth_sendTransaction',
+        [{
+            'from': params['owner'],
+            'data': encode_erc20_constructor(params),
+        }],
+        network='base',
+        hedge=False,
+    )
     
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            rpc_url,
-            json={
-                'jsonrpc': '2.0',
-                'method': 'eth_sendTransaction',
-                'params': [{
-                    'from': params['owner'],
-                    'data': encode_erc20_constructor(params),
-                }],
-                'id': 1,
-            }
-        ) as response:
-            result = await response.json()
-            tx_hash = result.get('result')
-            
-            return {
-                'contract_address': '0x...',
-                'tx_hash': tx_hash,
-            }
+    return {
+        'contract_address': '0x...',
+        'tx_hash': tx_hash,
+    }
 
 async def deploy_spl_token(params: Dict[str, Any]) -> Dict[str, Any]:
     from solana.rpc.api import Client
@@ -0,0 +1,171 @@
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple
+from dataclasses import dataclass
+import hashlib
+import json
+import sqlite3
+from .index import ServiceDiscovery, parse_service
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS services (
+    id TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    category TEXT NOT NULL,
+    network TEXT NOT NULL,
+    schemes TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS services_category ON services (category, network);
+CREATE INDEX IF NOT EXISTS services_network ON services (network);
+CREATE TABLE IF NOT EXISTS sync_state (
+    scope TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    cursor TEXT
+);
+'''
+
+def content_hash(resource: Dict[str, Any]) -> str:
+    encoded = json.dumps(resource, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+def scope_key(
+    category: Optional[str] = None,
+    network: Optional[str] = None,
+    scheme: Optional[str] = None
+) -> str:
+    return f'category={category or ""}&network={network or ""}&scheme={scheme or ""}'
+
+@dataclass
+class SyncState:
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    cursor: Optional[str] = None
+
+@dataclass
+class SyncResult:
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    not_modified: bool = False
+    incremental: bool = False
+
+    @property
+    def changed(self) -> int:
+        return self.added + self.updated + self.removed
+
+class ServiceCatalog:
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+
+    def get(self, service_id: str) -> Optional[ServiceDiscovery]:
+        row = self._db.execute('SELECT data FROM services WHERE id = ?', (service_id,)).fetchone()
+        return parse_service(json.loads(row[0])) if row else None
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        network: Optional[str] = None,
+        scheme: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+    ) -> List[ServiceDiscovery]:
+        where, args = _where(category, network, scheme)
+        sql = f'SELECT data FROM services{where} ORDER BY rowid LIMIT ? OFFSET ?'
+        rows = self._db.execute(sql, (*args, -1 if limit is None else limit, offset or 0))
+        return [parse_service(json.loads(data)) for data, in rows]
+
+    def hashes(
+        self,
+        category: Optional[str] = None,
+        network: Optional[str] = None,
+        scheme: Optional[str] = None
+    ) -> Dict[str, str]:
+        where, args = _where(category, network, scheme)
+        return dict(self._db.execute(f'SELECT id, hash FROM services{where}', args))
+
+    def upsert(self, resources: Iterable[Dict[str, Any]]) -> Tuple[int, int, int]:
+        added = updated = unchanged = 0
+        with self._db:
+            for resource in resources:
+                digest = content_hash(resource)
+                row = self._db.execute('SELECT hash FROM services WHERE id = ?', (resource['id'],)).fetchone()
+                if row is not None and row[0] == digest:
+                    unchanged += 1
+                    continue
+                schemes = ''.join(f",{accept.get('scheme', '')}," for accept in resource.get('accepts', []))
+                self._db.execute(
+                    'INSERT OR REPLACE INTO services (id, hash, category, network, schemes, data) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (
+                        resource['id'],
+                        digest,
+                        resource.get('category', ''),
+                        resource.get('network', 'base'),
+                        schemes,
+                        json.dumps(resource, separators=(',', ':')),
+                    ),
+                )
+                if row is None:
+                    added += 1
+                else:
+                    updated += 1
+        return added, updated, unchanged
+
+    def delete(self, service_ids: Iterable[str]) -> int:
+        with self._db:
+            cursor = self._db.executemany('DELETE FROM services WHERE id = ?', ((i,) for i in service_ids))
+        return cursor.rowcount
+
+    def get_state(self, scope: str) -> SyncState:
+        row = self._db.execute(
+            'SELECT etag, last_modified, cursor FROM sync_state WHERE scope = ?', (scope,)
+        ).fetchone()
+        return SyncState(*row) if row else SyncState()
+
+    def set_state(self, scope: str, state: SyncState):
+        with self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO sync_state (scope, etag, last_modified, cursor) VALUES (?, ?, ?, ?)',
+                (scope, state.etag, state.last_modified, state.cursor),
+            )
+
+    def clear(self):
+        with self._db:
+            self._db.execute('DELETE FROM services')
+            self._db.execute('DELETE FROM sync_state')
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM services').fetchone()[0]
+
+    def __contains__(self, service_id: str) -> bool:
+        return self._db.execute('SELECT 1 FROM services WHERE id = ?', (service_id,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[ServiceDiscovery]:
+        for data, in self._db.execute('SELECT data FROM services ORDER BY rowid'):
+            yield parse_service(json.loads(data))
+
+def _where(
+    category: Optional[str],
+    network: Optional[str],
+    scheme: Optional[str]
+) -> Tuple[str, List[Any]]:
+    clauses, args = [], []
+    if category:
+        clauses.append('category = ?')
+        args.append(category)
+    if network:
+        clauses.append('network = ?')
+        args.append(network)
+    if scheme:
+        clauses.append('instr(schemes, ?) > 0')
+        args.append(f',{scheme},')
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), args
@@ -0,0 +1,211 @@
+from typing import Optional, Dict, Any, List, Iterator, MutableMapping, Tuple
+from array import array
+import sys
+from .index import PaymentAccept, ServiceDiscovery
+
+_EMPTY = -1
+_DELETED = -2
+
+class _Symbols:
+    __slots__ = ('values', 'codes')
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+class _Text:
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('Q', [0])
+
+    def append(self, value: str):
+        self.data += value.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, row: int) -> str:
+        return self.data[self.offsets[row]:self.offsets[row + 1]].decode('utf-8')
+
+    def raw(self, row: int) -> bytes:
+        return bytes(self.data[self.offsets[row]:self.offsets[row + 1]])
+
+class CompactStore(MutableMapping[str, ServiceDiscovery]):
+    def __init__(self, compact_ratio: float = 1.0, min_garbage: int = 1_024):
+        self.compact_ratio = compact_ratio
+        self.min_garbage = min_garbage
+        self._reset()
+
+    def _reset(self):
+        # Rows are found through an open-addressing table of row numbers keyed by hash(id), so ids
+        # cost their UTF-8 bytes plus a few array slots instead of a dict entry and a str object.
+        self._table = array('q', [_EMPTY]) * 8
+        self._filled = 0
+        self._alive = bytearray()
+        self._count = 0
+        self._ids = _Text()
+        self._names = _Text()
+        self._descriptions = _Text()
+        self._endpoints = _Text()
+        self._categories = array('I')
+        self._networks = array('I')
+        self._accept_start = array('Q')
+        self._accept_count = array('I')
+        self._metadata: Dict[int, Dict[str, Any]] = {}
+        self._assets = array('I')
+        self._pay_tos = array('I')
+        self._accept_networks = array('I')
+        self._schemes = array('I')
+        self._mime_types = array('I')
+        self._amounts = array('Q')
+        self._raw_amounts: Dict[int, str] = {}
+        self._symbols = _Symbols()
+        self._garbage = 0
+
+    def __getitem__(self, service_id: str) -> ServiceDiscovery:
+        _, row = self._find(service_id)
+        if row < 0:
+            raise KeyError(service_id)
+        values = self._symbols.values
+        start = self._accept_start[row]
+        raw_amounts = self._raw_amounts
+        accepts = [
+            PaymentAccept(
+                asset=values[self._assets[i]],
+                pay_to=values[self._pay_tos[i]],
+                network=values[self._accept_networks[i]],
+                max_amount_required=raw_amounts[i] if i in raw_amounts else str(self._amounts[i]),
+                scheme=values[self._schemes[i]],
+                mime_type=values[self._mime_types[i]],
+            )
+            for i in range(start, start + self._accept_count[row])
+        ]
+        return ServiceDiscovery(
+            id=service_id,
+            name=self._names[row],
+            description=self._descriptions[row],
+            endpoint=self._endpoints[row],
+            category=values[self._categories[row]],
+            network=values[self._networks[row]],
+            accepts=accepts,
+            metadata=self._metadata.get(row),
+        )
+
+    def __setitem__(self, service_id: str, service: ServiceDiscovery):
+        slot, row = self._find(service_id)
+        if row >= 0:
+            self._discard(slot, row)
+        self._append(service_id, service)
+        self._maybe_compact()
+
+    def __delitem__(self, service_id: str):
+        slot, row = self._find(service_id)
+        if row < 0:
+            raise KeyError(service_id)
+        self._discard(slot, row)
+        self._maybe_compact()
+
+    def __iter__(self) -> Iterator[str]:
+        alive, ids = self._alive, self._ids
+        for row in range(len(alive)):
+            if alive[row]:
+                yield ids[row]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, service_id: object) -> bool:
+        return isinstance(service_id, str) and self._find(service_id)[1] >= 0
+
+    def clear(self):
+        self._reset()
+
+    def compact(self):
+        live = [(service_id, self[service_id]) for service_id in self]
+        self._reset()
+        for service_id, service in live:
+            self._append(service_id, service)
+
+    def _append(self, service_id: str, service: ServiceDiscovery):
+        code = self._symbols.code
+        row = len(self._categories)
+        if (self._filled + 1) * 3 > len(self._table) * 2:
+            self._resize()
+        slot, _ = self._find(service_id)
+        self._table[slot] = row
+        self._filled += 1
+        self._alive.append(1)
+        self._count += 1
+        self._ids.append(service_id)
+        self._names.append(service.name)
+        self._descriptions.append(service.description)
+        self._endpoints.append(service.endpoint)
+        self._categories.append(code(service.category))
+        self._networks.append(code(service.network))
+        self._accept_start.append(len(self._amounts))
+        self._accept_count.append(len(service.accepts))
+        if service.metadata is not None:
+            self._metadata[row] = service.metadata
+
+        for accept in service.accepts:
+            self._assets.append(code(accept.asset))
+            self._pay_tos.append(code(accept.pay_to))
+            self._accept_networks.append(code(accept.network))
+            self._schemes.append(code(accept.scheme))
+            self._mime_types.append(code(accept.mime_type))
+            amount = _amount(accept.max_amount_required)
+            if amount is None:
+                self._raw_amounts[len(self._amounts)] = accept.max_amount_required
+                amount = 0
+            self._amounts.append(amount)
+
+    def _find(self, service_id: str) -> Tuple[int, int]:
+        key = service_id.encode('utf-8')
+        table, ids = self._table, self._ids
+        mask = len(table) - 1
+        slot = hash(service_id) & mask
+        while True:
+            row = table[slot]
+            if row == _EMPTY:
+                return slot, -1
+            if row >= 0 and ids.raw(row) == key:
+                return slot, row
+            slot = (slot + 1) & mask
+
+    def _resize(self):
+        size = len(self._table)
+        while self._count * 3 >= size:
+            size *= 2
+        self._table = array('q', [_EMPTY]) * size
+        self._filled = 0
+        alive, ids = self._alive, self._ids
+        for row in range(len(alive)):
+            if alive[row]:
+                slot, _ = self._find(ids[row])
+                self._table[slot] = row
+                self._filled += 1
+
+    def _discard(self, slot: int, row: int):
+        self._table[slot] = _DELETED
+        self._alive[row] = 0
+        self._count -= 1
+        self._metadata.pop(row, None)
+        self._garbage += 1
+
+    def _maybe_compact(self):
+        if self._garbage >= self.min_garbage and self._garbage > self.compact_ratio * self._count:
+            self.compact()
+
+def _amount(value: str) -> Optional[int]:
+    # Amounts round-trip through the integer column only when they are canonical unsigned 64-bit integers.
+    if not isinstance(value, str) or not (value.isascii() and value.isdigit()) or (len(value) > 1 and value[0] == '0'):
+        return None
+    amount = int(value)
+    return amount if amount < 2 ** 64 else None
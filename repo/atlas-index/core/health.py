@@ -0,0 +1,214 @@
+from typing import Optional, Dict, Any, Iterable, Iterator, Callable, Deque
+from collections import deque
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+import asyncio
+import json
+import time
+import aiohttp
+from atlas_x402.transport import HTTPTransport
+from .index import AtlasIndex, ServiceDiscovery
+
+_REQUIRED_FIELDS = ('scheme', 'network', 'maxAmountRequired', 'payTo')
+
+@dataclass
+class EndpointHealth:
+    window: int = 20
+    checks: int = 0
+    failures: int = 0
+    status: Optional[int] = None
+    error: Optional[str] = None
+    checked_at: Optional[float] = None
+    latencies: Deque[float] = field(default_factory=deque)
+    outcomes: Deque[bool] = field(default_factory=deque)
+
+    def __post_init__(self):
+        self.latencies = deque(self.latencies, maxlen=self.window)
+        self.outcomes = deque(self.outcomes, maxlen=self.window)
+
+    def record(
+        self,
+        ok: bool,
+        latency: Optional[float],
+        status: Optional[int],
+        error: Optional[str],
+        checked_at: float
+    ):
+        self.checks += 1
+        if not ok:
+            self.failures += 1
+        if latency is not None:
+            self.latencies.append(latency)
+        self.outcomes.append(ok)
+        self.status = status
+        self.error = error
+        self.checked_at = checked_at
+
+    @property
+    def available(self) -> bool:
+        return bool(self.outcomes) and self.outcomes[-1]
+
+    @property
+    def availability(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.percentile(0.50)
+
+    @property
+    def p90(self) -> Optional[float]:
+        return self.percentile(0.90)
+
+    @property
+    def p99(self) -> Optional[float]:
+        return self.percentile(0.99)
+
+def challenge_error(status: int, body: bytes) -> Optional[str]:
+    if status != 402:
+        return f'Expected a 402 challenge, got {status}'
+    try:
+        challenge = json.loads(body)
+    except ValueError:
+        return 'Challenge body is not JSON'
+    accepts = challenge.get('accepts') if isinstance(challenge, dict) else None
+    if not isinstance(accepts, list) or not accepts:
+        return 'Challenge has no payment requirements'
+    if not any(isinstance(a, dict) and all(a.get(f) for f in _REQUIRED_FIELDS) for a in accepts):
+        return 'Challenge requirements are incomplete'
+    return None
+
+class HealthProber:
+    def __init__(
+        self,
+        index: AtlasIndex,
+        transport: Optional[HTTPTransport] = None,
+        concurrency: int = 32,
+        per_host: int = 2,
+        host_interval: float = 0.5,
+        timeout: float = 10.0,
+        interval: float = 300.0,
+        window: int = 20,
+        max_body: int = 65_536,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.index = index
+        self.transport = transport or index.transport
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.host_interval = host_interval
+        self.timeout = timeout
+        self.interval = interval
+        self.window = window
+        self.max_body = max_body
+        self.clock = clock
+        self._global: Optional[asyncio.Semaphore] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.rounds = 0
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def __aenter__(self) -> 'HealthProber':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def probe_all(self, services: Optional[Iterable[ServiceDiscovery]] = None) -> Dict[str, EndpointHealth]:
+        services = list(self.index.services.values() if services is None else services)
+        # A fixed pool of workers drains the round, so a large catalogue costs `concurrency` tasks
+        # rather than one per service. Hosts are interleaved so a worker pacing one host is rare.
+        pending = iter(_interleave_hosts(services))
+        results: Dict[str, EndpointHealth] = {}
+        
+        async def work():
+            for service in pending:
+                results[service.id] = await self.probe(service)
+        
+        await asyncio.gather(*[work() for _ in range(min(self.concurrency, len(services)))])
+        self.rounds += 1
+        return {service.id: results[service.id] for service in services}
+
+    async def probe(self, service: ServiceDiscovery) -> EndpointHealth:
+        health = self.index.health.get(service.id)
+        if health is None:
+            health = self.index.health[service.id] = EndpointHealth(window=self.window)
+
+        host = urlsplit(service.endpoint).netloc
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.concurrency)
+        slots = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host))
+
+        async with slots:
+            await self._pace(host)
+            async with self._global:
+                started = self.clock()
+                status = latency = None
+                try:
+                    async with self.transport.get(
+                        service.endpoint,
+                        timeout=aiohttp.ClientTimeout(total=self.timeout),
+                        allow_redirects=False,
+                    ) as response:
+                        status = response.status
+                        body = await response.content.read(self.max_body)
+                        latency = self.clock() - started
+                        error = challenge_error(status, body)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = str(e) or type(e).__name__
+
+        health.record(error is None, latency, status, error, time.time())
+        return health
+
+    async def _pace(self, host: str):
+        # Spread probes to one host at least host_interval apart, on top of the per-host concurrency cap.
+        now = self.clock()
+        start = max(now, self._next_start.get(host, now))
+        self._next_start[host] = start + self.host_interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        health = self.index.health.values()
+        return {
+            'rounds': self.rounds,
+            'services': len(self.index.health),
+            'available': sum(1 for h in health if h.available),
+        }
+
+def _interleave_hosts(services: Iterable[ServiceDiscovery]) -> Iterator[ServiceDiscovery]:
+    by_host: Dict[str, Deque[ServiceDiscovery]] = {}
+    for service in services:
+        by_host.setdefault(urlsplit(service.endpoint).netloc, deque()).append(service)
+    queues = list(by_host.values())
+    while queues:
+        for queue in queues:
+            yield queue.popleft()
+        queues = [queue for queue in queues if queue]
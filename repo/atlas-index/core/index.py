@@ -1,8 +1,17 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Callable, Deque, Mapping, MutableMapping, Set, Tuple, TYPE_CHECKING
+from collections import deque
 from dataclasses import dataclass
-import aiohttp
+import asyncio
+from atlas_x402.transport import HTTPTransport, get_default_transport
+from .query import ServiceIndex
+from .search import SearchIndex
+from .stream import iter_resources
 
-@dataclass
+if TYPE_CHECKING:
+    from .catalog import ServiceCatalog, SyncResult
+    from .health import EndpointHealth
+
+@dataclass(slots=True)
 class PaymentAccept:
     asset: str
     pay_to: str
@@ -11,7 +20,7 @@ class PaymentAccept:
     scheme: str
     mime_type: str
 
-@dataclass
+@dataclass(slots=True)
 class ServiceDiscovery:
     id: str
     name: str
@@ -23,9 +32,25 @@ class ServiceDiscovery:
     metadata: Optional[Dict[str, Any]] = None
 
 class AtlasIndex:
-    def __init__(self, facilitator_url: str):
+    def __init__(
+        self,
+        facilitator_url: str,
+        transport: Optional[HTTPTransport] = None,
+        catalog: Optional['ServiceCatalog'] = None,
+        compact: bool = False
+    ):
         self.facilitator_url = facilitator_url
-        self.services: Dict[str, ServiceDiscovery] = {}
+        self.transport = transport or get_default_transport()
+        self.catalog = catalog
+        if compact:
+            from .compact import CompactStore
+            self.services: MutableMapping[str, ServiceDiscovery] = CompactStore()
+        else:
+            self.services = {}
+        self.health: Dict[str, 'EndpointHealth'] = {}
+        self.index = ServiceIndex(self.services, self.health)
+        self.text: Optional[SearchIndex] = None
+        self._loaded = False
         
     async def discover(
         self,
@@ -35,51 +60,305 @@ class AtlasIndex:
         limit: Optional[int] = None,
         offset: Optional[int] = None
     ) -> List[ServiceDiscovery]:
+        return [service async for service in self.stream(category, network, scheme, limit, offset)]
+    
+    async def stream(
+        self,
+        category: Optional[str] = None,
+        network: Optional[str] = None,
+        scheme: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        chunk_size: Optional[int] = 2 ** 16,
+        store_batch: int = 500
+    ) -> AsyncIterator[ServiceDiscovery]:
         url = f"{self.facilitator_url}/discovery/resources"
-        params = {}
+        params = _discovery_params(category, network, scheme, limit, offset)
+        batch: List[Dict[str, Any]] = []
+        async with self.transport.get(url, params=params) as response:
+            if response.status != 200:
+                raise Exception(f"Discovery failed: {response.status}")
+            
+            try:
+                async for resource in iter_resources(response, chunk_size):
+                    if self.catalog is not None:
+                        batch.append(resource)
+                        if len(batch) >= store_batch:
+                            self._store(batch)
+                            batch = []
+                    yield self._add(parse_service(resource))
+            finally:
+                self._store(batch)
+    
+    async def discover_all(
+        self,
+        category: Optional[str] = None,
+        network: Optional[str] = None,
+        scheme: Optional[str] = None,
+        page_size: int = 100,
+        window: int = 4,
+        max_pages: Optional[int] = None
+    ) -> AsyncIterator[ServiceDiscovery]:
+        params = _discovery_params(category, network, scheme, None, None)
+        async for resources in self._pages(params, page_size, window, max_pages):
+            self._store(resources)
+            for resource in resources:
+                yield self._add(parse_service(resource))
+    
+    async def sync(
+        self,
+        category: Optional[str] = None,
+        network: Optional[str] = None,
+        scheme: Optional[str] = None,
+        page_size: int = 100,
+        window: int = 4
+    ) -> 'SyncResult':
+        from .catalog import SyncResult, SyncState, scope_key
+        
+        if self.catalog is None:
+            raise ValueError('sync requires a catalog')
+        
+        scope = scope_key(category, network, scheme)
+        state = self.catalog.get_state(scope)
+        result = SyncResult(incremental=state.cursor is not None)
+        
+        params = _discovery_params(category, network, scheme, None, None)
+        if state.cursor:
+            params['updated_since'] = state.cursor
+        headers = {}
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+        
+        status, response_headers, data = await self._request_page(dict(params, limit=page_size), headers)
+        if status == 304:
+            result.not_modified = True
+            return result
+        
+        first = data.get('resources', [])
+        known = None if result.incremental else self.catalog.hashes(category, network, scheme)
+        removed = []
+        validators: Set[Tuple[Optional[str], Optional[str]]] = set()
         
-        if category:
-            params['category'] = category
-        if network:
-            params['network'] = network
-        if scheme:
-            params['scheme'] = scheme
-        if limit:
-            params['limit'] = limit
-        if offset:
-            params['offset'] = offset
+        def record(headers: Mapping[str, str]):
+            validators.add((headers.get('ETag'), headers.get('Last-Modified')))
+        
+        record(response_headers)
+        
+        async def pages():
+            yield first
+            if len(first) >= page_size:
+                async for resources in self._pages(params, page_size, window, start=1, on_headers=record):
+                    yield resources
+        
+        async for resources in pages():
+            live = []
+            for resource in resources:
+                if known is not None:
+                    known.pop(resource['id'], None)
+                if result.incremental and resource.get('deleted'):
+                    removed.append(resource['id'])
+                else:
+                    live.append(resource)
             
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status != 200:
-                    raise Exception(f"Discovery failed: {response.status}")
-                
-                data = await response.json()
-                resources = data.get('resources', [])
+            added, updated, unchanged = self.catalog.upsert(live)
+            for resource in live:
+                if self._loaded or resource['id'] in self.services:
+                    self._add(parse_service(resource))
+            result.added += added
+            result.updated += updated
+            result.unchanged += unchanged
+        
+        if known:
+            removed.extend(known)
+        for service_id in removed:
+            self._evict(service_id)
+        result.removed = self.catalog.delete(removed)
+        
+        # Conditional requests only go to the first page, so its validator is kept only when every
+        # page carried the same one. A per-page validator would let a 304 hide changes further down.
+        etag, last_modified = validators.pop() if len(validators) == 1 else (None, None)
+        self.catalog.set_state(scope, SyncState(
+            etag=etag,
+            last_modified=last_modified,
+            cursor=data.get('cursor'),
+        ))
+        return result
+    
+    def load(self) -> int:
+        if self.catalog is not None and not self._loaded:
+            for service in self.catalog:
+                self._add(service)
+            self._loaded = True
+        return len(self.services)
+    
+    def query(
+        self,
+        category: Optional[str] = None,
+        network: Optional[str] = None,
+        scheme: Optional[str] = None,
+        asset: Optional[str] = None,
+        pay_to: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        max_latency: Optional[float] = None,
+        min_availability: Optional[float] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+    ) -> List[ServiceDiscovery]:
+        self.load()
+        return self.index.query(
+            category=category,
+            network=network,
+            scheme=scheme,
+            asset=asset,
+            pay_to=pay_to,
+            min_price=min_price,
+            max_price=max_price,
+            max_latency=max_latency,
+            min_availability=min_availability,
+            sort=sort,
+            limit=limit,
+            offset=offset,
+        )
+    
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = 10,
+        prefix: bool = True,
+        **filters: Any
+    ) -> List[ServiceDiscovery]:
+        self.load()
+        if self.text is None:
+            self.text = SearchIndex()
+            self.text.update(self.services.values())
+        
+        allowed = {service.id for service in self.query(**filters)} if filters else None
+        hits = self.text.search(query, limit=limit, prefix=prefix, allowed=allowed)
+        return [self.services[service_id] for service_id, _ in hits]
+    
+    async def _pages(
+        self,
+        params: Dict[str, Any],
+        page_size: int,
+        window: int,
+        max_pages: Optional[int] = None,
+        start: int = 0,
+        on_headers: Optional[Callable[[Mapping[str, str]], None]] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        pending: Deque[asyncio.Task] = deque()
+        next_page = start
+        
+        def prefetch():
+            nonlocal next_page
+            while len(pending) < window and (max_pages is None or next_page < max_pages):
+                page = dict(params, limit=page_size)
+                if next_page:
+                    page['offset'] = next_page * page_size
+                pending.append(asyncio.ensure_future(self._fetch_page(page, on_headers)))
+                next_page += 1
+        
+        prefetch()
+        try:
+            while pending:
+                resources = await pending.popleft()
+                if len(resources) >= page_size:
+                    prefetch()
+                else:
+                    for task in pending:
+                        task.cancel()
+                    pending.clear()
                 
-                services = []
-                for resource in resources:
-                    service = ServiceDiscovery(
-                        id=resource['id'],
-                        name=resource['name'],
-                        description=resource.get('description', ''),
-                        endpoint=resource['endpoint'],
-                        category=resource.get('category', ''),
-                        network=resource.get('network', 'base'),
-                        accepts=[
-                            PaymentAccept(**accept) for accept in resource.get('accepts', [])
-                        ],
-                        metadata=resource.get('metadata'),
-                    )
-                    services.append(service)
-                    self.services[service.id] = service
-                    
-                return services
+                yield resources
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def _fetch_page(
+        self,
+        params: Dict[str, Any],
+        on_headers: Optional[Callable[[Mapping[str, str]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        _, headers, data = await self._request_page(params)
+        if on_headers is not None:
+            on_headers(headers)
+        return data.get('resources', [])
+    
+    async def _request_page(
+        self,
+        params: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, Mapping[str, str], Optional[Dict[str, Any]]]:
+        url = f"{self.facilitator_url}/discovery/resources"
+        async with self.transport.get(url, params=params, headers=headers) as response:
+            if response.status == 304:
+                return response.status, response.headers, None
+            if response.status != 200:
+                raise Exception(f"Discovery failed: {response.status}")
+            
+            return response.status, response.headers, await response.json()
+    
+    def _store(self, resources: List[Dict[str, Any]]):
+        if self.catalog is not None:
+            self.catalog.upsert(resources)
+    
+    def _add(self, service: ServiceDiscovery) -> ServiceDiscovery:
+        self.index.add(service)
+        if self.text is not None:
+            self.text.add(service)
+        return service
+    
+    def _evict(self, service_id: str):
+        self.index.remove(service_id)
+        self.health.pop(service_id, None)
+        if self.text is not None:
+            self.text.remove(service_id)
     
     def get_service(self, service_id: str) -> Optional[ServiceDiscovery]:
-        return self.services.get(service_id)
-
-
-
+        service = self.services.get(service_id)
+        if service is None and self.catalog is not None:
+            service = self.catalog.get(service_id)
+            if service is not None:
+                self._add(service)
+        return service
 
+def _discovery_params(
+    category: Optional[str],
+    network: Optional[str],
+    scheme: Optional[str],
+    limit: Optional[int],
+    offset: Optional[int]
+) -> Dict[str, Any]:
+    params = {}
+    
+    if category:
+        params['category'] = category
+    if network:
+        params['network'] = network
+    if scheme:
+        params['scheme'] = scheme
+    if limit:
+        params['limit'] = limit
+    if offset:
+        params['offset'] = offset
+    
+    return params
 
+def parse_service(resource: Dict[str, Any]) -> ServiceDiscovery:
+    return ServiceDiscovery(
+        id=resource['id'],
+        name=resource['name'],
+        description=resource.get('description', ''),
+        endpoint=resource['endpoint'],
+        category=resource.get('category', ''),
+        network=resource.get('network', 'base'),
+        accepts=[
+            PaymentAccept(**accept) for accept in resource.get('accepts', [])
+        ],
+        metadata=resource.get('metadata'),
+    )
@@ -0,0 +1,333 @@
+from typing import Optional, Dict, Any, List, Set, Tuple, Callable, Iterable, MutableMapping, TYPE_CHECKING
+from bisect import bisect_left, bisect_right
+import heapq
+
+if TYPE_CHECKING:
+    from .index import ServiceDiscovery, PaymentAccept
+    from .health import EndpointHealth
+
+SORT_KEYS = ('price', '-price', 'name', '-name', 'id', '-id', 'latency', '-latency')
+_SCAN_FACTOR = 4
+_EMPTY: frozenset = frozenset()
+
+def accept_price(accept: 'PaymentAccept') -> Optional[int]:
+    try:
+        return int(accept.max_amount_required)
+    except (TypeError, ValueError):
+        return None
+
+class ServiceIndex:
+    def __init__(
+        self,
+        services: Optional[MutableMapping[str, 'ServiceDiscovery']] = None,
+        health: Optional[Dict[str, 'EndpointHealth']] = None
+    ):
+        # The index writes through to `services`, so callers can share their own mapping with it.
+        # `health` is read-only here; probers fill it in and queries filter and sort on it.
+        self._services = {} if services is None else services
+        self._health = {} if health is None else health
+        self._order: Dict[str, int] = {}
+        self._min_prices: Dict[str, Optional[int]] = {}
+        self._sequence = 0
+        self._fields: Dict[str, Dict[str, Set[str]]] = {
+            'category': {},
+            'network': {},
+            'scheme': {},
+            'asset': {},
+            'pay_to': {},
+        }
+        self._prices: List[Tuple[int, str]] = []
+        self._price_keys: List[int] = []
+        self._prices_dirty = False
+        self._stale_prices = 0
+
+    def add(self, service: 'ServiceDiscovery'):
+        if service.id in self._order:
+            self.remove(service.id)
+        self._services[service.id] = service
+        self._order[service.id] = self._sequence
+        self._sequence += 1
+        for field, value in _keys(service):
+            self._fields[field].setdefault(value, set()).add(service.id)
+        prices = [price for price in map(accept_price, service.accepts) if price is not None]
+        self._min_prices[service.id] = min(prices, default=None)
+        if prices:
+            self._prices.extend((price, service.id) for price in prices)
+            self._prices_dirty = True
+
+    def update(self, services: Iterable['ServiceDiscovery']):
+        for service in services:
+            self.add(service)
+
+    def remove(self, service_id: str) -> Optional['ServiceDiscovery']:
+        service = self._services.pop(service_id, None)
+        if service is None:
+            return None
+        del self._order[service_id]
+        del self._min_prices[service_id]
+        for field, value in _keys(service):
+            ids = self._fields[field].get(value)
+            if ids is not None:
+                ids.discard(service_id)
+                if not ids:
+                    del self._fields[field][value]
+        # Price entries are dropped lazily; stale ones are filtered at query time.
+        self._stale_prices += sum(accept_price(accept) is not None for accept in service.accepts)
+        return service
+
+    def clear(self):
+        self._services.clear()
+        self.__init__(self._services, self._health)
+
+    def get(self, service_id: str) -> Optional['ServiceDiscovery']:
+        return self._services.get(service_id)
+
+    def values(self, field: str) -> Dict[str, int]:
+        return {value: len(ids) for value, ids in self._fields[field].items()}
+
+    def __len__(self) -> int:
+        return len(self._services)
+
+    def __contains__(self, service_id: str) -> bool:
+        return service_id in self._services
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        network: Optional[str] = None,
+        scheme: Optional[str] = None,
+        asset: Optional[str] = None,
+        pay_to: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        max_latency: Optional[float] = None,
+        min_availability: Optional[float] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+    ) -> List['ServiceDiscovery']:
+        if sort is not None and sort not in SORT_KEYS:
+            raise ValueError(f'Unsupported sort key: {sort}')
+
+        filters = {
+            'category': category,
+            'network': network,
+            'scheme': scheme,
+            'asset': asset.lower() if asset else None,
+            'pay_to': pay_to.lower() if pay_to else None,
+        }
+        match = _accept_filter(filters['scheme'], filters['asset'], filters['pay_to'], min_price, max_price)
+        healthy = _health_filter(self._health, max_latency, min_availability)
+        exact = sorted((self._fields[field].get(value, _EMPTY) for field, value in filters.items() if value), key=len)
+        priced = min_price is not None or max_price is not None
+        start = offset or 0
+        total = len(self._services)
+
+        # With a limit and a broad match it is cheaper to walk services in result order and stop early.
+        # The walk is budgeted from an independence estimate and falls back to set intersection.
+        if limit is not None and sort in (None, 'price') and total:
+            lo, hi = self._price_bounds(min_price, max_price) if priced or sort else (0, total)
+            walk = hi - lo if sort else total
+            estimate = total
+            for ids in exact:
+                estimate *= len(ids) / total
+            if priced:
+                estimate *= (hi - lo) / max(len(self._prices), 1)
+            sizes = [len(exact[0])] if exact else []
+            if priced:
+                sizes.append(hi - lo)
+            cost = min(sizes) if sizes else total
+            steps = (start + limit) * walk / estimate if estimate >= 1 else walk
+            if steps < cost:
+                found = self._scan(exact, match, healthy, sort, lo, hi, start + limit, max(4 * int(steps), 256), priced)
+                if found is not None:
+                    return found[start:]
+
+        candidates = list(exact)
+        if priced:
+            # The accept filter re-checks prices, so the range set is only worth building when it narrows the search.
+            lo, hi = self._price_bounds(min_price, max_price)
+            if not exact or hi - lo < len(exact[0]):
+                candidates.insert(0, self._price_range(min_price, max_price))
+        if candidates:
+            ids = candidates[0].intersection(*candidates[1:]) if len(candidates) > 1 else candidates[0]
+        else:
+            ids = self._services.keys()
+
+        services = [self._services[i] for i in ids]
+        if match is not None:
+            services = [service for service in services if any(match(a) for a in service.accepts)]
+        if healthy is not None:
+            services = [service for service in services if healthy(service.id)]
+
+        key, reverse = self._sort_key(sort, match)
+        if limit is not None:
+            pick = heapq.nlargest if reverse else heapq.nsmallest
+            return pick(start + limit, services, key=key)[start:]
+        services.sort(key=key, reverse=reverse)
+        return services[start:]
+
+    def _scan(
+        self,
+        exact: List[Set[str]],
+        match: Optional[Callable[['PaymentAccept'], bool]],
+        healthy: Optional[Callable[[str], bool]],
+        sort: Optional[str],
+        lo: int,
+        hi: int,
+        stop: int,
+        budget: int,
+        priced: bool
+    ) -> Optional[List['ServiceDiscovery']]:
+        found = []
+        if sort is None:
+            for steps, (service_id, service) in enumerate(self._services.items()):
+                if steps >= budget:
+                    return None
+                if (
+                    all(service_id in ids for ids in exact)
+                    and (healthy is None or healthy(service_id))
+                    and (match is None or any(match(a) for a in service.accepts))
+                ):
+                    found.append(service)
+                    if len(found) >= stop:
+                        break
+            return found
+
+        # Walking prices in ascending order, a service's first qualifying entry is its lowest matching price.
+        seen = set()
+        for i in range(lo, min(hi, lo + budget)):
+            price, service_id = self._prices[i]
+            if service_id in seen or not all(service_id in ids for ids in exact):
+                continue
+            if healthy is not None and not healthy(service_id):
+                continue
+            service = self._services.get(service_id)
+            if service is None or not any(
+                accept_price(a) == price and (match is None or match(a)) for a in service.accepts
+            ):
+                continue
+            seen.add(service_id)
+            found.append(service)
+            if len(found) >= stop:
+                return found
+        # Unpriced services sort after priced ones, so a short walk without a price filter is incomplete.
+        return found if priced and hi <= lo + budget else None
+
+    def _price_bounds(self, min_price: Optional[int], max_price: Optional[int]) -> Tuple[int, int]:
+        if self._stale_prices * 2 > len(self._prices):
+            self._prices = [
+                (price, service.id)
+                for service in self._services.values()
+                for price in map(accept_price, service.accepts) if price is not None
+            ]
+            self._stale_prices = 0
+            self._prices_dirty = True
+        if self._prices_dirty:
+            self._prices.sort()
+            self._price_keys = [price for price, _ in self._prices]
+            self._prices_dirty = False
+        lo = 0 if min_price is None else bisect_left(self._price_keys, min_price)
+        hi = len(self._prices) if max_price is None else bisect_right(self._price_keys, max_price)
+        return lo, hi
+
+    def _price_range(self, min_price: Optional[int], max_price: Optional[int]) -> Set[str]:
+        lo, hi = self._price_bounds(min_price, max_price)
+        services = self._services
+        return {service_id for _, service_id in self._prices[lo:hi] if service_id in services}
+
+    def _sort_key(
+        self,
+        sort: Optional[str],
+        match: Optional[Callable[['PaymentAccept'], bool]]
+    ) -> Tuple[Callable[['ServiceDiscovery'], Any], bool]:
+        order = self._order
+        field = (sort or '').lstrip('-')
+        reverse = bool(sort) and sort.startswith('-')
+        if field == 'price':
+            min_prices = self._min_prices
+
+            def key(service: 'ServiceDiscovery'):
+                if match is None or len(service.accepts) == 1:
+                    price = min_prices[service.id]
+                else:
+                    price = min(
+                        (p for p in map(accept_price, filter(match, service.accepts)) if p is not None),
+                        default=None
+                    )
+                # Unpriced services sort last in either direction.
+                return ((price is None) != reverse, price or 0, service.id)
+            return key, reverse
+        if field == 'latency':
+            health = self._health
+
+            def key(service: 'ServiceDiscovery'):
+                entry = health.get(service.id)
+                latency = entry.p50 if entry is not None else None
+                # Services that were never probed successfully sort last in either direction.
+                return ((latency is None) != reverse, latency or 0.0, service.id)
+            return key, reverse
+        if field == 'name':
+            return (lambda service: (service.name, order[service.id])), reverse
+        if field == 'id':
+            return (lambda service: service.id), reverse
+        return (lambda service: order[service.id]), False
+
+def _keys(service: 'ServiceDiscovery') -> Set[Tuple[str, str]]:
+    keys = {('category', service.category), ('network', service.network)}
+    for accept in service.accepts:
+        keys.add(('scheme', accept.scheme))
+        keys.add(('asset', accept.asset.lower()))
+        keys.add(('pay_to', accept.pay_to.lower()))
+    return keys
+
+def _health_filter(
+    health: Dict[str, 'EndpointHealth'],
+    max_latency: Optional[float],
+    min_availability: Optional[float]
+) -> Optional[Callable[[str], bool]]:
+    if max_latency is None and min_availability is None:
+        return None
+
+    def healthy(service_id: str) -> bool:
+        entry = health.get(service_id)
+        if entry is None:
+            return False
+        if max_latency is not None:
+            latency = entry.p50
+            if latency is None or latency > max_latency:
+                return False
+        if min_availability is not None and entry.availability < min_availability:
+            return False
+        return True
+
+    return healthy
+
+def _accept_filter(
+    scheme: Optional[str],
+    asset: Optional[str],
+    pay_to: Optional[str],
+    min_price: Optional[int],
+    max_price: Optional[int]
+) -> Optional[Callable[['PaymentAccept'], bool]]:
+    if not (scheme or asset or pay_to) and min_price is None and max_price is None:
+        return None
+
+    def match(accept: 'PaymentAccept') -> bool:
+        if scheme and accept.scheme != scheme:
+            return False
+        if asset and accept.asset.lower() != asset:
+            return False
+        if pay_to and accept.pay_to.lower() != pay_to:
+            return False
+        if min_price is not None or max_price is not None:
+            price = accept_price(accept)
+            if price is None:
+                return False
+            if min_price is not None and price < min_price:
+                return False
+            if max_price is not None and price > max_price:
+                return False
+        return True
+
+    return match
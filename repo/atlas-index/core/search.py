@@ -0,0 +1,262 @@
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Iterator, Container, TYPE_CHECKING
+from array import array
+from bisect import bisect_left
+import heapq
+import math
+import re
+import sys
+
+if TYPE_CHECKING:
+    from .index import ServiceDiscovery
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'with',
+})
+
+def tokenize(text: str, max_token_length: int = 32) -> Iterator[str]:
+    for token in _TOKEN.findall(text.lower()):
+        if len(token) > 1 and len(token) <= max_token_length and token not in STOP_WORDS:
+            yield token
+
+def service_text(service: 'ServiceDiscovery') -> Iterator[Tuple[str, int]]:
+    yield service.name, 2
+    yield service.description, 1
+    yield service.category, 1
+    if service.metadata:
+        yield from ((value, 1) for value in _strings(service.metadata))
+
+def _strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _strings(item)
+
+class SearchIndex:
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        prefix_weight: float = 0.5,
+        max_expansions: int = 32,
+        max_text_length: int = 4_096,
+        max_document_terms: int = 256
+    ):
+        self.k1 = k1
+        self.b = b
+        self.prefix_weight = prefix_weight
+        self.max_expansions = max_expansions
+        self.max_text_length = max_text_length
+        self.max_document_terms = max_document_terms
+        self._docs: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._released: List[int] = []
+        self._lengths = array('I')
+        self._terms: List[Tuple[str, ...]] = []
+        # Postings are parallel arrays of document numbers and term frequencies, which keeps
+        # large catalogs to a few bytes per posting. Removed documents leave tombstoned postings
+        # behind that searches skip; they are compacted away once they outnumber the live ones.
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._document_counts: Dict[str, int] = {}
+        self._live_postings = 0
+        self._dead_postings = 0
+        self._total_length = 0
+        self._norms = array('f')
+        self._norm_average = 0.0
+        self._vocabulary: List[str] = []
+        self._new_terms: List[str] = []
+        self._stale_terms = 0
+        self._resort = False
+
+    def add(self, service: 'ServiceDiscovery'):
+        self.remove(service.id)
+        counts: Dict[str, int] = {}
+        length = 0
+        for text, weight in service_text(service):
+            for token in tokenize(text[:self.max_text_length]):
+                if token in counts or len(counts) < self.max_document_terms:
+                    counts[token] = counts.get(token, 0) + weight
+                    length += weight
+        if not counts:
+            return
+
+        norm = self._norm(length, self._norm_average)
+        doc = self._free.pop() if self._free else len(self._ids)
+        if doc == len(self._ids):
+            self._ids.append(service.id)
+            self._lengths.append(length)
+            self._norms.append(norm)
+            self._terms.append(())
+        else:
+            self._ids[doc] = service.id
+            self._lengths[doc] = length
+            self._norms[doc] = norm
+        self._docs[service.id] = doc
+        self._total_length += length
+
+        terms = []
+        for token, count in counts.items():
+            token = sys.intern(token)
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = (array('I'), array('H'))
+                if not self._resort:
+                    self._new_terms.append(token)
+                    if len(self._new_terms) * 64 > len(self._vocabulary):
+                        self._resort = True
+                        self._new_terms.clear()
+            postings[0].append(doc)
+            postings[1].append(min(count, 0xFFFF))
+            self._document_counts[token] = self._document_counts.get(token, 0) + 1
+            terms.append(token)
+        self._terms[doc] = tuple(terms)
+        self._live_postings += len(terms)
+
+    def update(self, services: Iterable['ServiceDiscovery']):
+        for service in services:
+            self.add(service)
+
+    def remove(self, service_id: str) -> bool:
+        doc = self._docs.pop(service_id, None)
+        if doc is None:
+            return False
+        terms = self._terms[doc]
+        for term in terms:
+            remaining = self._document_counts[term] - 1
+            if remaining:
+                self._document_counts[term] = remaining
+                self._dead_postings += 1
+            else:
+                # The term's earlier tombstones go with it.
+                self._dead_postings -= len(self._postings[term][0]) - 1
+                del self._postings[term]
+                del self._document_counts[term]
+                self._stale_terms += 1
+        self._live_postings -= len(terms)
+        self._terms[doc] = ()
+        self._total_length -= self._lengths[doc]
+        self._lengths[doc] = 0
+        self._ids[doc] = None
+        # The number is only reused after compaction, so its tombstones cannot be mistaken for a new document.
+        self._released.append(doc)
+        if self._dead_postings > self._live_postings:
+            self._compact()
+        return True
+
+    def _compact(self):
+        ids = self._ids
+        for term, (docs, frequencies) in self._postings.items():
+            live = [i for i, doc in enumerate(docs) if ids[doc] is not None]
+            if len(live) != len(docs):
+                self._postings[term] = (array('I', (docs[i] for i in live)), array('H', (frequencies[i] for i in live)))
+        self._dead_postings = 0
+        self._free.extend(self._released)
+        self._released.clear()
+
+    def clear(self):
+        self.__init__(
+            self.k1, self.b, self.prefix_weight, self.max_expansions, self.max_text_length, self.max_document_terms
+        )
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, service_id: str) -> bool:
+        return service_id in self._docs
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'documents': len(self._docs),
+            'terms': len(self._postings),
+            'postings': self._live_postings,
+            'tombstones': self._dead_postings,
+        }
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = 10,
+        prefix: bool = True,
+        allowed: Optional[Container[str]] = None
+    ) -> List[Tuple[str, float]]:
+        count = len(self._docs)
+        if not count:
+            return []
+        norms = self._refresh_norms()
+
+        scores: Dict[int, float] = {}
+        for token in dict.fromkeys(tokenize(query)):
+            expansions = self._expand(token, prefix)
+            # A document matching several expansions of one token only counts its best match.
+            best = scores if len(expansions) == 1 else {}
+            for term, weight in expansions:
+                docs, frequencies = self._postings[term]
+                df = self._document_counts[term]
+                idf = weight * (self.k1 + 1) * math.log(1 + (count - df + 0.5) / (df + 0.5))
+                if best is scores:
+                    for doc, tf in zip(docs, frequencies):
+                        scores[doc] = scores.get(doc, 0.0) + idf * tf / (tf + norms[doc])
+                else:
+                    for doc, tf in zip(docs, frequencies):
+                        score = idf * tf / (tf + norms[doc])
+                        if score > best.get(doc, 0.0):
+                            best[doc] = score
+            if best is not scores:
+                for doc, score in best.items():
+                    scores[doc] = scores.get(doc, 0.0) + score
+
+        ids = self._ids
+        hits = (
+            (ids[doc], score) for doc, score in scores.items()
+            if ids[doc] is not None and (allowed is None or ids[doc] in allowed)
+        )
+        order = lambda hit: (-hit[1], hit[0])
+        if limit is None:
+            return sorted(hits, key=order)
+        return heapq.nsmallest(limit, hits, key=order)
+
+    def _norm(self, length: int, average: float) -> float:
+        return self.k1 * (1 - self.b + self.b * length / average) if average else self.k1
+
+    def _refresh_norms(self) -> array:
+        # Length norms depend on the average document length; they are recomputed once it drifts by 5%.
+        average = self._total_length / len(self._docs)
+        if abs(average - self._norm_average) > 0.05 * average:
+            self._norm_average = average
+            self._norms = array('f', (self._norm(length, average) for length in self._lengths))
+        return self._norms
+
+    def _expand(self, token: str, prefix: bool) -> List[Tuple[str, float]]:
+        terms = [(token, 1.0)] if token in self._postings else []
+        if not prefix:
+            return terms
+        vocabulary = self._sorted_vocabulary()
+        i = bisect_left(vocabulary, token)
+        while i < len(vocabulary) and len(terms) < self.max_expansions and vocabulary[i].startswith(token):
+            term = vocabulary[i]
+            if term != token and term in self._postings:
+                terms.append((term, self.prefix_weight))
+            i += 1
+        return terms
+
+    def _sorted_vocabulary(self) -> List[str]:
+        # Removed terms stay in the sorted list until they make up half of it; lookups skip them.
+        vocabulary = self._vocabulary
+        if self._resort or self._stale_terms * 2 > len(vocabulary):
+            vocabulary = self._vocabulary = sorted(self._postings)
+            self._resort = False
+            self._stale_terms = 0
+        else:
+            for term in self._new_terms:
+                i = bisect_left(vocabulary, term)
+                if i == len(vocabulary) or vocabulary[i] != term:
+                    vocabulary.insert(i, term)
+        self._new_terms.clear()
+        return vocabulary
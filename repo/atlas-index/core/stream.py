@@ -0,0 +1,97 @@
+from typing import Optional, Dict, Any, AsyncIterator
+import codecs
+import json
+import aiohttp
+from atlas_x402.client.streaming import iter_chunks
+
+_WHITESPACE = ' \t\n\r'
+
+class _Buffer:
+    def __init__(self, response: aiohttp.ClientResponse, chunk_size: int):
+        self.chunks = iter_chunks(response, chunk_size).__aiter__()
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    async def fill(self) -> bool:
+        if self.eof:
+            return False
+        try:
+            chunk = await self.chunks.__anext__()
+        except StopAsyncIteration:
+            self.text = self.text[self.pos:] + self.decoder.decode(b'', final=True)
+            self.pos = 0
+            self.eof = True
+            return False
+        self.text = self.text[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    async def peek(self) -> str:
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not await self.fill():
+                raise ValueError('Unexpected end of discovery response')
+
+    async def expect(self, char: str):
+        if await self.peek() != char:
+            raise ValueError(f'Expected {char!r} at offset {self.pos} of discovery response')
+        self.pos += 1
+
+    async def value(self, decoder: json.JSONDecoder) -> Any:
+        await self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not await self.fill():
+                    raise
+                continue
+            # A number or literal that ends the buffer may continue in the next chunk.
+            if end < len(self.text) or self.eof or self.text[end - 1] in '"}]':
+                self.pos = end
+                return value
+            await self.fill()
+
+async def iter_resources(
+    response: aiohttp.ClientResponse,
+    chunk_size: Optional[int] = 2 ** 16,
+    key: str = 'resources',
+    envelope: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    buffer = _Buffer(response, chunk_size)
+    decoder = json.JSONDecoder()
+    await buffer.expect('{')
+    if await buffer.peek() == '}':
+        return
+    while True:
+        name = await buffer.value(decoder)
+        await buffer.expect(':')
+        if name == key and await buffer.peek() == '[':
+            buffer.pos += 1
+            if await buffer.peek() == ']':
+                buffer.pos += 1
+            else:
+                while True:
+                    yield await buffer.value(decoder)
+                    separator = await buffer.peek()
+                    buffer.pos += 1
+                    if separator == ']':
+                        break
+                    if separator != ',':
+                        raise ValueError(f'Expected "," or "]" in discovery response, got {separator!r}')
+        else:
+            value = await buffer.value(decoder)
+            if envelope is not None:
+                envelope[name] = value
+
+        separator = await buffer.peek()
+        buffer.pos += 1
+        if separator == '}':
+            return
+        if separator != ',':
+            raise ValueError(f'Expected "," or "}}" in discovery response, got {separator!r}')
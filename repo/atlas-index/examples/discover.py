@@ -7,6 +7,12 @@ async def main():
     services = await index.discover(category='AI', network='base')
     
     print(f"Found {len(services)} services")
+    
+    count = 0
+    async for service in index.discover_all(network='base', page_size=100, window=4):
+        count += 1
+    
+    print(f"Indexed {count} services on base")
 
 if __name__ == '__main__':
     asyncio.run(main())
@@ -5,6 +5,7 @@ setup(
     packages=['atlas_index'],
     install_requires=[
         'aiohttp>=3.9.0',
+        'atlas-x402-client>=1.0.0',
     ],
     python_requires='>=3.11',
 )
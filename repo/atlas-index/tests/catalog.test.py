@@ -0,0 +1,104 @@
+import hashlib
+import json
+import pytest
+from aiohttp import web
+from atlas_x402.transport import HTTPTransport
+from atlas_x402.benchmarks.stubs import StubFacilitator, StubServer
+from atlas_index.core.index import AtlasIndex
+from atlas_index.core.catalog import ServiceCatalog
+
+@pytest.mark.asyncio
+async def test_sync_persists_and_warm_starts(tmp_path):
+    path = str(tmp_path / 'catalog.db')
+    async with StubFacilitator(services=120) as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport, catalog=ServiceCatalog(path))
+        result = await index.sync(page_size=50)
+        assert (result.added, result.updated, result.removed) == (120, 0, 0)
+        index.catalog.close()
+        requests = facilitator.requests
+        
+        warm = AtlasIndex(facilitator.url, transport=transport, catalog=ServiceCatalog(path))
+        assert warm.get_service('service-7').name == 'Service 7'
+        assert len(warm.query(category='ai', scheme='x402+eip712', limit=5)) == 5
+        assert all(s.network == 'base' for s in warm.query(network='base'))
+        assert facilitator.requests == requests
+
+@pytest.mark.asyncio
+async def test_sync_uses_etag_then_diffs():
+    async with StubFacilitator(services=60) as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport, catalog=ServiceCatalog())
+        await index.sync(page_size=25)
+        
+        result = await index.sync(page_size=25)
+        assert result.not_modified
+        
+        del facilitator.resources[3]
+        facilitator.resources[10] = dict(facilitator.resources[10], name='Renamed')
+        facilitator.revision += 1
+        result = await index.sync(page_size=25)
+        
+        assert not result.not_modified
+        assert (result.added, result.updated, result.removed, result.unchanged) == (0, 1, 1, 58)
+        assert index.get_service('service-3') is None
+        assert index.get_service('service-11').name == 'Renamed'
+
+class CursorFacilitator(StubServer):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.queries = []
+        self.changes = [
+            {'id': 'a', 'name': 'A', 'endpoint': 'https://a.example.com'},
+            {'id': 'b', 'name': 'B', 'endpoint': 'https://b.example.com'},
+        ]
+    
+    def routes(self, app: web.Application):
+        app.router.add_get('/discovery/resources', self.discovery)
+    
+    async def discovery(self, request: web.Request) -> web.Response:
+        self.queries.append(dict(request.query))
+        if 'updated_since' in request.query:
+            resources = [{'id': 'a', 'deleted': True}, {'id': 'c', 'name': 'C', 'endpoint': 'https://c.example.com'}]
+        else:
+            resources = self.changes
+        return web.json_response({'resources': resources, 'cursor': '2'})
+
+@pytest.mark.asyncio
+async def test_sync_follows_updated_since_cursor():
+    async with CursorFacilitator() as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport, catalog=ServiceCatalog())
+        await index.sync()
+        result = await index.sync()
+    
+    assert facilitator.queries[1]['updated_since'] == '2'
+    assert result.incremental and (result.added, result.removed) == (1, 1)
+    assert sorted(s.id for s in index.catalog) == ['b', 'c']
+
+class PagedFacilitator(StubServer):
+    # Validators here describe a single page, as a facilitator that hashes each response would send.
+    def __init__(self, services: int, **kwargs):
+        super().__init__(**kwargs)
+        self.resources = [{'id': f's{i}', 'name': f'S{i}', 'endpoint': f'https://s{i}.example.com'} for i in range(services)]
+    
+    def routes(self, app: web.Application):
+        app.router.add_get('/discovery/resources', self.discovery)
+    
+    async def discovery(self, request: web.Request) -> web.Response:
+        offset = int(request.query.get('offset', 0))
+        page = self.resources[offset:offset + int(request.query.get('limit', 100))]
+        etag = '"%s"' % hashlib.sha256(json.dumps(page).encode()).hexdigest()[:16]
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.json_response({'resources': page}, headers={'ETag': etag})
+
+@pytest.mark.asyncio
+async def test_sync_sees_changes_beyond_the_first_page_with_per_page_etags():
+    async with PagedFacilitator(services=60) as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport, catalog=ServiceCatalog())
+        await index.sync(page_size=25)
+        
+        facilitator.resources[40] = dict(facilitator.resources[40], name='Renamed')
+        result = await index.sync(page_size=25)
+    
+    assert not result.not_modified
+    assert (result.updated, result.unchanged) == (1, 59)
+    assert index.get_service('s40').name == 'Renamed'
@@ -0,0 +1,49 @@
+import pytest
+from atlas_x402.transport import HTTPTransport
+from atlas_x402.benchmarks.stubs import StubFacilitator, _stub_resource
+from atlas_index.core.index import AtlasIndex, PaymentAccept, parse_service
+from atlas_index.core.compact import CompactStore
+
+def test_round_trips_services():
+    store = CompactStore()
+    services = [parse_service(_stub_resource(i)) for i in range(20)]
+    services[3].metadata = {'tags': ['weather']}
+    services[4].accepts.append(PaymentAccept('0xA', '0xB', 'base', '0012', 'exact', 'text/plain'))
+    services[5].accepts[0].max_amount_required = str(2 ** 70)
+    for service in services:
+        store[service.id] = service
+    
+    assert len(store) == 20
+    assert [store[s.id] for s in services] == services
+    assert store['service-4'].accepts[1].max_amount_required == '0012'
+    assert store['service-7'].accepts[0].max_amount_required == '8000'
+
+def test_updates_deletes_and_compaction():
+    store = CompactStore(min_garbage=4)
+    for i in range(10):
+        store[f'service-{i}'] = parse_service(_stub_resource(i))
+    
+    renamed = parse_service(dict(_stub_resource(2), name='Renamed'))
+    store['service-2'] = renamed
+    for i in range(5, 10):
+        del store[f'service-{i}']
+    
+    assert list(store) == ['service-0', 'service-1', 'service-3', 'service-4', 'service-2']
+    assert store['service-2'] == renamed
+    assert store._garbage == 0 and len(store._categories) == 5
+    assert 'service-7' not in store
+    with pytest.raises(KeyError):
+        store['service-7']
+
+@pytest.mark.asyncio
+async def test_atlas_index_compact_mode():
+    async with StubFacilitator(services=150) as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport, compact=True)
+        async for _ in index.discover_all(page_size=50):
+            pass
+    
+    assert isinstance(index.services, CompactStore) and len(index.services) == 150
+    assert index.get_service('service-9') == parse_service(_stub_resource(9))
+    cheap = index.query(category='data', max_price=5_000, sort='price')
+    assert [s.id for s in cheap] == ['service-0', 'service-100', 'service-104', 'service-4']
+    assert index.search('flight status', limit=1)[0].description.startswith('Flight')
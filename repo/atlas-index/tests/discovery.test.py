@@ -0,0 +1,43 @@
+import pytest
+from atlas_x402.transport import HTTPTransport
+from atlas_x402.benchmarks.stubs import StubFacilitator
+from atlas_index.core.index import AtlasIndex
+
+@pytest.mark.asyncio
+async def test_discover_all_paginates_in_order():
+    async with StubFacilitator(services=250) as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport)
+        services = [service async for service in index.discover_all(page_size=100, window=3)]
+    
+    assert [s.id for s in services] == [f'service-{i}' for i in range(250)]
+    assert len(index.services) == 250
+    assert services[0].accepts[0].scheme == 'x402+solana'
+
+@pytest.mark.asyncio
+async def test_discover_all_stops_on_short_page():
+    async with StubFacilitator(services=100) as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport)
+        services = [s async for s in index.discover_all(category='ai', page_size=10, window=2)]
+    
+    assert len(services) == 25
+    assert all(s.category == 'ai' for s in services)
+    assert facilitator.requests <= 5
+
+@pytest.mark.asyncio
+async def test_discover_all_respects_max_pages():
+    async with StubFacilitator(services=100) as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport)
+        services = [s async for s in index.discover_all(page_size=10, window=4, max_pages=3)]
+    
+    assert len(services) == 30
+    assert facilitator.requests == 3
+
+@pytest.mark.asyncio
+async def test_discover_all_early_exit_cancels_prefetch():
+    async with StubFacilitator(services=1_000, latency=0.01) as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport)
+        async for service in index.discover_all(page_size=10, window=4):
+            break
+        
+        assert service.id == 'service-0'
+        assert facilitator.requests <= 4
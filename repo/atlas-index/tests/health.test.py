@@ -0,0 +1,116 @@
+import pytest
+from atlas_x402.transport import HTTPTransport
+from atlas_x402.benchmarks.stubs import StubPaywall, StubFacilitator
+from atlas_index.core.index import AtlasIndex, PaymentAccept, ServiceDiscovery
+from atlas_index.core.health import EndpointHealth, HealthProber, challenge_error
+
+def service(service_id, endpoint, price='1000'):
+    return ServiceDiscovery(
+        id=service_id,
+        name=service_id.title(),
+        description='',
+        endpoint=endpoint,
+        category='ai',
+        network='base',
+        accepts=[PaymentAccept('0xUSDC', '0xAA', 'base', price, 'x402+eip712', 'application/json')],
+    )
+
+def ids(services):
+    return [s.id for s in services]
+
+def test_challenge_validation():
+    assert challenge_error(200, b'{}') == 'Expected a 402 challenge, got 200'
+    assert challenge_error(402, b'not json') == 'Challenge body is not JSON'
+    assert challenge_error(402, b'{"accepts": []}') == 'Challenge has no payment requirements'
+    assert challenge_error(402, b'{"accepts": [{"scheme": "x402+eip712"}]}') == 'Challenge requirements are incomplete'
+    assert challenge_error(
+        402, b'{"accepts": [{"scheme": "x402+eip712", "network": "base", "maxAmountRequired": "1", "payTo": "0xAA"}]}'
+    ) is None
+
+def test_latency_window_and_percentiles():
+    health = EndpointHealth(window=4)
+    for latency in (0.5, 0.1, 0.2, 0.3, 0.4):
+        health.record(True, latency, 402, None, 0.0)
+    health.record(False, None, None, 'timeout', 0.0)
+    
+    assert list(health.latencies) == [0.1, 0.2, 0.3, 0.4]
+    assert health.p50 == 0.3
+    assert health.p99 == 0.4
+    assert health.availability == 0.75
+    assert not health.available
+    assert (health.checks, health.failures) == (6, 1)
+
+@pytest.mark.asyncio
+async def test_probe_validates_challenges_and_ranks_by_latency():
+    async with StubPaywall() as fast, StubPaywall(latency=0.05) as slow, \
+            StubFacilitator(services=1) as wrong, HTTPTransport() as transport:
+        index = AtlasIndex(wrong.url, transport=transport)
+        for s in (
+            service('slow', f'{slow.url}/slow'),
+            service('fast', f'{fast.url}/fast'),
+            service('wrong', f'{wrong.url}/missing'),
+            service('down', 'http://127.0.0.1:9/closed'),
+        ):
+            index._add(s)
+        
+        prober = HealthProber(index, per_host=1, host_interval=0.0, timeout=2)
+        await prober.probe_all()
+        
+        assert index.health['fast'].available and index.health['slow'].available
+        assert index.health['wrong'].status == 404
+        assert index.health['wrong'].error == 'Expected a 402 challenge, got 404'
+        assert index.health['down'].status is None and index.health['down'].error
+        assert fast.paid == 0 and slow.paid == 0
+        
+        ranked = ids(index.query(sort='latency'))
+        assert ranked.index('fast') < ranked.index('slow') and ranked[-1] == 'down'
+        assert ids(index.query(sort='-latency'))[-1] == 'down'
+        assert ids(index.query(min_availability=1.0, sort='latency', limit=2)) == ['fast', 'slow']
+        assert ids(index.query(min_availability=1.0)) == ['slow', 'fast']
+        assert 'slow' not in ids(index.query(max_latency=0.04))
+        assert ids(index.query(max_latency=1.0, limit=1)) == ['slow']
+        assert prober.stats() == {'rounds': 1, 'services': 4, 'available': 2}
+        
+        index._evict('slow')
+        assert 'slow' not in index.health
+
+@pytest.mark.asyncio
+async def test_probes_to_one_host_are_paced():
+    async with StubPaywall() as paywall, HTTPTransport() as transport:
+        index = AtlasIndex(paywall.url, transport=transport)
+        services = [service(f's{i}', f'{paywall.url}/s{i}') for i in range(4)]
+        
+        prober = HealthProber(index, concurrency=8, per_host=4, host_interval=0.05)
+        started = prober.clock()
+        await prober.probe_all(services)
+        
+        assert prober.clock() - started >= 0.15
+        assert paywall.requests == 4
+        assert all(index.health[s.id].available for s in services)
+
+@pytest.mark.asyncio
+async def test_probe_all_runs_a_bounded_worker_pool():
+    async with StubPaywall() as first, StubPaywall() as second, HTTPTransport() as transport:
+        index = AtlasIndex(first.url, transport=transport)
+        services = [service(f'a{i}', f'{first.url}/a{i}') for i in range(40)]
+        services += [service(f'b{i}', f'{second.url}/b{i}') for i in range(40)]
+        
+        prober = HealthProber(index, concurrency=4, per_host=2, host_interval=0.0)
+        probe, active, peak, order = prober.probe, [0], [0], []
+        
+        async def counting(s):
+            order.append(s.id[0])
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            try:
+                return await probe(s)
+            finally:
+                active[0] -= 1
+        
+        prober.probe = counting
+        health = await prober.probe_all(services)
+        
+        assert peak[0] == 4
+        assert order[:4] == ['a', 'b', 'a', 'b']
+        assert list(health) == ids(services)
+        assert first.requests == second.requests == 40
@@ -0,0 +1,65 @@
+import pytest
+from atlas_x402.transport import HTTPTransport
+from atlas_x402.benchmarks.stubs import StubFacilitator
+from atlas_index.core.index import AtlasIndex, PaymentAccept, ServiceDiscovery
+from atlas_index.core.query import ServiceIndex
+
+def service(service_id, category='ai', network='base', prices=('1000',), scheme='x402+eip712', pay_to='0xAA'):
+    return ServiceDiscovery(
+        id=service_id,
+        name=service_id.title(),
+        description='',
+        endpoint=f'https://{service_id}.example.com',
+        category=category,
+        network=network,
+        accepts=[PaymentAccept('0xUSDC', pay_to, network, price, scheme, 'application/json') for price in prices],
+    )
+
+def ids(services):
+    return [s.id for s in services]
+
+def test_compound_filters_and_price_range():
+    index = ServiceIndex()
+    index.update([
+        service('a', prices=('500',)),
+        service('b', prices=('5000',), pay_to='0xBB'),
+        service('c', category='data', prices=('2000',)),
+        service('d', network='solana', scheme='x402+solana', prices=('800', '9000')),
+    ])
+    
+    assert ids(index.query(category='ai', network='base')) == ['a', 'b']
+    assert ids(index.query(pay_to='0xbb')) == ['b']
+    assert ids(index.query(min_price=700, max_price=2000)) == ['c', 'd']
+    assert ids(index.query(scheme='x402+solana', min_price=1000)) == ['d']
+    assert ids(index.query(scheme='x402+eip712', min_price=8000)) == []
+
+def test_sort_limit_offset_and_removal():
+    index = ServiceIndex()
+    index.update(service(f's{i}', prices=(str(1000 - i * 10),)) for i in range(20))
+    
+    assert ids(index.query(sort='price', limit=3)) == ['s19', 's18', 's17']
+    assert ids(index.query(sort='-price', limit=2, offset=1)) == ['s1', 's2']
+    
+    index.remove('s19')
+    index.add(service('s18', prices=('5000',)))
+    assert ids(index.query(sort='price', limit=2)) == ['s17', 's16']
+    assert ids(index.query(min_price=5000)) == ['s18']
+    assert len(index) == 19
+    
+    with pytest.raises(ValueError):
+        index.query(sort='endpoint')
+
+@pytest.mark.asyncio
+async def test_query_does_not_touch_facilitator():
+    async with StubFacilitator(services=200) as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport)
+        async for _ in index.discover_all(page_size=100):
+            pass
+        requests = facilitator.requests
+        
+        cheap = index.query(category='ai', network='base', max_price=10_000, sort='price')
+        
+        assert facilitator.requests == requests
+        assert cheap and all(s.category == 'ai' and s.network == 'base' for s in cheap)
+        prices = [int(s.accepts[0].max_amount_required) for s in cheap]
+        assert prices == sorted(prices) and prices[-1] <= 10_000
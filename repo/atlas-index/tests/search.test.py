@@ -0,0 +1,77 @@
+import pytest
+from atlas_x402.transport import HTTPTransport
+from atlas_x402.benchmarks.stubs import StubFacilitator
+from atlas_index.core.index import AtlasIndex, ServiceDiscovery
+from atlas_index.core.search import SearchIndex, tokenize
+
+def service(service_id, name, description='', metadata=None):
+    return ServiceDiscovery(service_id, name, description, f'https://{service_id}.example.com', 'ai', 'base', [], metadata)
+
+def ids(hits):
+    return [service_id for service_id, _ in hits]
+
+def test_tokenize_drops_stop_words_and_short_tokens():
+    assert list(tokenize('The Weather-Forecast API for a city, v2')) == ['weather', 'forecast', 'api', 'city', 'v2']
+
+def test_bm25_ranking_and_prefix_matching():
+    text = SearchIndex()
+    text.update([
+        service('a', 'Weather Forecast', 'Hourly weather forecast by city'),
+        service('b', 'Forecasting toolkit', 'Demand forecasting for retail'),
+        service('c', 'Image Generator', 'Generate images from prompts', {'tags': ['diffusion', 'art']}),
+        service('d', 'City guide', 'Things to do in a city'),
+    ])
+    
+    assert ids(text.search('weather forecast'))[0] == 'a'
+    assert ids(text.search('forecast', prefix=False)) == ['a']
+    assert ids(text.search('forecast')) == ['a', 'b']
+    assert ids(text.search('diffus')) == ['c']
+    assert ids(text.search('image gen', allowed={'a', 'b'})) == []
+    assert text.search('') == []
+
+def test_incremental_removal_and_replacement():
+    text = SearchIndex()
+    text.update(service(f's{i}', f'Service {i}', 'translation api') for i in range(50))
+    text.add(service('s3', 'Speech transcription'))
+    text.remove('s7')
+    
+    assert len(text) == 49
+    assert 's7' not in ids(text.search('translation', limit=None))
+    assert ids(text.search('transcri')) == ['s3']
+    assert ids(text.search('transl', limit=None))[0] != 's3'
+    
+    for i in range(50):
+        text.remove(f's{i}')
+    assert text.stats() == {'documents': 0, 'terms': 0, 'postings': 0, 'tombstones': 0}
+    assert text.search('translation') == []
+
+def test_updates_at_scale_keep_tombstones_bounded():
+    text = SearchIndex()
+    text.update(service(f's{i}', f'Service {i}', 'translation api') for i in range(5_000))
+    
+    for round in range(3):
+        for i in range(5_000):
+            text.add(service(f's{i}', f'Service {i}', 'translation api' if i % 2 else f'speech round{round}'))
+            stats = text.stats()
+            assert stats['tombstones'] <= stats['postings']
+    
+    assert len(text) == 5_000
+    assert len(text.search('translation', limit=None)) == 2_500
+    assert sorted(ids(text.search('round2', limit=None))) == sorted(f's{i}' for i in range(0, 5_000, 2))
+    assert text.search('round0') == []
+    fresh = SearchIndex()
+    fresh.update(service(f's{i}', f'Service {i}', 'translation api' if i % 2 else 'speech round2') for i in range(5_000))
+    assert text.stats()['postings'] == fresh.stats()['postings']
+
+@pytest.mark.asyncio
+async def test_atlas_index_search_combines_text_and_filters():
+    async with StubFacilitator(services=200) as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport)
+        async for _ in index.discover_all(page_size=100):
+            pass
+        
+        results = index.search('weather forecast', limit=5)
+        assert results and all('Weather' in s.description for s in results)
+        
+        solana = index.search('weather', limit=None, network='solana')
+        assert solana and all(s.network == 'solana' for s in solana)
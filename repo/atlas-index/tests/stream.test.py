@@ -0,0 +1,62 @@
+import json
+import pytest
+from aiohttp import web
+from atlas_x402.transport import HTTPTransport
+from atlas_x402.benchmarks.stubs import StubFacilitator, StubServer, _stub_resource
+from atlas_index.core.index import AtlasIndex
+from atlas_index.core.stream import iter_resources
+
+class ChunkedStub(StubServer):
+    def __init__(self, body: str, chunk: int, **kwargs):
+        super().__init__(**kwargs)
+        self.body = body.encode()
+        self.chunk = chunk
+    
+    def routes(self, app: web.Application):
+        app.router.add_get('/discovery/resources', self.handle)
+    
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={'Content-Type': 'application/json'})
+        await response.prepare(request)
+        for i in range(0, len(self.body), self.chunk):
+            await response.write(self.body[i:i + self.chunk])
+        await response.write_eof()
+        return response
+
+async def collect(body: str, chunk: int):
+    envelope = {}
+    async with ChunkedStub(body, chunk) as stub, HTTPTransport() as transport:
+        async with transport.get(f'{stub.url}/discovery/resources') as response:
+            resources = [r async for r in iter_resources(response, chunk_size=chunk, envelope=envelope)]
+    return resources, envelope
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('chunk', [1, 7, 4096])
+async def test_iter_resources_across_chunk_boundaries(chunk):
+    payload = {
+        'total': 12345,
+        'resources': [dict(_stub_resource(i), metadata={'note': 'ünïcode ✓', 'n': [1.5, None, True]}) for i in range(5)],
+        'cursor': '2026-10-18T00:00:00Z',
+    }
+    resources, envelope = await collect(json.dumps(payload, indent=1, ensure_ascii=False), chunk)
+    
+    assert resources == payload['resources']
+    assert envelope == {'total': 12345, 'cursor': payload['cursor']}
+
+@pytest.mark.asyncio
+async def test_iter_resources_edge_cases():
+    assert await collect('{}', 1) == ([], {})
+    assert await collect('{"resources": [], "total": 0}', 3) == ([], {'total': 0})
+    with pytest.raises(ValueError):
+        await collect('{"resources": [{"id": "a"} {"id": "b"}]}', 5)
+
+@pytest.mark.asyncio
+async def test_stream_yields_and_indexes_services():
+    async with StubFacilitator(services=300) as facilitator, HTTPTransport() as transport:
+        index = AtlasIndex(facilitator.url, transport=transport)
+        streamed = [s.id async for s in index.stream(limit=300, chunk_size=1024)]
+        listed = await index.discover(category='ai', limit=300)
+    
+    assert streamed == [f'service-{i}' for i in range(300)]
+    assert len(index.services) == 300
+    assert len(listed) == 75
@@ -1,7 +1,19 @@
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Set, Tuple, Iterable, Callable, Awaitable
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+import asyncio
+import hashlib
+import heapq
+import json
+import random
+import time
 import uuid
 import aiohttp
+from atlas_x402.transport import HTTPTransport, get_default_transport
+from atlas_x402.metrics import LEASE_REFRESH_SECONDS, LEASE_REFRESHES, Metrics, get_default_metrics
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+USDC_DECIMALS = 6
 
 @dataclass
 class ServiceRegistrationParams:
@@ -15,26 +27,218 @@ class ServiceRegistrationParams:
     merchant_address: str
     metadata: Optional[Dict[str, Any]] = None
 
+@dataclass
+class RegistrationResult:
+    index: int
+    params: Optional[ServiceRegistrationParams]
+    service_id: str
+    status: Optional[int] = None
+    error: Optional[BaseException] = None
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None
+
+@dataclass
+class ReconcileResult:
+    created: List[RegistrationResult] = field(default_factory=list)
+    updated: List[RegistrationResult] = field(default_factory=list)
+    deleted: List[RegistrationResult] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def failed(self) -> List[RegistrationResult]:
+        return [r for r in self.created + self.updated + self.deleted if not r.ok]
+
+def service_id(merchant_address: str, endpoint: str) -> str:
+    # IDs are derived from the listing's identity, so re-registering the same endpoint is idempotent.
+    if merchant_address.startswith('0x'):
+        merchant_address = merchant_address.lower()
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f'x402:{merchant_address}:{endpoint}'))
+
 class AtlasMesh:
     def __init__(
         self,
         facilitator_url: str,
         merchant_address: str,
-        x402scan_url: Optional[str] = None
+        x402scan_url: Optional[str] = None,
+        transport: Optional[HTTPTransport] = None
     ):
         self.facilitator_url = facilitator_url
         self.merchant_address = merchant_address
         self.x402scan_url = x402scan_url
+        self.transport = transport or get_default_transport()
         self.services: Dict[str, ServiceRegistrationParams] = {}
+        self.leases: Optional['LeaseScheduler'] = None
         
     async def register_service(
         self,
         params: ServiceRegistrationParams
     ) -> Dict[str, Any]:
-        service_id = str(uuid.uuid4())
-        price_micro = str(int(float(params.price) * 1_000_000))
+        registered_id = service_id(params.merchant_address, params.endpoint)
+        await self._register(registered_id, params)
+        
+        return {
+            'service_id': registered_id,
+            'facilitator_url': f"{self.facilitator_url}/discovery/resources/{registered_id}",
+        }
+    
+    async def register_services(
+        self,
+        services: Iterable[ServiceRegistrationParams],
+        concurrency: int = 16,
+        retries: int = 3,
+        backoff: float = 0.1,
+        max_backoff: float = 5.0
+    ) -> List[RegistrationResult]:
+        results = [
+            RegistrationResult(index, params, service_id(params.merchant_address, params.endpoint))
+            for index, params in enumerate(services)
+        ]
+        await self._push(
+            results,
+            lambda result: self._register(result.service_id, result.params),
+            concurrency, retries, backoff, max_backoff
+        )
+        return results
+    
+    async def reconcile(
+        self,
+        services: Iterable[ServiceRegistrationParams],
+        prune: bool = True,
+        page_size: int = 100,
+        concurrency: int = 16,
+        retries: int = 3,
+        backoff: float = 0.1,
+        max_backoff: float = 5.0
+    ) -> ReconcileResult:
+        desired: Dict[str, ServiceRegistrationParams] = {}
+        for params in services:
+            desired[service_id(params.merchant_address, params.endpoint)] = params
+        listed = {
+            resource['id']: listing_hash(resource)
+            for resource in await self.list_registered(page_size)
+        }
+        
+        result = ReconcileResult()
+        for index, (registered_id, params) in enumerate(desired.items()):
+            current = listed.get(registered_id)
+            if current is None:
+                result.created.append(RegistrationResult(index, params, registered_id))
+            elif current != listing_hash(self._registration_data(registered_id, params)):
+                result.updated.append(RegistrationResult(index, params, registered_id))
+            else:
+                result.unchanged.append(registered_id)
+                self.services[registered_id] = params
+        if prune:
+            result.deleted = [
+                RegistrationResult(index, None, registered_id)
+                for index, registered_id in enumerate(i for i in listed if i not in desired)
+            ]
+        
+        await asyncio.gather(
+            self._push(
+                result.created,
+                lambda item: self._register(item.service_id, item.params),
+                concurrency, retries, backoff, max_backoff
+            ),
+            self._push(
+                result.updated,
+                lambda item: self._register(item.service_id, item.params, exists=True),
+                concurrency, retries, backoff, max_backoff
+            ),
+            self._push(
+                result.deleted,
+                lambda item: self._deregister(item.service_id),
+                concurrency, retries, backoff, max_backoff
+            ),
+        )
+        return result
+    
+    async def list_registered(self, page_size: int = 100) -> List[Dict[str, Any]]:
+        resources = []
+        offset = 0
+        while True:
+            async with self.transport.get(
+                f"{self.facilitator_url}/discovery/resources",
+                params={'merchant_address': self.merchant_address, 'limit': page_size, 'offset': offset}
+            ) as response:
+                response.raise_for_status()
+                page = (await response.json()).get('resources', [])
+            # The facilitator may ignore the merchant filter, so ownership is re-checked locally.
+            resources.extend(resource for resource in page if self._owns(resource))
+            if len(page) < page_size:
+                return resources
+            offset += page_size
+    
+    async def _push(
+        self,
+        results: List[RegistrationResult],
+        call: Callable[[RegistrationResult], Awaitable[int]],
+        concurrency: int,
+        retries: int,
+        backoff: float,
+        max_backoff: float
+    ):
+        slots = asyncio.Semaphore(concurrency)
+        
+        async def run(result: RegistrationResult):
+            async with slots:
+                while True:
+                    result.attempts += 1
+                    retry_after = None
+                    try:
+                        result.status = await call(result)
+                    except aiohttp.ClientResponseError as e:
+                        result.status, result.error = e.status, e
+                        retryable = e.status in RETRY_STATUSES
+                        retry_after = e.headers.get('Retry-After') if e.headers else None
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        result.status, result.error = None, e
+                        retryable = True
+                    except Exception as e:
+                        result.error = e
+                        break
+                    else:
+                        result.error = None
+                        break
+                    
+                    if not retryable or result.attempts > retries:
+                        break
+                    await asyncio.sleep(_retry_delay(result.attempts, backoff, max_backoff, retry_after))
+        
+        await asyncio.gather(*[run(result) for result in results])
+    
+    async def _register(self, service_id: str, params: ServiceRegistrationParams, exists: bool = False) -> int:
+        status = await self._register_with_facilitator(self._registration_data(service_id, params), exists)
+        
+        self.services[service_id] = params
+        if self.leases is not None:
+            self.leases.track(service_id)
+        
+        return status
+    
+    async def _deregister(self, service_id: str) -> int:
+        async with self.transport.request(
+            'DELETE',
+            f"{self.facilitator_url}/discovery/resources/{service_id}"
+        ) as response:
+            # Already gone counts as deleted, so retried deletes stay idempotent.
+            if response.status != 404:
+                response.raise_for_status()
+            status = response.status
         
-        registration_data = {
+        self.services.pop(service_id, None)
+        if self.leases is not None:
+            self.leases.untrack(service_id)
+        
+        return status
+    
+    def _registration_data(self, service_id: str, params: ServiceRegistrationParams) -> Dict[str, Any]:
+        price_micro = str(_to_micro_units(params.price))
+        
+        return {
             'id': service_id,
             'name': params.name,
             'description': params.description or '',
@@ -52,15 +256,15 @@ class AtlasMesh:
             }],
             'metadata': params.metadata or {},
         }
-        
-        await self._register_with_facilitator(registration_data)
-        
-        self.services[service_id] = params
-        
-        return {
-            'service_id': service_id,
-            'facilitator_url': f"{self.facilitator_url}/discovery/resources/{service_id}",
-        }
+    
+    def _owns(self, resource: Dict[str, Any]) -> bool:
+        merchant = self.merchant_address.lower()
+        if str(resource.get('merchant_address') or '').lower() == merchant:
+            return True
+        return any(
+            str(accept.get('payTo', accept.get('pay_to')) or '').lower() == merchant
+            for accept in resource.get('accepts') or []
+        )
     
     def _get_asset_address(self, network: str) -> str:
         if network == 'base':
@@ -68,15 +272,248 @@ class AtlasMesh:
         else:
             return 'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v'
     
-    async def _register_with_facilitator(self, data: Dict[str, Any]):
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.facilitator_url}/discovery/resources",
-                json=data
-            ) as response:
+    async def _register_with_facilitator(self, data: Dict[str, Any], exists: bool = False) -> int:
+        # Listings expected to exist are replaced in place; new ones are created. Either way a
+        # listing in the other state falls through to the other call, so the content always lands.
+        # A conflict is never success on its own, since the stored listing may be stale.
+        if exists:
+            status = await self._put_listing(data)
+            return status if status != 404 else await self._post_listing(data, raise_conflict=True)
+        status = await self._post_listing(data)
+        return status if status != 409 else await self._put_listing(data, raise_missing=True)
+    
+    async def _post_listing(self, data: Dict[str, Any], raise_conflict: bool = False) -> int:
+        async with self.transport.post(
+            f"{self.facilitator_url}/discovery/resources",
+            json=data
+        ) as response:
+            if response.status != 409 or raise_conflict:
+                response.raise_for_status()
+            return response.status
+    
+    async def _put_listing(self, data: Dict[str, Any], raise_missing: bool = False) -> int:
+        async with self.transport.request(
+            'PUT',
+            f"{self.facilitator_url}/discovery/resources/{data['id']}",
+            json=data
+        ) as response:
+            if response.status != 404 or raise_missing:
                 response.raise_for_status()
+            return response.status
 
+class LeaseScheduler:
+    def __init__(
+        self,
+        mesh: AtlasMesh,
+        ttl: float = 3_600.0,
+        refresh_ratio: float = 0.8,
+        jitter: float = 0.1,
+        concurrency: int = 8,
+        backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        metrics: Optional[Metrics] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.mesh = mesh
+        self.ttl = ttl
+        self.refresh_ratio = refresh_ratio
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.metrics = metrics or get_default_metrics()
+        self.clock = clock
+        # Refreshes are kept in a heap of (due, sequence, service_id); rescheduled or dropped leases
+        # leave stale entries behind that are skipped when they reach the top.
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}
+        self._expires: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+        self._sequence = 0
+        self._pause = 0.0
+        self._paused_until = 0.0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self.refreshed = 0
+        self.failed = 0
+        self.throttled = 0
+        self.refresh_seconds = 0.0
+
+    async def start(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.concurrency)
+        self.mesh.leases = self
+        # Services registered before the scheduler started have unknown ages, so their first
+        # refreshes are spread across one refresh period instead of all firing at once.
+        now = self.clock()
+        for service_id in self.mesh.services:
+            if service_id not in self._due:
+                self._expires[service_id] = now + self.ttl
+                self._schedule(service_id, now + random.uniform(0, self.ttl * self.refresh_ratio))
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        tasks = list(self._inflight)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.mesh.leases is self:
+            self.mesh.leases = None
+
+    async def __aenter__(self) -> 'LeaseScheduler':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def track(self, service_id: str):
+        now = self.clock()
+        self._expires[service_id] = now + self.ttl
+        self._failures.pop(service_id, None)
+        self._schedule(service_id, now + self.ttl * self.refresh_ratio - random.uniform(0, self.ttl * self.jitter))
 
+    def untrack(self, service_id: str):
+        self._due.pop(service_id, None)
+        self._expires.pop(service_id, None)
+        self._failures.pop(service_id, None)
+
+    def _schedule(self, service_id: str, due: float):
+        self._due[service_id] = due
+        heapq.heappush(self._heap, (due, self._sequence, service_id))
+        self._sequence += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _next_delay(self, now: float) -> Optional[float]:
+        heap = self._heap
+        while heap and self._due.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return max(heap[0][0], self._paused_until) - now
+
+    async def _run(self):
+        while True:
+            delay = self._next_delay(self.clock())
+            if delay is None or delay > 0:
+                waiter = asyncio.ensure_future(self._wakeup.wait())
+                try:
+                    await asyncio.wait({waiter}, timeout=delay)
+                finally:
+                    waiter.cancel()
+                self._wakeup.clear()
+                continue
+            
+            await self._slots.acquire()
+            delay = self._next_delay(self.clock())
+            if delay is None or delay > 0:
+                # The schedule changed while waiting for a slot.
+                self._slots.release()
+                continue
+            _, _, service_id = heapq.heappop(self._heap)
+            del self._due[service_id]
+            task = asyncio.ensure_future(self._refresh(service_id))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _refresh(self, service_id: str):
+        try:
+            params = self.mesh.services.get(service_id)
+            if params is None:
+                self.untrack(service_id)
+                return
+            started = self.clock()
+            try:
+                with self.metrics.span('atlas.mesh.lease_refresh', LEASE_REFRESH_SECONDS):
+                    await self.mesh._register(service_id, params, exists=True)
+            except aiohttp.ClientResponseError as e:
+                retry_after = e.headers.get('Retry-After') if e.headers else None
+                self._failed(service_id, e.status in RETRY_STATUSES, retry_after)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self._failed(service_id, True, None)
+            except Exception:
+                self._failed(service_id, False, None)
+            else:
+                self.refreshed += 1
+                self.refresh_seconds += self.clock() - started
+                self.metrics.inc(LEASE_REFRESHES, outcome='refreshed')
+                # Each success halves the shared delay, so throughput recovers once pushback stops.
+                self._pause = self._pause / 2 if self._pause > self.backoff else 0.0
+        finally:
+            self._slots.release()
+
+    def _failed(self, service_id: str, pushback: bool, retry_after: Optional[str]):
+        now = self.clock()
+        self.failed += 1
+        failures = self._failures[service_id] = self._failures.get(service_id, 0) + 1
+        if pushback:
+            # The facilitator is shedding load, so every refresh slows down rather than just this one.
+            self.throttled += 1
+            self._pause = min(self.max_backoff, max(self.backoff, self._pause * 2))
+            if retry_after and retry_after.isdigit():
+                self._pause = max(self._pause, min(self.max_backoff, float(retry_after)))
+            self._paused_until = max(self._paused_until, now + self._pause)
+        self.metrics.inc(LEASE_REFRESHES, outcome='throttled' if pushback else 'failed')
+        if service_id in self._expires:
+            self._schedule(service_id, now + _retry_delay(failures, self.backoff, self.max_backoff, retry_after))
+
+    def stats(self) -> Dict[str, Any]:
+        now = self.clock()
+        return {
+            'leases': len(self._expires),
+            'expired': sum(1 for expires in self._expires.values() if expires <= now),
+            'inflight': len(self._inflight),
+            'refreshed': self.refreshed,
+            'failed': self.failed,
+            'throttled': self.throttled,
+            'backoff': self._pause,
+            'mean_refresh_seconds': self.refresh_seconds / self.refreshed if self.refreshed else 0.0,
+        }
 
+def listing_hash(resource: Dict[str, Any]) -> str:
+    # Listings may come back with snake_case payment fields, so both shapes hash the same.
+    accepts = [{
+        'asset': accept.get('asset'),
+        'payTo': accept.get('payTo', accept.get('pay_to')),
+        'network': accept.get('network'),
+        'maxAmountRequired': accept.get('maxAmountRequired', accept.get('max_amount_required')),
+        'scheme': accept.get('scheme'),
+        'mimeType': accept.get('mimeType', accept.get('mime_type')),
+    } for accept in resource.get('accepts') or []]
+    content = {
+        'id': resource.get('id'),
+        'name': resource.get('name'),
+        'description': resource.get('description') or '',
+        'endpoint': resource.get('endpoint'),
+        'category': resource.get('category'),
+        'network': resource.get('network'),
+        'accepts': accepts,
+        'metadata': resource.get('metadata') or {},
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
 
+def _to_micro_units(price: str, decimals: int = USDC_DECIMALS) -> int:
+    try:
+        value = Decimal(str(price).strip())
+    except InvalidOperation:
+        raise ValueError(f'Invalid price: {price!r}')
+    if not value.is_finite() or value < 0:
+        raise ValueError(f'Invalid price: {price!r}')
+    units = value.scaleb(decimals)
+    if units != units.to_integral_value():
+        raise ValueError(f'Price {price!r} has more than {decimals} decimal places')
+    return int(units)
 
+def _retry_delay(attempt: int, backoff: float, max_backoff: float, retry_after: Optional[str] = None) -> float:
+    if retry_after and retry_after.isdigit():
+        return min(max_backoff, float(retry_after))
+    delay = min(max_backoff, backoff * 2 ** (attempt - 1))
+    return random.uniform(delay / 2, delay)
@@ -0,0 +1,152 @@
+import asyncio
+import pytest
+from atlas_x402.transport import HTTPTransport
+from atlas_x402.metrics import LEASE_REFRESH_SECONDS, LEASE_REFRESHES, Metrics
+from atlas_x402.benchmarks.stubs import StubFacilitator
+from atlas_mesh.core.mesh import AtlasMesh, LeaseScheduler, ServiceRegistrationParams, service_id
+
+MERCHANT = '0x8bee703d6214a266e245b0537085b1021e1ccaed'
+
+def params(i, price='0.10'):
+    return ServiceRegistrationParams(
+        name=f'Service {i}',
+        description=None,
+        endpoint=f'https://api.example.com/{i}',
+        category='Data',
+        price=price,
+        network='base',
+        scheme='x402+eip712',
+        merchant_address=MERCHANT,
+    )
+
+def test_service_ids_are_deterministic():
+    assert service_id(MERCHANT, 'https://a.example.com') == service_id(MERCHANT.upper().replace('0X', '0x'), 'https://a.example.com')
+    assert service_id(MERCHANT, 'https://a.example.com') != service_id(MERCHANT, 'https://b.example.com')
+
+@pytest.mark.asyncio
+async def test_bulk_registration_retries_and_is_idempotent():
+    async with StubFacilitator(services=0, failure_rate=0.3, seed=7) as facilitator, HTTPTransport() as transport:
+        mesh = AtlasMesh(facilitator.url, MERCHANT, transport=transport)
+        services = [params(i) for i in range(50)] + [params('bad', price='free')]
+        
+        results = await mesh.register_services(services, concurrency=8, retries=10, backoff=0.001)
+        
+        assert [r.index for r in results] == list(range(51))
+        assert all(r.ok for r in results[:50])
+        assert any(r.attempts > 1 for r in results)
+        assert not results[50].ok and isinstance(results[50].error, ValueError) and results[50].attempts == 1
+        assert len(facilitator.resources) == 50
+        assert len(mesh.services) == 50
+        
+        again = await mesh.register_services(services[:50], retries=10, backoff=0.001)
+        assert [r.service_id for r in again] == [r.service_id for r in results[:50]]
+        assert len(facilitator.resources) == 50
+
+@pytest.mark.asyncio
+async def test_bulk_registration_reports_exhausted_retries():
+    async with StubFacilitator(services=0, failure_rate=1.0) as facilitator, HTTPTransport() as transport:
+        mesh = AtlasMesh(facilitator.url, MERCHANT, transport=transport)
+        
+        results = await mesh.register_services([params(1)], retries=2, backoff=0.001)
+        
+        assert results[0].status == 503 and results[0].attempts == 3 and not results[0].ok
+        assert mesh.services == {}
+
+@pytest.mark.asyncio
+async def test_reconcile_pushes_only_changes():
+    async with StubFacilitator(services=20) as facilitator, HTTPTransport() as transport:
+        mesh = AtlasMesh(facilitator.url, MERCHANT, transport=transport)
+        await mesh.register_services([params(i) for i in range(10)])
+        posted = facilitator.registrations
+        
+        fresh = AtlasMesh(facilitator.url, MERCHANT, transport=transport)
+        desired = [params(i) for i in range(1, 10)] + [params(10)]
+        desired[0] = params(1, price='0.25')
+        result = await fresh.reconcile(desired, page_size=4)
+        
+        assert [r.service_id for r in result.created] == [service_id(MERCHANT, 'https://api.example.com/10')]
+        assert [r.service_id for r in result.updated] == [service_id(MERCHANT, 'https://api.example.com/1')]
+        assert [r.service_id for r in result.deleted] == [service_id(MERCHANT, 'https://api.example.com/0')]
+        assert len(result.unchanged) == 8 and result.failed == []
+        assert facilitator.registrations == posted + 2
+        assert len(facilitator.resources) == 30
+        assert set(fresh.services) == {service_id(MERCHANT, p.endpoint) for p in desired}
+        
+        again = await fresh.reconcile(desired)
+        assert (again.created, again.updated, again.deleted) == ([], [], [])
+        assert facilitator.registrations == posted + 2
+
+@pytest.mark.asyncio
+async def test_leases_are_refreshed_before_expiry():
+    async with StubFacilitator(services=0) as facilitator, HTTPTransport() as transport:
+        mesh = AtlasMesh(facilitator.url, MERCHANT, transport=transport)
+        await mesh.register_services([params(i) for i in range(20)])
+        metrics = Metrics(enabled=True)
+        
+        async with LeaseScheduler(mesh, ttl=0.2, refresh_ratio=0.5, jitter=0.1, metrics=metrics) as leases:
+            await asyncio.sleep(0.5)
+            stats = leases.stats()
+        
+        assert stats['leases'] == 20 and stats['expired'] == 0 and stats['failed'] == 0
+        assert stats['refreshed'] >= 40
+        assert metrics.counter(LEASE_REFRESHES, outcome='refreshed') == stats['refreshed']
+        assert metrics.histogram(LEASE_REFRESH_SECONDS)['count'] == stats['refreshed']
+        assert mesh.leases is None
+
+@pytest.mark.asyncio
+async def test_leases_back_off_when_the_facilitator_pushes_back():
+    async with StubFacilitator(services=0) as facilitator, HTTPTransport() as transport:
+        mesh = AtlasMesh(facilitator.url, MERCHANT, transport=transport)
+        await mesh.register_services([params(i) for i in range(10)])
+        facilitator.failure_rate, facilitator.failure_status = 1.0, 429
+        registrations = facilitator.requests
+        
+        leases = LeaseScheduler(mesh, ttl=0.1, refresh_ratio=0.5, backoff=0.05, max_backoff=0.2, metrics=Metrics())
+        async with leases:
+            await asyncio.sleep(0.5)
+            throttled = leases.stats()
+            assert throttled['throttled'] > 0 and throttled['backoff'] > 0
+            # Without the shared backoff, ten 50ms leases would make about a hundred attempts here.
+            assert facilitator.requests - registrations < 40
+            
+            facilitator.failure_rate = 0.0
+            await asyncio.sleep(0.6)
+            recovered = leases.stats()
+        
+        assert recovered['refreshed'] >= 10 and recovered['backoff'] == 0.0
+
+@pytest.mark.asyncio
+async def test_updates_land_when_the_facilitator_rejects_duplicates():
+    async with StubFacilitator(services=0, conflict_on_duplicate=True) as facilitator, HTTPTransport() as transport:
+        mesh = AtlasMesh(facilitator.url, MERCHANT, transport=transport)
+        await mesh.register_services([params(i) for i in range(3)])
+        
+        again = await mesh.register_services([params(0, price='0.20')])
+        assert again[0].ok and again[0].status == 200
+        
+        result = await mesh.reconcile([params(0, price='0.20'), params(1, price='0.30'), params(2)])
+        assert [r.service_id for r in result.updated] == [service_id(MERCHANT, 'https://api.example.com/1')]
+        assert result.failed == []
+        prices = {r['endpoint']: r['accepts'][0]['maxAmountRequired'] for r in facilitator.resources}
+        assert prices == {
+            'https://api.example.com/0': '200000',
+            'https://api.example.com/1': '300000',
+            'https://api.example.com/2': '100000',
+        }
+        
+        # A listing that lapsed on the facilitator is re-created by the next refresh.
+        facilitator.resources = [r for r in facilitator.resources if r['endpoint'] != 'https://api.example.com/2']
+        async with LeaseScheduler(mesh, ttl=0.1, refresh_ratio=0.5, metrics=Metrics()) as leases:
+            await asyncio.sleep(0.2)
+            stats = leases.stats()
+        assert stats['failed'] == 0 and stats['refreshed'] >= 3
+        assert len(facilitator.resources) == 3
+
+def test_registration_prices_are_converted_exactly():
+    mesh = AtlasMesh('http://facilitator', MERCHANT)
+    data = mesh._registration_data('svc', params(0, price='0.29'))
+    assert data['accepts'][0]['maxAmountRequired'] == '290000'
+    
+    for price in ['0.0000001', '-1', 'NaN']:
+        with pytest.raises(ValueError):
+            mesh._registration_data('svc', params(0, price=price))
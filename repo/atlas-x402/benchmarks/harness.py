@@ -0,0 +1,132 @@
+from typing import Dict, Any, Optional, List, Callable, Awaitable
+from dataclasses import dataclass, field, asdict
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+@dataclass
+class LoadResult:
+    scenario: str
+    requests: int
+    errors: int
+    concurrency: int
+    duration: float
+    rps: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+    rss_mb: float
+    peak_rss_mb: float
+    params: Dict[str, Any] = field(default_factory=dict)
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return peak_rss_bytes()
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+async def run_load(
+    scenario: str,
+    request: Callable[[int], Awaitable[Any]],
+    requests: int = 1_000,
+    concurrency: int = 50,
+    warmup: int = 0,
+    params: Optional[Dict[str, Any]] = None
+) -> LoadResult:
+    for i in range(warmup):
+        try:
+            await request(-1 - i)
+        except Exception:
+            pass
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                await request(i)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return LoadResult(
+        scenario=scenario,
+        requests=requests,
+        errors=errors,
+        concurrency=concurrency,
+        duration=round(duration, 4),
+        rps=round(requests / duration, 1) if duration else 0.0,
+        p50_ms=round(percentile(latencies, 0.50) * 1000, 3),
+        p90_ms=round(percentile(latencies, 0.90) * 1000, 3),
+        p99_ms=round(percentile(latencies, 0.99) * 1000, 3),
+        max_ms=round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        rss_mb=round(rss_bytes() / 2 ** 20, 1),
+        peak_rss_mb=round(peak_rss_bytes() / 2 ** 20, 1),
+        params=params or {},
+    )
+
+def save_results(results: List[LoadResult], path: str) -> Dict[str, Any]:
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [asdict(result) for result in results],
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float = 0.10
+) -> List[str]:
+    previous = {result['scenario']: result for result in baseline.get('results', [])}
+    regressions = []
+    for result in current.get('results', []):
+        before = previous.get(result['scenario'])
+        if before is None:
+            continue
+        if before['rps'] and result['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: rps {before['rps']} -> {result['rps']}")
+        if before['p99_ms'] and result['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: p99 {before['p99_ms']}ms -> {result['p99_ms']}ms")
+        if before['peak_rss_mb'] and result['peak_rss_mb'] > before['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: peak rss {before['peak_rss_mb']}MB -> {result['peak_rss_mb']}MB")
+    return regressions
+
+def format_result(result: LoadResult) -> str:
+    return (
+        f'{result.scenario:<24} {result.rps:>10.1f} req/s  '
+        f'p50 {result.p50_ms:>8.2f}ms  p99 {result.p99_ms:>8.2f}ms  '
+        f'errors {result.errors:>5}  rss {result.rss_mb:>7.1f}MB'
+    )
@@ -0,0 +1,360 @@
+from typing import Dict, Any, List, Callable, Awaitable
+import argparse
+import asyncio
+import base64
+import gc
+import importlib
+import json
+import os
+import sys
+import time
+from atlas_x402.benchmarks.harness import (
+    LoadResult, compare_results, format_result, peak_rss_bytes, rss_bytes, run_load, save_results
+)
+from atlas_x402.benchmarks.stubs import StubEVMRPC, StubFacilitator, StubPaywall, StubSolanaRPC
+from atlas_x402.eip712 import keccak256, private_key_to_address, sign_typed_data, transfer_with_authorization
+from atlas_x402.rpc import RPCClient
+from atlas_x402.transport import HTTPTransport, TransportConfig
+
+MERCHANT = '0x8bee703d6214a266e245b0537085b1021e1ccaed'
+USDC = '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913'
+
+def _requirements(scheme: str = 'x402+eip712', network: str = 'base') -> Dict[str, Any]:
+    return {
+        'scheme': scheme,
+        'network': network,
+        'maxAmountRequired': '50000',
+        'payTo': MERCHANT,
+        'asset': USDC,
+        'maxTimeoutSeconds': 60,
+        'extra': {'name': 'USDC', 'version': '2'},
+    }
+
+def _transaction_payload(i: int, scheme: str = 'x402+eip712', network: str = 'base') -> Dict[str, Any]:
+    unique = keccak256(f'{time.time_ns()}:{i}'.encode()).hex()
+    payload = {'transactionHash': '0x' + unique} if scheme == 'x402+eip712' else {'signature': unique}
+    return {'x402Version': 1, 'scheme': scheme, 'network': network, 'payload': payload}
+
+def presign_authorizations(count: int, payers: int = 32) -> List[str]:
+    keys = [keccak256(f'bench-payer-{i}'.encode()) for i in range(payers)]
+    addresses = [private_key_to_address(key) for key in keys]
+    now = int(time.time())
+    headers = []
+    for i in range(count):
+        authorization = {
+            'from': addresses[i % payers],
+            'to': MERCHANT,
+            'value': '50000',
+            'validAfter': str(now - 10),
+            'validBefore': str(now + 110),
+            'nonce': '0x' + keccak256(f'{now}:{i}'.encode()).hex(),
+        }
+        typed_data = transfer_with_authorization(authorization, asset=USDC, network='base')
+        payment = {
+            'x402Version': 1,
+            'scheme': 'x402+eip712',
+            'network': 'base',
+            'payload': {
+                'signature': sign_typed_data(typed_data, keys[i % payers]),
+                'authorization': authorization,
+            },
+        }
+        headers.append(base64.b64encode(json.dumps(payment).encode()).decode())
+    return headers
+
+async def verify_facilitator(args) -> LoadResult:
+    from atlas_x402.server.core.verification import verify_payment
+
+    async with StubFacilitator(**_stub_options(args)) as facilitator:
+        async with HTTPTransport(TransportConfig(limit=0, limit_per_host=0)) as transport:
+            requirements = _requirements()
+
+            async def request(i: int):
+                await verify_payment(_transaction_payload(i), requirements, facilitator_url=facilitator.url, transport=transport)
+
+            result = await _run('verify-facilitator', request, args)
+            result.extra['upstream_requests'] = facilitator.requests
+            return result
+
+async def verify_rpc(args) -> LoadResult:
+    from atlas_x402.server.core.verification import verify_payment
+
+    async with StubEVMRPC(**_stub_options(args)) as primary, StubEVMRPC(**_stub_options(args, 1)) as secondary, \
+            StubSolanaRPC(**_stub_options(args)) as solana:
+        async with HTTPTransport(TransportConfig(limit=0, limit_per_host=0)) as transport:
+            rpc = RPCClient({'base': [primary.url, secondary.url], 'solana': [solana.url]}, transport=transport)
+            evm, sol = _requirements(), _requirements('x402+solana', 'solana')
+
+            async def request(i: int):
+                if i % 2:
+                    await verify_payment(_transaction_payload(i, 'x402+solana', 'solana'), sol, rpc=rpc, transport=transport)
+                else:
+                    await verify_payment(_transaction_payload(i), evm, rpc=rpc, transport=transport)
+
+            result = await _run('verify-rpc', request, args)
+            result.extra['hedged'] = rpc.hedged
+            result.extra['endpoints'] = rpc.stats()
+            return result
+
+async def verify_batched(args) -> LoadResult:
+    from atlas_x402.server.core.batching import BatchVerifier
+
+    async with StubEVMRPC(**_stub_options(args)) as node:
+        async with HTTPTransport(TransportConfig(limit=0, limit_per_host=0)) as transport:
+            verifier = BatchVerifier(transport=transport, rpc=RPCClient({'base': [node.url]}, transport=transport))
+            requirements = _requirements()
+
+            async def request(i: int):
+                await verifier.verify(_transaction_payload(i), requirements)
+
+            result = await _run('verify-batched', request, args)
+            result.extra['upstream_requests'] = node.requests
+            result.extra['batches'] = verifier.batches_sent
+            return result
+
+async def fetch(args) -> LoadResult:
+    from atlas_x402.client.fetch import x402_fetch
+
+    async with StubPaywall(**_stub_options(args)) as paywall:
+        async with HTTPTransport(TransportConfig(limit=0, limit_per_host=0)) as transport:
+
+            async def request(i: int):
+                response = await x402_fetch(f'{paywall.url}/resource', 'base', transport=transport)
+                if response.status != 200:
+                    raise Exception(f'Unexpected status {response.status}')
+
+            result = await _run('fetch', request, args)
+            result.extra['upstream_requests'] = paywall.requests
+            return result
+
+async def discover(args) -> LoadResult:
+    from atlas_index.core.index import AtlasIndex
+
+    async with StubFacilitator(services=args.services, **_stub_options(args)) as facilitator:
+        async with HTTPTransport(TransportConfig(limit=0, limit_per_host=0)) as transport:
+            index = AtlasIndex(facilitator.url, transport=transport)
+
+            async def request(i: int):
+                await index.discover(limit=100, offset=(i * 100) % max(1, args.services))
+
+            return await _run('discover', request, args)
+
+async def discover_page(args, stream: bool) -> LoadResult:
+    from atlas_index.core.index import parse_service
+    from atlas_index.core.stream import iter_resources
+
+    async with StubFacilitator(services=args.services, **_stub_options(args)) as facilitator:
+        async with HTTPTransport(TransportConfig(limit=0, limit_per_host=0, total_timeout=300)) as transport:
+            url = f'{facilitator.url}/discovery/resources'
+            params = {'limit': args.services}
+
+            # Each request decodes the whole listing as one page. Services are dropped as soon as they
+            # are built, so peak RSS reflects decoding rather than whatever the caller keeps.
+            async def request(i: int):
+                async with transport.get(url, params=params) as response:
+                    if stream:
+                        async for resource in iter_resources(response):
+                            parse_service(resource)
+                    else:
+                        data = await response.json()
+                        services = [parse_service(resource) for resource in data['resources']]
+                        del data, services
+
+            before = peak_rss_bytes()
+            result = await _run('discover-stream' if stream else 'discover-json', request, args)
+            result.params['services'] = args.services
+            result.extra['services_per_second'] = round(result.rps * args.services)
+            result.extra['peak_rss_growth_mb'] = round((peak_rss_bytes() - before) / 2 ** 20, 1)
+            return result
+
+SEARCH_QUERIES = (
+    'weather forecast',
+    'image generation',
+    'token price',
+    'translate text',
+    'speech transcription',
+    'histor',
+    'semantic search embeddings',
+    'flight',
+)
+
+async def search(args) -> LoadResult:
+    from atlas_index.core.index import parse_service
+    from atlas_index.core.search import SearchIndex
+    from atlas_x402.benchmarks.stubs import _stub_resource
+
+    before = rss_bytes()
+    started = time.perf_counter()
+    text = SearchIndex()
+    text.update(parse_service(_stub_resource(i)) for i in range(args.services))
+    build_seconds = time.perf_counter() - started
+
+    async def request(i: int):
+        text.search(SEARCH_QUERIES[i % len(SEARCH_QUERIES)], limit=10)
+
+    result = await _run('search', request, args)
+    result.params['services'] = args.services
+    result.extra.update(text.stats())
+    result.extra['build_seconds'] = round(build_seconds, 3)
+    result.extra['index_mb'] = round((rss_bytes() - before) / 2 ** 20, 1)
+    return result
+
+async def search_update(args) -> LoadResult:
+    from atlas_index.core.index import parse_service
+    from atlas_index.core.search import SearchIndex
+    from atlas_x402.benchmarks.stubs import _stub_resource
+
+    text = SearchIndex()
+    services = [parse_service(_stub_resource(i)) for i in range(args.services)]
+    text.update(services)
+
+    # Re-adding a listed service replaces it, which is what a catalog refresh does for every change.
+    async def request(i: int):
+        text.add(services[(i * 7_919) % len(services)])
+
+    result = await _run('search-update', request, args)
+    result.params['services'] = args.services
+    result.extra.update(text.stats())
+    return result
+
+async def catalog(args, compact: bool) -> LoadResult:
+    from atlas_index.core.index import parse_service
+    from atlas_index.core.compact import CompactStore
+    from atlas_x402.benchmarks.stubs import _stub_resource
+
+    gc.collect()
+    before = rss_bytes()
+    started = time.perf_counter()
+    services = CompactStore() if compact else {}
+    for i in range(args.services):
+        service = parse_service(_stub_resource(i))
+        services[service.id] = service
+    build_seconds = time.perf_counter() - started
+    gc.collect()
+    size = rss_bytes() - before
+
+    async def request(i: int):
+        services[f'service-{(i * 7_919) % args.services}']
+
+    name = 'catalog-compact' if compact else 'catalog-dict'
+    result = await _run(name, request, args)
+    result.params['services'] = args.services
+    result.extra['build_seconds'] = round(build_seconds, 3)
+    result.extra['store_mb'] = round(size / 2 ** 20, 1)
+    result.extra['bytes_per_service'] = round(size / max(1, args.services))
+    return result
+
+async def server(args) -> LoadResult:
+    import uvicorn
+
+    async with StubFacilitator(**_stub_options(args)) as facilitator:
+        os.environ['X402_FACILITATOR_URL'] = facilitator.url
+        example = importlib.import_module('atlas_x402.examples.server.fastapi')
+        config = uvicorn.Config(example.app, host='127.0.0.1', port=0, log_level='warning', lifespan='on')
+        uvicorn_server = uvicorn.Server(config)
+        serving = asyncio.ensure_future(uvicorn_server.serve())
+        while not uvicorn_server.started:
+            if serving.done():
+                serving.result()
+            await asyncio.sleep(0.01)
+        port = uvicorn_server.servers[0].sockets[0].getsockname()[1]
+        url = f'http://127.0.0.1:{port}/api/weather'
+
+        headers = presign_authorizations(args.requests + args.warmup, args.payers) if args.paid else []
+        try:
+            async with HTTPTransport(TransportConfig(limit=0, limit_per_host=0)) as transport:
+
+                # Warmup requests use negative indices, which pick the trailing pre-signed headers.
+                async def request(i: int):
+                    payment = {'x-payment': headers[i]} if headers else {}
+                    async with transport.get(url, headers=payment) as response:
+                        await response.read()
+                        if response.status != (200 if headers else 402):
+                            raise Exception(f'Unexpected status {response.status}')
+
+                result = await _run('server-paid' if args.paid else 'server-challenge', request, args)
+                await example.settler.drain()
+                result.extra['settler'] = example.settler.stats()
+                result.extra['settlements'] = facilitator.requests
+                return result
+        finally:
+            uvicorn_server.should_exit = True
+            await serving
+
+SCENARIOS: Dict[str, Callable[[argparse.Namespace], Awaitable[LoadResult]]] = {
+    'verify-facilitator': verify_facilitator,
+    'verify-rpc': verify_rpc,
+    'verify-batched': verify_batched,
+    'fetch': fetch,
+    'discover': discover,
+    'discover-json': lambda args: discover_page(args, stream=False),
+    'discover-stream': lambda args: discover_page(args, stream=True),
+    'search': search,
+    'search-update': search_update,
+    'catalog-dict': lambda args: catalog(args, compact=False),
+    'catalog-compact': lambda args: catalog(args, compact=True),
+    'server': server,
+}
+
+def _stub_options(args, seed_offset: int = 0) -> Dict[str, Any]:
+    return {
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'failure_rate': args.failure_rate,
+        'seed': args.seed + seed_offset,
+    }
+
+async def _run(name: str, request, args) -> LoadResult:
+    params = {
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'failure_rate': args.failure_rate,
+    }
+    return await run_load(name, request, args.requests, args.concurrency, args.warmup, params)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Load-test x402 against local facilitator and RPC stand-ins.')
+    parser.add_argument('scenarios', nargs='*', help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--requests', type=int, default=2_000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.005, help='stub latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra uniform stub latency in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of stub requests that fail')
+    parser.add_argument('--seed', type=int, default=402)
+    parser.add_argument('--services', type=int, default=10_000, help='services served by the discovery stub')
+    parser.add_argument('--payers', type=int, default=32, help='distinct payer keys for the paid server scenario')
+    parser.add_argument('--unpaid', dest='paid', action='store_false', help='measure 402 challenges instead of paid requests')
+    parser.add_argument('--output', default='benchmarks/results/latest.json')
+    parser.add_argument('--baseline', help='previous results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    return parser
+
+async def run(args: argparse.Namespace) -> List[LoadResult]:
+    results = []
+    for name in args.scenarios or list(SCENARIOS):
+        result = await SCENARIOS[name](args)
+        print(format_result(result))
+        results.append(result)
+    return results
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)}")
+    results = asyncio.run(run(args))
+    report = save_results(results, args.output)
+    print(f'Saved results to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_results(json.load(f), report, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,295 @@
+from typing import Dict, Any, Optional
+from abc import ABC, abstractmethod
+import asyncio
+import base64
+import json
+import random
+from aiohttp import web
+
+class StubServer(ABC):
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_status: int = 503,
+        seed: Optional[int] = None,
+        host: str = '127.0.0.1',
+        port: int = 0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.failures = 0
+        self.url: Optional[str] = None
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+
+    @abstractmethod
+    def routes(self, app: web.Application):
+        ...
+
+    async def start(self) -> str:
+        app = web.Application()
+        self.routes(app)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        self.url = f'http://{self.host}:{self.port}'
+        return self.url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def inject(self) -> Optional[web.Response]:
+        self.requests += 1
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            self.failures += 1
+            return web.Response(status=self.failure_status)
+        return None
+
+    def roll(self, rate: float) -> bool:
+        return bool(rate) and self._random.random() < rate
+
+class StubFacilitator(StubServer):
+    def __init__(self, invalid_rate: float = 0.0, services: int = 1_000, conflict_on_duplicate: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.invalid_rate = invalid_rate
+        self.conflict_on_duplicate = conflict_on_duplicate
+        self.resources = [_stub_resource(i) for i in range(services)]
+        self.revision = 0
+        self.registrations = 0
+
+    def routes(self, app: web.Application):
+        app.router.add_post('/verify', self.verify)
+        app.router.add_post('/settle', self.settle)
+        app.router.add_get('/discovery/resources', self.discovery)
+        app.router.add_post('/discovery/resources', self.register)
+        app.router.add_put('/discovery/resources/{id}', self.replace)
+        app.router.add_delete('/discovery/resources/{id}', self.deregister)
+
+    async def verify(self, request: web.Request) -> web.Response:
+        failure = await self.inject()
+        if failure is not None:
+            return failure
+        await request.read()
+        if self.roll(self.invalid_rate):
+            return web.json_response({'isValid': False, 'invalidReason': 'Injected failure'})
+        return web.json_response({'isValid': True, 'invalidReason': None})
+
+    async def settle(self, request: web.Request) -> web.Response:
+        failure = await self.inject()
+        if failure is not None:
+            return failure
+        await request.read()
+        if self.roll(self.invalid_rate):
+            return web.json_response({'success': False, 'error': 'Injected failure'})
+        return web.json_response({
+            'success': True,
+            'error': None,
+            'txHash': '0x' + '00' * 32,
+            'networkId': 'base',
+        })
+
+    async def discovery(self, request: web.Request) -> web.Response:
+        failure = await self.inject()
+        if failure is not None:
+            return failure
+        etag = f'"{self.revision}"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        resources = self.resources
+        for field in ('category', 'network', 'merchant_address'):
+            if request.query.get(field):
+                resources = [r for r in resources if r.get(field) == request.query[field]]
+        offset = int(request.query.get('offset', 0))
+        limit = int(request.query.get('limit', 100))
+        return web.json_response({
+            'resources': resources[offset:offset + limit],
+            'total': len(resources),
+        }, headers={'ETag': etag})
+
+    async def register(self, request: web.Request) -> web.Response:
+        failure = await self.inject()
+        if failure is not None:
+            return failure
+        resource = await request.json()
+        self.registrations += 1
+        for i, existing in enumerate(self.resources):
+            if existing['id'] == resource['id']:
+                if self.conflict_on_duplicate:
+                    return web.json_response({'error': 'Already registered'}, status=409)
+                self.revision += 1
+                self.resources[i] = resource
+                return web.json_response({'id': resource['id']})
+        self.revision += 1
+        self.resources.append(resource)
+        return web.json_response({'id': resource['id']}, status=201)
+
+    async def replace(self, request: web.Request) -> web.Response:
+        failure = await self.inject()
+        if failure is not None:
+            return failure
+        resource = dict(await request.json(), id=request.match_info['id'])
+        self.registrations += 1
+        for i, existing in enumerate(self.resources):
+            if existing['id'] == resource['id']:
+                self.resources[i] = resource
+                self.revision += 1
+                return web.json_response({'id': resource['id']})
+        return web.json_response({'error': 'Not found'}, status=404)
+
+    async def deregister(self, request: web.Request) -> web.Response:
+        failure = await self.inject()
+        if failure is not None:
+            return failure
+        remaining = [r for r in self.resources if r['id'] != request.match_info['id']]
+        if len(remaining) == len(self.resources):
+            return web.json_response({'error': 'Not found'}, status=404)
+        self.resources = remaining
+        self.revision += 1
+        return web.json_response({'id': request.match_info['id']})
+
+class StubEVMRPC(StubServer):
+    def __init__(self, invalid_rate: float = 0.0, block_number: int = 1_000, **kwargs):
+        super().__init__(**kwargs)
+        self.invalid_rate = invalid_rate
+        self.block_number = block_number
+
+    def routes(self, app: web.Application):
+        app.router.add_post('/', self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        failure = await self.inject()
+        if failure is not None:
+            return failure
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response([self.respond(call) for call in body])
+        return web.json_response(self.respond(body))
+
+    def respond(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        method = call.get('method')
+        if method == 'eth_getTransactionReceipt':
+            result = {'status': '0x0' if self.roll(self.invalid_rate) else '0x1'}
+        elif method == 'eth_blockNumber':
+            result = hex(self.block_number)
+        elif method == 'eth_getLogs':
+            result = []
+        elif method == 'eth_getBalance':
+            result = hex(10 ** 18)
+        elif method == 'eth_sendTransaction':
+            result = '0x' + '00' * 32
+        else:
+            return {'jsonrpc': '2.0', 'id': call.get('id'), 'error': {'code': -32601, 'message': 'Method not found'}}
+        return {'jsonrpc': '2.0', 'id': call.get('id'), 'result': result}
+
+class StubSolanaRPC(StubServer):
+    def __init__(self, invalid_rate: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.invalid_rate = invalid_rate
+
+    def routes(self, app: web.Application):
+        app.router.add_post('/', self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        failure = await self.inject()
+        if failure is not None:
+            return failure
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response([self.respond(call) for call in body])
+        return web.json_response(self.respond(body))
+
+    def respond(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        if call.get('method') != 'getTransaction':
+            return {'jsonrpc': '2.0', 'id': call.get('id'), 'error': {'code': -32601, 'message': 'Method not found'}}
+        err = {'InstructionError': [0, 'Custom']} if self.roll(self.invalid_rate) else None
+        return {'jsonrpc': '2.0', 'id': call.get('id'), 'result': {'meta': {'err': err}}}
+
+class StubPaywall(StubServer):
+    def __init__(self, requirements: Optional[Dict[str, Any]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.requirements = requirements or {
+            'scheme': 'x402+eip712',
+            'network': 'base',
+            'maxAmountRequired': '50000',
+            'payTo': '0x8bee703d6214a266e245b0537085b1021e1ccaed',
+            'asset': '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913',
+        }
+        self.paid = 0
+
+    def routes(self, app: web.Application):
+        app.router.add_get('/{tail:.*}', self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        failure = await self.inject()
+        if failure is not None:
+            return failure
+        header = request.headers.get('x-payment')
+        if not header:
+            return web.json_response(
+                {'x402Version': 1, 'accepts': [dict(self.requirements, resource=str(request.url))], 'error': None},
+                status=402
+            )
+        json.loads(base64.b64decode(header))
+        self.paid += 1
+        return web.json_response({'ok': True})
+
+_TOPICS = (
+    'Weather forecast and current conditions for any city',
+    'Image generation from text prompts',
+    'Real-time token price feed',
+    'Text translation between 100 languages',
+    'Speech to text transcription',
+    'News article summarization',
+    'Geocoding and reverse geocoding',
+    'Sentiment analysis for social posts',
+    'Stock market quotes and historical prices',
+    'Web page scraping and extraction',
+    'PDF document parsing',
+    'Text embeddings for semantic search',
+    'Currency exchange rates',
+    'Live sports scores',
+    'Flight status tracking',
+    'Automated code review',
+    'Historical weather archive',
+)
+
+def _stub_resource(i: int) -> Dict[str, Any]:
+    network = 'base' if i % 4 else 'solana'
+    return {
+        'id': f'service-{i}',
+        'name': f'Service {i}',
+        'description': f'{_TOPICS[i % len(_TOPICS)]}, stub service number {i}',
+        'endpoint': f'https://api.example.com/services/{i}',
+        'category': ('data', 'ai', 'weather', 'finance')[i % 4],
+        'network': network,
+        'accepts': [{
+            'asset': '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913',
+            'pay_to': '0x8bee703d6214a266e245b0537085b1021e1ccaed',
+            'network': network,
+            'max_amount_required': str(1_000 * (i % 100 + 1)),
+            'scheme': 'x402+eip712' if network == 'base' else 'x402+solana',
+            'mime_type': 'application/json',
+        }],
+        'metadata': None,
+    }
@@ -0,0 +1,113 @@
+from typing import Dict, Any, Optional, Iterable, Union, AsyncIterator
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+import asyncio
+import random
+import aiohttp
+from .session import Budget, BudgetExceeded, PaymentSlot, X402Client
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+@dataclass
+class FetchRequest:
+    url: str
+    method: str = 'GET'
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass
+class FetchResult:
+    index: int
+    request: FetchRequest
+    response: Optional[aiohttp.ClientResponse] = None
+    error: Optional[BaseException] = None
+    attempts: int = 0
+    skipped: bool = False
+
+    @property
+    def status(self) -> Optional[int]:
+        return self.response.status if self.response is not None else None
+
+    @property
+    def ok(self) -> bool:
+        return self.response is not None and self.response.status < 400
+
+async def fetch_many(
+    client: X402Client,
+    requests: Iterable[Union[str, FetchRequest]],
+    concurrency: int = 32,
+    per_host: int = 8,
+    retries: int = 2,
+    backoff: float = 0.1,
+    max_backoff: float = 5.0,
+    budget: Optional[Union[int, Budget]] = None,
+    retry_unsafe: bool = False
+) -> AsyncIterator[FetchResult]:
+    items = [FetchRequest(r) if isinstance(r, str) else r for r in requests]
+    if isinstance(budget, int):
+        budget = Budget(budget)
+
+    global_slots = asyncio.Semaphore(concurrency)
+    host_slots: Dict[str, asyncio.Semaphore] = {}
+    results: asyncio.Queue = asyncio.Queue()
+    exhausted = asyncio.Event()
+
+    async def run(index: int, item: FetchRequest):
+        result = FetchResult(index, item)
+        host = urlsplit(item.url).netloc
+        slots = host_slots.setdefault(host, asyncio.Semaphore(per_host))
+        payment = PaymentSlot()
+        attempts = retries + 1 if retry_unsafe or item.method.upper() in IDEMPOTENT_METHODS else 1
+        try:
+            while True:
+                # The slots are held for the request only, so a backoff never idles a connection.
+                async with slots, global_slots:
+                    if exhausted.is_set():
+                        result.skipped = True
+                        result.error = BudgetExceeded('Budget exhausted')
+                        break
+
+                    result.attempts += 1
+                    try:
+                        response = await client.request(
+                            item.method, item.url, budget=budget, payment=payment, **item.kwargs
+                        )
+                    except BudgetExceeded as e:
+                        exhausted.set()
+                        result.error = e
+                        break
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        result.error = e
+                        response = None
+                    else:
+                        result.response, result.error = response, None
+
+                    retryable = response is None or response.status in RETRY_STATUSES
+                    if not retryable or result.attempts >= attempts:
+                        break
+                await asyncio.sleep(_retry_delay(response, result.attempts, backoff, max_backoff))
+        except Exception as e:
+            result.error = e
+        results.put_nowait(result)
+
+    tasks = [asyncio.ensure_future(run(index, item)) for index, item in enumerate(items)]
+    try:
+        for _ in range(len(tasks)):
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def _retry_delay(
+    response: Optional[aiohttp.ClientResponse],
+    attempt: int,
+    backoff: float,
+    max_backoff: float
+) -> float:
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(max_backoff, float(retry_after))
+    delay = min(max_backoff, backoff * 2 ** (attempt - 1))
+    return random.uniform(delay / 2, delay)
@@ -2,34 +2,71 @@ import asyncio
 import aiohttp
 import base64
 import json
-from typing import Optional
+from typing import Optional, AsyncIterator
+from contextlib import asynccontextmanager
+from atlas_x402.transport import HTTPTransport, get_default_transport
 
 async def x402_fetch(
     url: str,
     network: str,
     wallet_address: Optional[str] = None,
     facilitator_url: Optional[str] = None,
+    transport: Optional[HTTPTransport] = None,
     **kwargs
 ) -> aiohttp.ClientResponse:
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, **kwargs) as response:
-            if response.status == 402:
-                payment_requirements = await response.json()
-                requirement = payment_requirements.get('accepts', [{}])[0]
-                
-                if not requirement:
-                    raise Exception('No payment requirements provided')
-                
-                payment_payload = await create_payment(requirement, network, wallet_address)
-                payment_header = base64.b64encode(json.dumps(payment_payload).encode()).decode()
-                
-                headers = kwargs.get('headers', {})
-                headers['x-payment'] = payment_header
-                
-                async with session.get(url, headers=headers, **kwargs) as retry_response:
-                    return retry_response
-            
-            return response
+    response = await _paid_get(url, network, wallet_address, transport, kwargs)
+    try:
+        await response.read()
+    except BaseException:
+        response.release()
+        raise
+    return response
+
+@asynccontextmanager
+async def x402_stream(
+    url: str,
+    network: str,
+    wallet_address: Optional[str] = None,
+    facilitator_url: Optional[str] = None,
+    transport: Optional[HTTPTransport] = None,
+    **kwargs
+) -> AsyncIterator[aiohttp.ClientResponse]:
+    response = await _paid_get(url, network, wallet_address, transport, kwargs)
+    try:
+        yield response
+    finally:
+        response.release()
+
+async def _paid_get(
+    url: str,
+    network: str,
+    wallet_address: Optional[str],
+    transport: Optional[HTTPTransport],
+    kwargs: dict
+) -> aiohttp.ClientResponse:
+    transport = transport or get_default_transport()
+    response = await transport.get(url, **kwargs)
+    if response.status != 402:
+        return response
+    
+    try:
+        payment_requirements = await response.json()
+    finally:
+        response.release()
+    requirement = payment_requirements.get('accepts', [{}])[0]
+    
+    if not requirement:
+        raise Exception('No payment requirements provided')
+    
+    payment_payload = await create_payment(requirement, network, wallet_address)
+    
+    headers = dict(kwargs.pop('headers', None) or {})
+    headers['x-payment'] = encode_payment_header(payment_payload)
+    
+    return await transport.get(url, headers=headers, **kwargs)
+
+def encode_payment_header(payment_payload: dict) -> str:
+    return base64.b64encode(json.dumps(payment_payload).encode()).decode()
 
 async def create_payment(requirement: dict, network: str, wallet_address: Optional[str]) -> dict:
     return {
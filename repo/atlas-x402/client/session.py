@@ -0,0 +1,240 @@
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple, AsyncIterator
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+import time
+import aiohttp
+from atlas_x402.transport import HTTPTransport, get_default_transport
+from .fetch import create_payment, encode_payment_header
+
+PaymentFactory = Callable[[Dict[str, Any], str, Optional[str]], Awaitable[Dict[str, Any]]]
+
+def route_key(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    return f'{method.upper()} {parts.scheme}://{parts.netloc}{parts.path or "/"}'
+
+class RequirementsCache:
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        max_entries: int = 1_024,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, requirement: Dict[str, Any], ttl: Optional[float] = None):
+        self._entries[key] = (self.clock() + (self.ttl if ttl is None else ttl), requirement)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class BudgetExceeded(Exception):
+    pass
+
+class Budget:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.spent = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit - self.spent)
+
+    def reserve(self, amount: int) -> bool:
+        if self.spent + amount > self.limit:
+            return False
+        self.spent += amount
+        return True
+
+    def release(self, amount: int):
+        self.spent = max(0, self.spent - amount)
+
+class PaymentSlot:
+    # Carries the payment minted for one logical request across retries, so a retry resends the
+    # same X-PAYMENT header (which the server can accept at most once) rather than paying again.
+    __slots__ = ('header', 'requirement')
+
+    def __init__(self):
+        self.header: Optional[str] = None
+        self.requirement: Optional[Dict[str, Any]] = None
+
+class X402Client:
+    def __init__(
+        self,
+        network: str,
+        wallet_address: Optional[str] = None,
+        transport: Optional[HTTPTransport] = None,
+        requirements_ttl: float = 300.0,
+        max_cached_routes: int = 1_024,
+        payment_factory: PaymentFactory = create_payment,
+        key: Callable[[str, str], str] = route_key,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.network = network
+        self.wallet_address = wallet_address
+        self.transport = transport or get_default_transport()
+        self.requirements = RequirementsCache(requirements_ttl, max_cached_routes, clock)
+        self.payment_factory = payment_factory
+        self.key = key
+        self.requests = 0
+        self.payments = 0
+
+    async def get(self, url: str, **kwargs) -> aiohttp.ClientResponse:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> aiohttp.ClientResponse:
+        return await self.request('POST', url, **kwargs)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        budget: Optional[Budget] = None,
+        payment: Optional[PaymentSlot] = None,
+        **kwargs
+    ) -> aiohttp.ClientResponse:
+        response = await self._request(method, url, budget, kwargs, payment)
+        try:
+            await response.read()
+        except BaseException:
+            response.release()
+            raise
+        return response
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        budget: Optional[Budget] = None,
+        **kwargs
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        response = await self._request(method, url, budget, kwargs)
+        try:
+            yield response
+        finally:
+            response.release()
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        budget: Optional[Budget],
+        kwargs: Dict[str, Any],
+        payment: Optional[PaymentSlot] = None
+    ) -> aiohttp.ClientResponse:
+        key = self.key(method, url)
+        headers = dict(kwargs.pop('headers', None) or {})
+        if payment is not None and payment.header is not None:
+            # Whatever the server makes of a resent payment, minting another could pay twice.
+            return await self._send(method, url, headers, kwargs, payment.requirement, budget, payment)
+        requirement = self.requirements.get(key)
+
+        response = await self._send(method, url, headers, kwargs, requirement, budget, payment)
+        if response.status != 402:
+            return response
+
+        try:
+            if requirement is not None:
+                self.requirements.invalidate(key)
+            requirement = await self._requirement_from(response)
+        finally:
+            response.release()
+
+        self.requirements.put(key, requirement)
+        return await self._send(method, url, headers, kwargs, requirement, budget, payment)
+
+    def fetch_many(self, requests, **options):
+        from .bulk import fetch_many
+        return fetch_many(self, requests, **options)
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        kwargs: Dict[str, Any],
+        requirement: Optional[Dict[str, Any]],
+        budget: Optional[Budget] = None,
+        payment: Optional[PaymentSlot] = None
+    ) -> aiohttp.ClientResponse:
+        amount = 0
+        if requirement is not None:
+            amount = int(requirement.get('maxAmountRequired', 0))
+            if budget is not None and not budget.reserve(amount):
+                raise BudgetExceeded(f'Paying {amount} would exceed the remaining budget of {budget.remaining}')
+            if payment is not None and payment.header is not None:
+                header = payment.header
+            else:
+                try:
+                    payment_payload = await self.payment_factory(requirement, self.network, self.wallet_address)
+                except Exception:
+                    if budget is not None:
+                        budget.release(amount)
+                    raise
+                header = encode_payment_header(payment_payload)
+                self.payments += 1
+                if payment is not None:
+                    payment.header, payment.requirement = header, requirement
+            headers = dict(headers, **{'x-payment': header})
+
+        self.requests += 1
+        # A reservation is only kept once the server has accepted the payment: a 402 (stale
+        # requirements), any other failure status, or a transport error hands it back.
+        try:
+            response = await self.transport.request(method, url, headers=headers, **kwargs)
+        except BaseException:
+            if budget is not None:
+                budget.release(amount)
+            raise
+        if budget is not None and response.status >= 400:
+            budget.release(amount)
+        return response
+
+    async def _requirement_from(self, response: aiohttp.ClientResponse) -> Dict[str, Any]:
+        payment_requirements = await response.json(content_type=None)
+        accepts = payment_requirements.get('accepts') or []
+        requirement = next(
+            (accept for accept in accepts if accept.get('network') == self.network),
+            accepts[0] if accepts else None
+        )
+        if not requirement:
+            raise Exception('No payment requirements provided')
+        return requirement
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'payments': self.payments,
+            'cached_routes': len(self.requirements),
+            'hits': self.requirements.hits,
+            'misses': self.requirements.misses,
+            'invalidations': self.requirements.invalidations,
+        }
@@ -0,0 +1,71 @@
+from typing import Any, Optional, AsyncIterator
+from dataclasses import dataclass
+import json
+import aiohttp
+
+@dataclass
+class ServerSentEvent:
+    data: str
+    event: str = 'message'
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+    def json(self) -> Any:
+        return json.loads(self.data)
+
+async def iter_chunks(response: aiohttp.ClientResponse, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    if chunk_size:
+        async for chunk in response.content.iter_chunked(chunk_size):
+            yield chunk
+    else:
+        async for chunk in response.content.iter_any():
+            yield chunk
+
+async def iter_lines(response: aiohttp.ClientResponse, max_line_size: int = 2 ** 20) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for chunk in response.content.iter_any():
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+            yield bytes(buffer[start:end]).rstrip(b'\r')
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line_size:
+            raise ValueError(f'Line exceeds {max_line_size} bytes')
+    if buffer:
+        yield bytes(buffer).rstrip(b'\r')
+
+async def iter_ndjson(response: aiohttp.ClientResponse, **kwargs) -> AsyncIterator[Any]:
+    async for line in iter_lines(response, **kwargs):
+        if line.strip():
+            yield json.loads(line)
+
+async def iter_sse(response: aiohttp.ClientResponse, **kwargs) -> AsyncIterator[ServerSentEvent]:
+    data = []
+    event = None
+    event_id = None
+    retry = None
+    async for raw in iter_lines(response, **kwargs):
+        line = raw.decode('utf-8')
+        if not line:
+            if data:
+                yield ServerSentEvent('\n'.join(data), event or 'message', event_id, retry)
+            data, event, retry = [], None, None
+            continue
+        if line.startswith(':'):
+            continue
+
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'data':
+            data.append(value)
+        elif field == 'event':
+            event = value
+        elif field == 'id' and '\0' not in value:
+            event_id = value
+        elif field == 'retry' and value.isdigit():
+            retry = int(value)
@@ -0,0 +1,225 @@
+from typing import Dict, Any, Optional, List, Callable, Union
+from collections import deque
+from dataclasses import dataclass
+import asyncio
+import secrets
+import time
+from atlas_x402.eip712 import PrivateKey, private_key_to_address, sign_typed_data, signer, transfer_with_authorization
+
+_CLOCK_SKEW_SECONDS = 5
+_DEFAULT_VALIDITY = 60
+
+@dataclass(frozen=True)
+class VoucherTier:
+    network: str
+    asset: str
+    pay_to: str
+    amount: int
+    name: str = 'USDC'
+    version: str = '2'
+
+    def __post_init__(self):
+        # Tiers are dictionary keys, so addresses compare in one case whether the tier was
+        # configured by hand or learned from a 402 challenge.
+        object.__setattr__(self, 'asset', self.asset.lower())
+        object.__setattr__(self, 'pay_to', self.pay_to.lower())
+
+    @classmethod
+    def from_requirement(cls, requirement: Dict[str, Any]) -> 'VoucherTier':
+        extra = requirement.get('extra') or {}
+        return cls(
+            network=requirement['network'],
+            asset=requirement['asset'],
+            pay_to=requirement['payTo'],
+            amount=int(requirement['maxAmountRequired']),
+            name=extra.get('name', 'USDC'),
+            version=extra.get('version', '2'),
+        )
+
+@dataclass
+class Voucher:
+    tier: VoucherTier
+    payment: Dict[str, Any]
+    valid_before: int
+
+def sign_payment(
+    private_key: Union[int, bytes, str, PrivateKey],
+    tier: VoucherTier,
+    valid_after: int,
+    valid_before: int,
+    from_address: Optional[str] = None,
+    nonce: Optional[str] = None
+) -> Dict[str, Any]:
+    authorization = {
+        'from': from_address or private_key_to_address(private_key),
+        'to': tier.pay_to,
+        'value': str(tier.amount),
+        'validAfter': str(valid_after),
+        'validBefore': str(valid_before),
+        'nonce': nonce or '0x' + secrets.token_hex(32),
+    }
+    typed_data = transfer_with_authorization(
+        authorization, asset=tier.asset, network=tier.network, name=tier.name, version=tier.version
+    )
+    return {
+        'x402Version': 1,
+        'scheme': 'x402+eip712',
+        'network': tier.network,
+        'payload': {
+            'signature': sign_typed_data(typed_data, private_key),
+            'authorization': authorization,
+        },
+    }
+
+class VoucherPool:
+    def __init__(
+        self,
+        private_key: Union[int, bytes, str, PrivateKey],
+        tiers: Optional[List[VoucherTier]] = None,
+        size: int = 16,
+        validity: Optional[int] = None,
+        min_remaining: Optional[int] = None,
+        learn_tiers: bool = True,
+        max_tiers: int = 32,
+        sweep_interval: float = 5.0,
+        clock: Callable[[], float] = time.time
+    ):
+        # The key lives only inside the libsecp256k1 context; the pool never keeps the raw scalar.
+        self._signer = signer(private_key)
+        self.address = private_key_to_address(self._signer)
+        self.size = size
+        self.validity = validity
+        self.min_remaining = min_remaining
+        self.learn_tiers = learn_tiers
+        self.max_tiers = max_tiers
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self._vouchers: Dict[VoucherTier, deque] = {tier: deque() for tier in tiers or []}
+        self._timeouts: Dict[VoucherTier, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.signed = 0
+        self.expired = 0
+
+    def tier_validity(self, tier: VoucherTier) -> int:
+        # Vouchers live as long as the route allows (maxTimeoutSeconds, once a challenge has shown
+        # it), so a pool on a 5-minute route re-signs five times less often than on a 1-minute one.
+        timeout = self._timeouts.get(tier)
+        validity = self.validity or timeout or _DEFAULT_VALIDITY
+        return min(validity, timeout) if timeout else validity
+
+    def tier_min_remaining(self, tier: VoucherTier) -> int:
+        if self.min_remaining is not None:
+            return self.min_remaining
+        return max(_CLOCK_SKEW_SECONDS, self.tier_validity(tier) // 6)
+
+    async def start(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for vouchers in self._vouchers.values():
+            vouchers.clear()
+
+    async def __aenter__(self) -> 'VoucherPool':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def take(self, requirement: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        tier = VoucherTier.from_requirement(requirement)
+        if requirement.get('maxTimeoutSeconds'):
+            self._timeouts[tier] = int(requirement['maxTimeoutSeconds'])
+        vouchers = self._vouchers.get(tier)
+        if vouchers is None:
+            if self.learn_tiers and len(self._vouchers) < self.max_tiers:
+                self._vouchers[tier] = deque()
+            self.misses += 1
+            self._wake()
+            return None
+
+        now = int(self.clock())
+        latest = now + int(requirement.get('maxTimeoutSeconds') or self.tier_validity(tier)) + _CLOCK_SKEW_SECONDS
+        self._expire(tier, vouchers, now)
+        self._wake()
+        # Vouchers are ordered by expiry, so if the oldest outlives the route's timeout all of them do.
+        if not vouchers or vouchers[0].valid_before > latest:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return vouchers.popleft().payment
+
+    async def payment_factory(
+        self,
+        requirement: Dict[str, Any],
+        network: str,
+        wallet_address: Optional[str] = None
+    ) -> Dict[str, Any]:
+        payment = self.take(requirement)
+        if payment is not None:
+            return payment
+        return self._sign(VoucherTier.from_requirement(requirement)).payment
+
+    async def refill(self):
+        now = int(self.clock())
+        for tier, vouchers in list(self._vouchers.items()):
+            self._expire(tier, vouchers, now)
+            while len(vouchers) < self.size:
+                vouchers.append(self._sign(tier))
+            # Signing is native and takes tens of microseconds; yield between tiers all the same.
+            await asyncio.sleep(0)
+
+    def _sign(self, tier: VoucherTier) -> Voucher:
+        now = int(self.clock())
+        valid_before = now + self.tier_validity(tier)
+        payment = sign_payment(
+            self._signer, tier, now - _CLOCK_SKEW_SECONDS, valid_before, from_address=self.address
+        )
+        self.signed += 1
+        return Voucher(tier, payment, valid_before)
+
+    def _expire(self, tier: VoucherTier, vouchers: deque, now: int):
+        min_remaining = self.tier_min_remaining(tier)
+        while vouchers and vouchers[0].valid_before - now < min_remaining:
+            vouchers.popleft()
+            self.expired += 1
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refill()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            # asyncio.wait, unlike wait_for on 3.11, never swallows a cancellation that races the wakeup.
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=self.sweep_interval)
+            finally:
+                waiter.cancel()
+            self._wakeup.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'ready': sum(len(vouchers) for vouchers in self._vouchers.values()),
+            'tiers': len(self._vouchers),
+            'hits': self.hits,
+            'misses': self.misses,
+            'signed': self.signed,
+            'expired': self.expired,
+        }
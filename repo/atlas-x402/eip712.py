@@ -0,0 +1,208 @@
+from typing import Dict, Any, List, Optional, Union
+from functools import lru_cache
+import re
+from coincurve import PrivateKey, PublicKey
+from Crypto.Hash import keccak as _keccak
+
+# Curve order, used only to reject out-of-range and high-s signatures before recovery.
+_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+def keccak256(data: bytes) -> bytes:
+    return _keccak.new(digest_bits=256, data=data).digest()
+
+def signer(private_key: Union[int, bytes, str, PrivateKey]) -> PrivateKey:
+    if isinstance(private_key, PrivateKey):
+        return private_key
+    if isinstance(private_key, int):
+        if not (1 <= private_key < _N):
+            raise ValueError('Invalid private key')
+        private_key = private_key.to_bytes(32, 'big')
+    try:
+        return PrivateKey(_hex_bytes(private_key))
+    except Exception:
+        raise ValueError('Invalid private key')
+
+def sign_hash(digest: bytes, private_key: Union[int, bytes, str, PrivateKey]) -> str:
+    # libsecp256k1 signs in constant time with RFC 6979 nonces and always returns low-s.
+    signature = signer(private_key).sign_recoverable(digest, hasher=None)
+    return '0x' + signature[:64].hex() + bytes([27 + signature[64]]).hex()
+
+def recover_hash(digest: bytes, signature: Union[bytes, str]) -> str:
+    sig = _hex_bytes(signature)
+    if len(sig) != 65:
+        raise ValueError('Signature must be 65 bytes')
+
+    r = int.from_bytes(sig[:32], 'big')
+    s = int.from_bytes(sig[32:64], 'big')
+    v = sig[64]
+    if v >= 27:
+        v -= 27
+    if v not in (0, 1) or not (1 <= r < _N) or not (1 <= s <= _N // 2):
+        raise ValueError('Invalid signature values')
+
+    try:
+        public_key = PublicKey.from_signature_and_message(sig[:64] + bytes([v]), digest, hasher=None)
+    except Exception as e:
+        raise ValueError(f'Invalid signature: {e}')
+    return _public_key_address(public_key)
+
+def private_key_to_address(private_key: Union[int, bytes, str, PrivateKey]) -> str:
+    return _public_key_address(signer(private_key).public_key)
+
+def _public_key_address(public_key: PublicKey) -> str:
+    return to_checksum_address('0x' + keccak256(public_key.format(compressed=False)[1:])[-20:].hex())
+
+def _hex_bytes(value: Union[bytes, str]) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+
+def to_checksum_address(address: str) -> str:
+    lower = address.lower().replace('0x', '')
+    digest = keccak256(lower.encode()).hex()
+    return '0x' + ''.join(
+        c.upper() if int(digest[i], 16) >= 8 else c
+        for i, c in enumerate(lower)
+    )
+
+_DOMAIN_FIELDS = [
+    ('name', 'string'),
+    ('version', 'string'),
+    ('chainId', 'uint256'),
+    ('verifyingContract', 'address'),
+    ('salt', 'bytes32'),
+]
+
+_ARRAY = re.compile(r'^(.*)\[(\d*)\]$')
+
+def _dependencies(primary_type: str, types: Dict[str, List[Dict[str, str]]], found: Optional[set] = None) -> set:
+    found = found if found is not None else set()
+    if primary_type in found or primary_type not in types:
+        return found
+    found.add(primary_type)
+    for field in types[primary_type]:
+        base = field['type']
+        while _ARRAY.match(base):
+            base = _ARRAY.match(base).group(1)
+        _dependencies(base, types, found)
+    return found
+
+def encode_type(primary_type: str, types: Dict[str, List[Dict[str, str]]]) -> str:
+    deps = _dependencies(primary_type, types)
+    deps.discard(primary_type)
+    return ''.join(
+        name + '(' + ','.join(f"{field['type']} {field['name']}" for field in types[name]) + ')'
+        for name in [primary_type] + sorted(deps)
+    )
+
+def type_hash(primary_type: str, types: Dict[str, List[Dict[str, str]]]) -> bytes:
+    return _hash_type(encode_type(primary_type, types))
+
+@lru_cache(maxsize=256)
+def _hash_type(encoded_type: str) -> bytes:
+    return keccak256(encoded_type.encode())
+
+def _encode_value(field_type: str, value: Any, types: Dict[str, List[Dict[str, str]]]) -> bytes:
+    if field_type in types:
+        return hash_struct(field_type, value, types)
+
+    array = _ARRAY.match(field_type)
+    if array:
+        return keccak256(b''.join(_encode_value(array.group(1), item, types) for item in value))
+
+    if field_type == 'string':
+        return keccak256(value.encode())
+    if field_type == 'bytes':
+        return keccak256(_hex_bytes(value))
+    if field_type == 'bool':
+        return (1 if value else 0).to_bytes(32, 'big')
+    if field_type == 'address':
+        return int(value, 16).to_bytes(32, 'big')
+    if field_type.startswith('bytes'):
+        raw = _hex_bytes(value)
+        return raw.ljust(32, b'\x00')
+    if field_type.startswith('uint'):
+        number = int(value, 0) if isinstance(value, str) else int(value)
+        if number < 0:
+            raise ValueError(f'Negative value for {field_type}')
+        return number.to_bytes(32, 'big')
+    if field_type.startswith('int'):
+        number = int(value, 0) if isinstance(value, str) else int(value)
+        return (number % (1 << 256)).to_bytes(32, 'big')
+
+    raise ValueError(f'Unsupported EIP-712 type: {field_type}')
+
+def hash_struct(primary_type: str, data: Dict[str, Any], types: Dict[str, List[Dict[str, str]]]) -> bytes:
+    encoded = type_hash(primary_type, types)
+    for field in types[primary_type]:
+        encoded += _encode_value(field['type'], data[field['name']], types)
+    return keccak256(encoded)
+
+def domain_separator(domain: Dict[str, Any], types: Optional[Dict[str, List[Dict[str, str]]]] = None) -> bytes:
+    fields = (types or {}).get('EIP712Domain')
+    if fields is None:
+        fields = [{'name': name, 'type': field_type} for name, field_type in _DOMAIN_FIELDS if name in domain]
+    # A server sees a handful of (token, chain) domains, so each separator is hashed once.
+    return _domain_separator(
+        tuple((field['name'], field['type']) for field in fields),
+        tuple(domain[field['name']] for field in fields),
+    )
+
+@lru_cache(maxsize=256)
+def _domain_separator(fields: tuple, values: tuple) -> bytes:
+    types = {'EIP712Domain': [{'name': name, 'type': field_type} for name, field_type in fields]}
+    return hash_struct('EIP712Domain', {name: value for (name, _), value in zip(fields, values)}, types)
+
+def hash_typed_data(typed_data: Dict[str, Any]) -> bytes:
+    types = typed_data['types']
+    return keccak256(
+        b'\x19\x01'
+        + domain_separator(typed_data['domain'], types)
+        + hash_struct(typed_data['primaryType'], typed_data['message'], types)
+    )
+
+def sign_typed_data(typed_data: Dict[str, Any], private_key: Union[int, bytes, str, PrivateKey]) -> str:
+    return sign_hash(hash_typed_data(typed_data), private_key)
+
+def recover_typed_data(typed_data: Dict[str, Any], signature: Union[bytes, str]) -> str:
+    return recover_hash(hash_typed_data(typed_data), signature)
+
+TRANSFER_WITH_AUTHORIZATION_TYPES = {
+    'TransferWithAuthorization': [
+        {'name': 'from', 'type': 'address'},
+        {'name': 'to', 'type': 'address'},
+        {'name': 'value', 'type': 'uint256'},
+        {'name': 'validAfter', 'type': 'uint256'},
+        {'name': 'validBefore', 'type': 'uint256'},
+        {'name': 'nonce', 'type': 'bytes32'},
+    ],
+}
+
+CHAIN_IDS = {
+    'base': 8453,
+    'base-sepolia': 84532,
+    'ethereum': 1,
+    'polygon': 137,
+}
+
+def transfer_with_authorization(
+    authorization: Dict[str, Any],
+    asset: str,
+    network: str,
+    name: str = 'USDC',
+    version: str = '2'
+) -> Dict[str, Any]:
+    if network not in CHAIN_IDS:
+        raise ValueError(f'Unsupported EVM network: {network}')
+
+    return {
+        'types': TRANSFER_WITH_AUTHORIZATION_TYPES,
+        'primaryType': 'TransferWithAuthorization',
+        'domain': {
+            'name': name,
+            'version': version,
+            'chainId': CHAIN_IDS[network],
+            'verifyingContract': asset,
+        },
+        'message': authorization,
+    }
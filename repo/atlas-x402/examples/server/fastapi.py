@@ -1,8 +1,21 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from atlas_x402.server.middleware import x402_middleware
+from atlas_x402.server.middleware.fastapi import DEFAULT_FACILITATOR_URL, x402_middleware
+from atlas_x402.server.core.optimistic import OptimisticSettler
+from atlas_x402.transport import get_default_transport
 
-app = FastAPI()
 MERCHANT_ADDRESS = '0x8bee703d6214a266e245b0537085b1021e1ccaed'
+FACILITATOR_URL = os.environ.get('X402_FACILITATOR_URL', DEFAULT_FACILITATOR_URL)
+settler = OptimisticSettler(max_exposure=1_000_000)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await settler.close()
+
+app = FastAPI(lifespan=lifespan)
+get_default_transport().install(app)
 
 @app.get('/api/weather')
 async def get_weather(request: Request):
@@ -10,7 +23,10 @@ async def get_weather(request: Request):
         request,
         price='0.05',
         network='base',
-        merchant_address=MERCHANT_ADDRESS
+        merchant_address=MERCHANT_ADDRESS,
+        facilitator_url=FACILITATOR_URL,
+        offline=True,
+        optimistic=settler
     )
     
     return {
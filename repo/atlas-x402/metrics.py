@@ -0,0 +1,241 @@
+from typing import Dict, Any, Optional, List, Tuple, Callable, ContextManager, Iterable
+from contextlib import ExitStack
+from functools import wraps
+import asyncio
+import bisect
+import time
+
+STAGE_SECONDS = 'x402_stage_duration_seconds'
+BACKEND_SECONDS = 'x402_backend_duration_seconds'
+RPC_SECONDS = 'x402_rpc_request_duration_seconds'
+BATCH_SECONDS = 'x402_batch_duration_seconds'
+CACHE_REQUESTS = 'x402_cache_requests_total'
+VERIFICATIONS = 'x402_verifications_total'
+PAYMENTS = 'x402_payments_total'
+SETTLEMENTS = 'x402_settlements_total'
+SINGLE_FLIGHT_CALLS = 'x402_single_flight_calls_total'
+WATCHER_ERRORS = 'x402_watcher_errors_total'
+LEASE_REFRESH_SECONDS = 'x402_lease_refresh_duration_seconds'
+LEASE_REFRESHES = 'x402_lease_refreshes_total'
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_HELP = {
+    STAGE_SECONDS: 'Time spent in each stage of a paid request.',
+    BACKEND_SECONDS: 'Time spent in each verification backend.',
+    RPC_SECONDS: 'Round-trip time of JSON-RPC requests per endpoint.',
+    BATCH_SECONDS: 'Time spent dispatching a verification batch.',
+    CACHE_REQUESTS: 'Verification cache and payment index lookups.',
+    VERIFICATIONS: 'Verification outcomes per backend.',
+    PAYMENTS: 'Outcomes of paid requests.',
+    SETTLEMENTS: 'Outcomes of background settlements of locally verified payments.',
+    SINGLE_FLIGHT_CALLS: 'Verifications sent upstream or coalesced onto an in-flight call.',
+    WATCHER_ERRORS: 'Failed log subscriptions and polls of the transfer watcher.',
+    LEASE_REFRESH_SECONDS: 'Time spent re-registering a service listing.',
+    LEASE_REFRESHES: 'Outcomes of service listing refreshes.',
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+Tracer = Callable[[str, Dict[str, Any]], ContextManager]
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopSpan()
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'histogram', 'labels', 'started', 'stack')
+
+    def __init__(self, metrics: 'Metrics', name: str, histogram: str, labels: Dict[str, Any]):
+        self.metrics = metrics
+        self.name = name
+        self.histogram = histogram
+        self.labels = labels
+        self.stack: Optional[ExitStack] = None
+
+    def __enter__(self):
+        if self.metrics.tracers:
+            self.stack = ExitStack()
+            for tracer in self.metrics.tracers:
+                self.stack.enter_context(tracer(self.name, self.labels))
+        self.started = self.metrics.clock()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = self.metrics.clock() - self.started
+        if self.metrics.enabled:
+            self.metrics.observe(self.histogram, elapsed, **self.labels)
+        if self.stack is not None:
+            return self.stack.__exit__(*exc)
+        return False
+
+class Metrics:
+    def __init__(
+        self,
+        enabled: bool = False,
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+        clock: Callable[[], float] = time.perf_counter
+    ):
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self.clock = clock
+        self.tracers: List[Tracer] = []
+        self.active = enabled
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+
+    def enable(self):
+        self.enabled = True
+        self._update_active()
+
+    def disable(self):
+        self.enabled = False
+        self._update_active()
+
+    def add_tracer(self, tracer: Tracer):
+        self.tracers.append(tracer)
+        self._update_active()
+
+    def remove_tracer(self, tracer: Tracer):
+        self.tracers.remove(tracer)
+        self._update_active()
+
+    def _update_active(self):
+        self.active = self.enabled or bool(self.tracers)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = _Histogram(len(self.buckets) + 1)
+        histogram.counts[bisect.bisect_left(self.buckets, value)] += 1
+        histogram.sum += value
+        histogram.count += 1
+
+    def span(self, name: str, histogram: str, **labels) -> ContextManager:
+        if not self.active:
+            return _NOOP
+        return _Span(self, name, histogram, labels)
+
+    def stage(self, stage: str) -> ContextManager:
+        if not self.active:
+            return _NOOP
+        return _Span(self, f'x402.{stage}', STAGE_SECONDS, {'stage': stage})
+
+    def backend(self, backend: str) -> ContextManager:
+        if not self.active:
+            return _NOOP
+        return _Span(self, f'x402.verify.{backend}', BACKEND_SECONDS, {'backend': backend})
+
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, name: str, **labels) -> Optional[Dict[str, Any]]:
+        histogram = self._histograms.get((name, tuple(sorted(labels.items()))))
+        if histogram is None:
+            return None
+        return {'count': histogram.count, 'sum': histogram.sum, 'buckets': list(histogram.counts)}
+
+    def reset(self):
+        self._counters.clear()
+        self._histograms.clear()
+
+    def render(self) -> str:
+        lines: List[str] = []
+        seen = set()
+
+        def header(name: str, kind: str):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# HELP {name} {_HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), value in sorted(self._counters.items()):
+            header(name, 'counter')
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+        for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}')
+            lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        f'{key}="' + str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') + '"'
+        for key, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def instrument_verification(backend: str):
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def wrapper(*args, **kwargs):
+                metrics = get_default_metrics()
+                if not metrics.active:
+                    return await fn(*args, **kwargs)
+                with metrics.backend(backend):
+                    try:
+                        result = await fn(*args, **kwargs)
+                    except Exception:
+                        metrics.inc(VERIFICATIONS, backend=backend, outcome='error')
+                        raise
+                metrics.inc(VERIFICATIONS, backend=backend, outcome=_outcome(result))
+                return result
+        else:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                metrics = get_default_metrics()
+                if not metrics.active:
+                    return fn(*args, **kwargs)
+                with metrics.backend(backend):
+                    try:
+                        result = fn(*args, **kwargs)
+                    except Exception:
+                        metrics.inc(VERIFICATIONS, backend=backend, outcome='error')
+                        raise
+                metrics.inc(VERIFICATIONS, backend=backend, outcome=_outcome(result))
+                return result
+        return wrapper
+    return decorate
+
+def _outcome(result: Any) -> str:
+    valid = result.get('isValid') if isinstance(result, dict) else result
+    return 'valid' if valid else 'invalid'
+
+_default_metrics = Metrics()
+
+def get_default_metrics() -> Metrics:
+    return _default_metrics
@@ -0,0 +1,249 @@
+from typing import Dict, Any, Optional, List, Callable
+from collections import deque
+import asyncio
+import time
+import aiohttp
+from atlas_x402.metrics import RPC_SECONDS, get_default_metrics
+from atlas_x402.transport import HTTPTransport, get_default_transport
+
+DEFAULT_RPC_ENDPOINTS = {
+    'base': [
+        'https://mainnet.base.org',
+        'https://base-rpc.publicnode.com',
+        'https://base.llamarpc.com',
+    ],
+    'solana': [
+        'https://api.mainnet-beta.solana.com',
+        'https://solana-rpc.publicnode.com',
+    ],
+}
+
+NETWORK_ALIASES = {
+    'solana-mainnet': 'solana',
+}
+
+# Reads that can be sent again, to a hedge or another endpoint, without side effects. Anything else,
+# such as eth_sendTransaction, may already have been applied by an endpoint that timed out, so it only
+# fails over when the request provably never reached that endpoint.
+RETRYABLE_METHODS = frozenset({
+    'eth_blockNumber',
+    'eth_call',
+    'eth_chainId',
+    'eth_estimateGas',
+    'eth_gasPrice',
+    'eth_getBalance',
+    'eth_getBlockByNumber',
+    'eth_getCode',
+    'eth_getLogs',
+    'eth_getTransactionByHash',
+    'eth_getTransactionCount',
+    'eth_getTransactionReceipt',
+    'getBalance',
+    'getSignatureStatuses',
+    'getSlot',
+    'getTransaction',
+})
+
+class RPCError(Exception):
+    def __init__(self, error: Any):
+        super().__init__(f'RPC error: {error}')
+        self.error = error
+
+class EndpointUnavailable(Exception):
+    def __init__(self, message: str = '', delivered: bool = True):
+        super().__init__(message)
+        self.delivered = delivered
+
+class EndpointStats:
+    def __init__(self, url: str, alpha: float, window: int):
+        self.url = url
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples: deque = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def record_success(self, elapsed: float):
+        self.requests += 1
+        self.samples.append(elapsed)
+        self.latency = elapsed if self.latency is None else self.alpha * elapsed + (1 - self.alpha) * self.latency
+        self.error_rate = (1 - self.alpha) * self.error_rate
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self, now: float, threshold: int, cooldown: float):
+        self.requests += 1
+        self.failures += 1
+        self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= threshold:
+            self.open_until = now + cooldown
+
+    def is_open(self, now: float) -> bool:
+        return self.open_until > now
+
+    def score(self, default_latency: float) -> float:
+        latency = self.latency if self.latency is not None else default_latency
+        return latency * (1 + 10 * self.error_rate)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class RPCClient:
+    def __init__(
+        self,
+        endpoints: Optional[Dict[str, List[str]]] = None,
+        transport: Optional[HTTPTransport] = None,
+        hedge_percentile: float = 0.95,
+        min_hedge_delay: float = 0.05,
+        max_hedge_delay: float = 1.0,
+        max_attempts: int = 3,
+        failure_threshold: int = 5,
+        cooldown: float = 30.0,
+        alpha: float = 0.2,
+        window: int = 100,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.transport = transport or get_default_transport()
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.max_attempts = max_attempts
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.endpoints: Dict[str, List[EndpointStats]] = {
+            network: [EndpointStats(url, alpha, window) for url in urls]
+            for network, urls in (endpoints or DEFAULT_RPC_ENDPOINTS).items()
+        }
+        self.hedged = 0
+        self._next_id = 0
+
+    def supports(self, network: Optional[str]) -> bool:
+        return NETWORK_ALIASES.get(network, network) in self.endpoints
+
+    def ranked(self, network: str) -> List[EndpointStats]:
+        network = NETWORK_ALIASES.get(network, network)
+        if network not in self.endpoints:
+            raise ValueError(f'No RPC endpoints configured for {network}')
+
+        now = self.clock()
+        stats = self.endpoints[network]
+        healthy = [s for s in stats if not s.is_open(now)]
+        default_latency = self.min_hedge_delay
+        if not healthy:
+            return sorted(stats, key=lambda s: s.open_until)
+        return sorted(healthy, key=lambda s: s.score(default_latency))
+
+    def _hedge_delay(self, endpoint: EndpointStats) -> float:
+        delay = endpoint.percentile(self.hedge_percentile)
+        if delay is None:
+            return self.max_hedge_delay
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, delay))
+
+    async def call(self, method: str, params: List[Any], network: str = 'base', hedge: bool = True) -> Any:
+        self._next_id += 1
+        body = {'jsonrpc': '2.0', 'id': self._next_id, 'method': method, 'params': params}
+        data = await self.request(body, network, hedge)
+        if data.get('error'):
+            raise RPCError(data['error'])
+        return data.get('result')
+
+    async def request(self, body: Any, network: str = 'base', hedge: bool = True) -> Any:
+        retryable = _is_retryable(body)
+        hedge = hedge and retryable
+        candidates = self.ranked(network)[:self.max_attempts]
+        pending: Dict[asyncio.Task, EndpointStats] = {}
+        last_error: Optional[BaseException] = None
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            endpoint = candidates[next_index]
+            next_index += 1
+            pending[asyncio.ensure_future(self._send(endpoint, body))] = endpoint
+            return endpoint
+
+        current = launch()
+        try:
+            while pending:
+                timeout = self._hedge_delay(current) if hedge and next_index < len(candidates) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    self.hedged += 1
+                    current = launch()
+                    continue
+
+                for task in done:
+                    pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    if not retryable and getattr(last_error, 'delivered', True):
+                        raise last_error
+
+                if not pending and next_index < len(candidates):
+                    current = launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise EndpointUnavailable(f'All RPC endpoints failed for {network}: {last_error}')
+
+    async def _send(self, endpoint: EndpointStats, body: Any) -> Any:
+        started = self.clock()
+        try:
+            async with self.transport.post(endpoint.url, json=body) as response:
+                if response.status == 429 or response.status >= 500:
+                    raise EndpointUnavailable(f'{endpoint.url} returned {response.status}', delivered=response.status != 429)
+                data = await response.json(content_type=None)
+        except asyncio.CancelledError:
+            raise
+        except EndpointUnavailable:
+            endpoint.record_failure(self.clock(), self.failure_threshold, self.cooldown)
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            endpoint.record_failure(self.clock(), self.failure_threshold, self.cooldown)
+            raise EndpointUnavailable(str(e) or type(e).__name__, delivered=not isinstance(e, aiohttp.ClientConnectorError))
+
+        elapsed = self.clock() - started
+        endpoint.record_success(elapsed)
+        get_default_metrics().observe(RPC_SECONDS, elapsed, endpoint=endpoint.url)
+        return data
+
+    def stats(self) -> Dict[str, List[Dict[str, Any]]]:
+        now = self.clock()
+        return {
+            network: [
+                {
+                    'url': s.url,
+                    'latency': s.latency,
+                    'p95': s.percentile(0.95),
+                    'error_rate': s.error_rate,
+                    'open': s.is_open(now),
+                    'requests': s.requests,
+                    'failures': s.failures,
+                }
+                for s in stats
+            ]
+            for network, stats in self.endpoints.items()
+        }
+
+def _is_retryable(body: Any) -> bool:
+    calls = body if isinstance(body, list) else [body]
+    return all(isinstance(call, dict) and call.get('method') in RETRYABLE_METHODS for call in calls)
+
+_default_rpc_client: Optional[RPCClient] = None
+
+def get_default_rpc_client() -> RPCClient:
+    global _default_rpc_client
+    if _default_rpc_client is None:
+        _default_rpc_client = RPCClient()
+    return _default_rpc_client
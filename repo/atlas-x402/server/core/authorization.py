@@ -0,0 +1,112 @@
+from typing import Dict, Any, Optional
+import re
+import time
+from atlas_x402.metrics import instrument_verification
+from atlas_x402.eip712 import CHAIN_IDS, recover_typed_data, transfer_with_authorization
+
+_NONCE = re.compile(r'^0x[0-9a-fA-F]{64}$')
+_ADDRESS = re.compile(r'^0x[0-9a-fA-F]{40}$')
+_CLOCK_SKEW_SECONDS = 60
+
+def _invalid(reason: str) -> Dict[str, Any]:
+    return {
+        'isValid': False,
+        'invalidReason': reason,
+    }
+
+def check_authorization_structure(
+    payment_payload: Dict[str, Any],
+    requirements: Dict[str, Any],
+    now: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    payload = payment_payload.get('payload', {}) or {}
+    authorization = payload.get('authorization')
+    signature = payload.get('signature')
+
+    if not isinstance(authorization, dict) or not signature:
+        return _invalid('Missing authorization or signature')
+
+    for field in ('from', 'to'):
+        if not _ADDRESS.match(str(authorization.get(field, ''))):
+            return _invalid(f'Invalid {field} address')
+
+    if not _NONCE.match(str(authorization.get('nonce', ''))):
+        return _invalid('Invalid nonce')
+
+    if requirements.get('network') not in CHAIN_IDS:
+        return _invalid(f"Unsupported network: {requirements.get('network')}")
+
+    if payment_payload.get('network') and payment_payload['network'] != requirements.get('network'):
+        return _invalid('Network mismatch')
+
+    if authorization['to'].lower() != str(requirements.get('payTo', '')).lower():
+        return _invalid('Recipient does not match payTo')
+
+    try:
+        value = int(authorization['value'])
+        valid_after = int(authorization['validAfter'])
+        valid_before = int(authorization['validBefore'])
+        required = int(requirements.get('maxAmountRequired', 0))
+    except (KeyError, TypeError, ValueError):
+        return _invalid('Invalid authorization amounts')
+
+    if value < required:
+        return _invalid('Authorized amount is below maxAmountRequired')
+
+    now = int(now if now is not None else time.time())
+    if valid_after > now:
+        return _invalid('Authorization is not yet valid')
+    if valid_before <= now:
+        return _invalid('Authorization has expired')
+
+    max_timeout = requirements.get('maxTimeoutSeconds')
+    if max_timeout and valid_before > now + int(max_timeout) + _CLOCK_SKEW_SECONDS:
+        return _invalid('Authorization validity window exceeds maxTimeoutSeconds')
+
+    return None
+
+def is_authorization_payload(payment_payload: Dict[str, Any]) -> bool:
+    payload = payment_payload.get('payload', {}) or {}
+    return isinstance(payload.get('authorization'), dict)
+
+@instrument_verification('authorization')
+def verify_authorization(
+    payment_payload: Dict[str, Any],
+    requirements: Dict[str, Any],
+    now: Optional[float] = None
+) -> Dict[str, Any]:
+    invalid = check_authorization_structure(payment_payload, requirements, now)
+    if invalid:
+        return invalid
+
+    payload = payment_payload['payload']
+    authorization = payload['authorization']
+    extra = requirements.get('extra') or {}
+    typed_data = transfer_with_authorization(
+        authorization,
+        asset=requirements.get('asset', ''),
+        network=requirements['network'],
+        name=extra.get('name', 'USDC'),
+        version=extra.get('version', '2'),
+    )
+
+    try:
+        signer = recover_typed_data(typed_data, payload['signature'])
+    except ValueError as e:
+        return _invalid(f'Invalid signature: {e}')
+
+    if signer.lower() != authorization['from'].lower():
+        return _invalid('Signature does not match authorization sender')
+
+    return {
+        'isValid': True,
+        'payer': signer,
+    }
+
+async def verify_authorization_async(
+    payment_payload: Dict[str, Any],
+    requirements: Dict[str, Any],
+    now: Optional[float] = None
+) -> Dict[str, Any]:
+    # Hashing and recovery both run in native code (tens of microseconds), cheaper than a thread hop.
+    return verify_authorization(payment_payload, requirements, now)
@@ -0,0 +1,214 @@
+from typing import Dict, Any, Optional, List, Tuple
+import asyncio
+from atlas_x402.metrics import BATCH_SECONDS, VERIFICATIONS, get_default_metrics
+from atlas_x402.rpc import RPCClient, get_default_rpc_client
+from atlas_x402.transport import HTTPTransport, get_default_transport
+from .verification import (
+    verify_payment,
+    _evm_rpc_url,
+    _solana_rpc_url,
+    _facilitator_request,
+    _facilitator_result,
+    _receipt_result,
+    _solana_transaction_result,
+)
+
+_Pending = Tuple[Dict[str, Any], Dict[str, Any], Any, asyncio.Future]
+
+_BACKENDS = {
+    'evm': 'evm_rpc',
+    'solana': 'solana_rpc',
+    'facilitator': 'facilitator',
+}
+
+class BatchVerifier:
+    def __init__(
+        self,
+        facilitator_url: Optional[str] = None,
+        rpc_url: Optional[str] = None,
+        transport: Optional[HTTPTransport] = None,
+        window: float = 0.002,
+        max_batch_size: int = 100,
+        facilitator_batch_path: Optional[str] = None,
+        rpc: Optional[RPCClient] = None
+    ):
+        self.facilitator_url = facilitator_url
+        self.rpc_url = rpc_url
+        self.transport = transport or get_default_transport()
+        self.rpc = rpc or get_default_rpc_client()
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.facilitator_batch_path = facilitator_batch_path
+        self._pending: Dict[Tuple[str, str], List[_Pending]] = {}
+        self._timers: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+        self._tasks = set()
+        self.batches_sent = 0
+        self.items_sent = 0
+
+    async def verify(self, payment_payload: Dict[str, Any], requirements: Dict[str, Any]) -> Dict[str, Any]:
+        # A facilitator without a batch endpoint still takes one /verify per payment, so holding
+        # requests for the window would only add latency; they go straight through instead.
+        if self.window <= 0 or (self.facilitator_url and not self.facilitator_batch_path):
+            return await verify_payment(
+                payment_payload,
+                requirements,
+                facilitator_url=self.facilitator_url,
+                rpc_url=self.rpc_url,
+                transport=self.transport,
+                rpc=self.rpc
+            )
+
+        payload = payment_payload.get('payload', {}) or {}
+        scheme = requirements.get('scheme')
+
+        if self.facilitator_url:
+            key = ('facilitator', self.facilitator_url)
+            item = None
+        elif scheme == 'x402+eip712':
+            item = payload.get('transactionHash')
+            if not item:
+                return {
+                    'isValid': False,
+                    'invalidReason': 'Missing transaction hash',
+                }
+            key = ('evm', self._rpc_target(requirements.get('network'), _evm_rpc_url(requirements, self.rpc_url)))
+        elif scheme == 'x402+solana':
+            item = payload.get('signature')
+            if not item:
+                return {
+                    'isValid': False,
+                    'invalidReason': 'Missing transaction signature',
+                }
+            key = ('solana', self._rpc_target('solana', _solana_rpc_url(self.rpc_url)))
+        else:
+            return {
+                'isValid': False,
+                'invalidReason': f'Unsupported scheme: {scheme}',
+            }
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((payment_payload, requirements, item, future))
+
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+
+        return await future
+
+    async def flush(self):
+        for key in list(self._pending):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self, key: Tuple[str, str]):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        # Callers that gave up while waiting are dropped rather than verified for nobody.
+        batch = [pending for pending in self._pending.pop(key, None) or () if not pending[3].done()]
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._dispatch(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, key: Tuple[str, str], batch: List[_Pending]):
+        kind, url = key
+        self.batches_sent += 1
+        self.items_sent += len(batch)
+        metrics = get_default_metrics()
+        backend = _BACKENDS[kind]
+
+        error: BaseException = Exception('Batch verification returned no result')
+        try:
+            with metrics.span(f'x402.verify.{backend}.batch', BATCH_SECONDS, backend=backend):
+                results = await self._verify_batch(kind, url, batch)
+            if len(results) != len(batch):
+                raise Exception(f'Batch verification returned {len(results)} results for {len(batch)} requests')
+
+            for (_, _, _, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    metrics.inc(VERIFICATIONS, backend=backend, outcome='error')
+                else:
+                    metrics.inc(VERIFICATIONS, backend=backend, outcome='valid' if result.get('isValid') else 'invalid')
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except Exception as e:
+            error = e
+        except asyncio.CancelledError as e:
+            error = e
+            raise
+        finally:
+            # Every caller gets an answer, whatever went wrong with the batch.
+            unresolved = [future for _, _, _, future in batch if not future.done()]
+            if unresolved:
+                metrics.inc(VERIFICATIONS, len(unresolved), backend=backend, outcome='error')
+            for future in unresolved:
+                if isinstance(error, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(error)
+
+    async def _verify_batch(self, kind: str, url: str, batch: List[_Pending]) -> List[Any]:
+        if kind == 'evm':
+            receipts = await self._rpc_batch(url, 'eth_getTransactionReceipt', [[item] for _, _, item, _ in batch])
+            return [r if isinstance(r, Exception) else _receipt_result(r) for r in receipts]
+        if kind == 'solana':
+            transactions = await self._rpc_batch(url, 'getTransaction', [[item, {'encoding': 'json'}] for _, _, item, _ in batch])
+            return [t if isinstance(t, Exception) else _solana_transaction_result(t) for t in transactions]
+        return await self._facilitator_batch(url, batch)
+
+    def _rpc_target(self, network: Optional[str], url: str) -> str:
+        if self.rpc_url is None and self.rpc.supports(network):
+            return network
+        return url
+
+    async def _rpc_batch(self, target: str, method: str, params: List[List[Any]]) -> List[Any]:
+        body = [
+            {'jsonrpc': '2.0', 'id': i, 'method': method, 'params': p}
+            for i, p in enumerate(params)
+        ]
+        if self.rpc.supports(target):
+            data = await self.rpc.request(body, target)
+        else:
+            async with self.transport.post(target, json=body) as response:
+                data = await response.json()
+
+        if not isinstance(data, list):
+            raise Exception(f"RPC batch failed: {data.get('error') if isinstance(data, dict) else data}")
+
+        by_id = {entry.get('id'): entry for entry in data if isinstance(entry, dict)}
+        results = []
+        for i in range(len(params)):
+            entry = by_id.get(i)
+            if entry is None:
+                results.append(Exception(f'RPC batch returned no result for request {i}'))
+            elif entry.get('error') is not None:
+                results.append(Exception(f"RPC request failed: {entry['error']}"))
+            else:
+                results.append(entry.get('result'))
+        return results
+
+    async def _facilitator_batch(self, url: str, batch: List[_Pending]) -> List[Dict[str, Any]]:
+        async with self.transport.post(
+            f'{url}{self.facilitator_batch_path}',
+            json=[_facilitator_request(payload, requirements) for payload, requirements, _, _ in batch]
+        ) as response:
+            data = await response.json()
+        if not isinstance(data, list) or len(data) != len(batch):
+            count = len(data) if isinstance(data, list) else 'no'
+            raise Exception(f'Facilitator batch failed: expected {len(batch)} results, got {count}')
+        return [
+            _facilitator_result(result) if isinstance(result, dict) else Exception(f'Invalid facilitator result: {result!r}')
+            for result in data
+        ]
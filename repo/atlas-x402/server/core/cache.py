@@ -0,0 +1,238 @@
+from typing import Dict, Any, Optional, Callable, List, Tuple
+from collections import OrderedDict
+import hashlib
+import heapq
+import json
+import time
+
+# Authorizations stay in the spent ledger a little past validBefore to cover clock skew.
+_CLOCK_SKEW_SECONDS = 60
+
+class SpentLedgerFull(Exception):
+    pass
+
+class PayerLedgerFull(SpentLedgerFull):
+    pass
+
+def payment_key(payment_payload: Dict[str, Any]) -> str:
+    payload = payment_payload.get('payload', {}) or {}
+    key = payload.get('transactionHash') or payload.get('signature')
+    if key:
+        return str(key).lower() if str(key).startswith('0x') else str(key)
+    encoded = json.dumps(payment_payload, sort_keys=True, separators=(',', ':')).encode()
+    return 'sha256:' + hashlib.sha256(encoded).hexdigest()
+
+def replay_key(payment_payload: Dict[str, Any], requirements: Optional[Dict[str, Any]] = None) -> str:
+    # An EIP-3009 authorization is identified on-chain by (token, from, nonce), not by how its
+    # signature happens to be encoded, so that is what the spent ledger records.
+    authorization = (payment_payload.get('payload', {}) or {}).get('authorization')
+    if isinstance(authorization, dict) and authorization.get('from') and authorization.get('nonce'):
+        requirements = requirements or {}
+        network = requirements.get('network') or payment_payload.get('network') or ''
+        asset = str(requirements.get('asset') or '').lower()
+        return f"eip3009:{network}:{asset}:{str(authorization['from']).lower()}:{str(authorization['nonce']).lower()}"
+    return payment_key(payment_payload)
+
+class _TTLStore:
+    def __init__(self, max_entries: int, clock: Callable[[], float]):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str):
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def replay_window(payment_payload: Dict[str, Any], now: Optional[float] = None) -> Optional[float]:
+    authorization = (payment_payload.get('payload', {}) or {}).get('authorization')
+    if not isinstance(authorization, dict):
+        return None
+    try:
+        valid_before = int(authorization['validBefore'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    now = now if now is not None else time.time()
+    return max(0.0, valid_before - now) + _CLOCK_SKEW_SECONDS
+
+class _SpentLedger:
+    # Authorizations leave only once their validBefore has passed; evicting a live one would reopen
+    # replay, so a full ledger refuses new entries instead. Each payer may hold only a share of the
+    # ledger, so one wallet minting authorizations is pushed back on long before everyone else is.
+    # Transaction hashes and signatures can be resubmitted forever and are never dropped; each one
+    # is a settled on-chain transfer, so their growth is bounded by revenue rather than by requests.
+    def __init__(self, max_entries: int, max_per_payer: int, clock: Callable[[], float], path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_per_payer = max_per_payer
+        self.clock = clock
+        self._expiry: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._per_payer: Dict[str, int] = {}
+        self._permanent = set()
+        self._log = None
+        if path is not None:
+            try:
+                with open(path) as f:
+                    self._permanent.update(line.strip() for line in f if line.strip())
+            except FileNotFoundError:
+                pass
+            self._log = open(path, 'a', buffering=1)
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._permanent:
+            return True
+        entry = self._expiry.get(key)
+        if entry is None:
+            return False
+        if entry[0] <= self.clock():
+            self._remove(key)
+            return False
+        return True
+
+    def add(self, key: str, ttl: Optional[float], payer: Optional[str] = None):
+        if ttl is None:
+            self._permanent.add(key)
+            if self._log is not None:
+                self._log.write(key + '\n')
+            return
+        
+        self._purge()
+        if len(self._expiry) >= self.max_entries:
+            raise SpentLedgerFull(f'Spent ledger is full ({self.max_entries} live authorizations)')
+        if payer is not None and self._per_payer.get(payer, 0) >= self.max_per_payer:
+            raise PayerLedgerFull(f'{payer} has {self.max_per_payer} live authorizations')
+        expires_at = self.clock() + ttl
+        self._expiry[key] = (expires_at, payer)
+        heapq.heappush(self._heap, (expires_at, key))
+        if payer is not None:
+            self._per_payer[payer] = self._per_payer.get(payer, 0) + 1
+
+    def _remove(self, key: str):
+        _, payer = self._expiry.pop(key)
+        if payer is not None:
+            remaining = self._per_payer[payer] - 1
+            if remaining:
+                self._per_payer[payer] = remaining
+            else:
+                del self._per_payer[payer]
+
+    def _purge(self):
+        now = self.clock()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._expiry.get(key)
+            if entry is not None and entry[0] == expires_at:
+                self._remove(key)
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def __len__(self) -> int:
+        return len(self._expiry) + len(self._permanent)
+
+class VerificationCache:
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl: float = 300.0,
+        negative_ttl: float = 5.0,
+        max_spent: Optional[int] = None,
+        payments_per_second: float = 1_000.0,
+        authorization_window: float = 180.0,
+        max_spent_per_payer: int = 1_000,
+        spent_path: Optional[str] = None,
+        blocked_ttl: float = 86_400.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        # Live authorizations are bounded by throughput times how long each stays replayable
+        # (maxTimeoutSeconds plus clock skew, 180s for the default 60s routes).
+        if max_spent is None:
+            max_spent = int(payments_per_second * authorization_window)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.authorization_window = authorization_window
+        self.blocked_ttl = blocked_ttl
+        self._results = _TTLStore(max_entries, clock)
+        self._spent = _SpentLedger(max_spent, max_spent_per_payer, clock, spent_path)
+        self._blocked = _TTLStore(max_entries, clock)
+        self.hits = 0
+        self.misses = 0
+        self.replays = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        ttl = self.ttl if result.get('isValid') else self.negative_ttl
+        if ttl > 0:
+            self._results.set(key, result, ttl)
+
+    def invalidate(self, key: str):
+        self._results.discard(key)
+
+    def is_spent(self, key: str) -> bool:
+        if key not in self._spent:
+            return False
+        self.replays += 1
+        return True
+
+    def mark_spent(self, key: str, ttl: Optional[float] = None, payer: Optional[str] = None) -> bool:
+        # Without a ttl the key stays spent for good; authorizations pass their replay_window.
+        if key in self._spent:
+            self.replays += 1
+            return False
+        self._spent.add(key, ttl, payer.lower() if payer else None)
+        return True
+
+    def block_payer(self, payer: str):
+        self._blocked.set(payer.lower(), True, self.blocked_ttl)
+
+    def is_payer_blocked(self, payer: str) -> bool:
+        return self._blocked.get(payer.lower()) is not None
+
+    def close(self):
+        self._spent.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._results),
+            'spent': len(self._spent),
+            'blocked_payers': len(self._blocked),
+            'hits': self.hits,
+            'misses': self.misses,
+            'replays': self.replays,
+        }
+
+_default_cache: Optional[VerificationCache] = None
+
+def get_default_cache() -> VerificationCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = VerificationCache()
+    return _default_cache
@@ -0,0 +1,121 @@
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+import asyncio
+import time
+
+def payment_payer(payment_payload: Dict[str, Any]) -> Optional[str]:
+    payload = payment_payload.get('payload', {}) or {}
+    authorization = payload.get('authorization') or {}
+    payer = authorization.get('from') or payload.get('from')
+    return payer.lower() if isinstance(payer, str) and payer else None
+
+class OptimisticSettler:
+    def __init__(
+        self,
+        max_exposure: int = 1_000_000,
+        max_amount: int = 100_000,
+        max_total_exposure: int = 100_000_000,
+        workers: int = 4,
+        max_queue: int = 10_000,
+        blocklist_ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_exposure = max_exposure
+        self.max_amount = max_amount
+        self.max_total_exposure = max_total_exposure
+        self.total_exposure = 0
+        self.workers = workers
+        self.blocklist_ttl = blocklist_ttl
+        self.clock = clock
+        self.exposure: Dict[str, int] = {}
+        self.blocklist: Dict[str, Optional[float]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._max_queue = max_queue
+        self._workers: List[asyncio.Task] = []
+        self.served = 0
+        self.settled = 0
+        self.failed = 0
+        self.errors = 0
+
+    def is_blocked(self, payer: str) -> bool:
+        if payer not in self.blocklist:
+            return False
+        expires_at = self.blocklist[payer]
+        if expires_at is not None and expires_at <= self.clock():
+            del self.blocklist[payer]
+            return False
+        return True
+
+    def block(self, payer: str):
+        self.blocklist[payer] = self.clock() + self.blocklist_ttl if self.blocklist_ttl else None
+
+    def try_reserve(self, payer: str, amount: int) -> bool:
+        if amount > self.max_amount or self.is_blocked(payer):
+            return False
+        if self._queue is not None and self._queue.full():
+            return False
+        current = self.exposure.get(payer, 0)
+        if current + amount > self.max_exposure or self.total_exposure + amount > self.max_total_exposure:
+            return False
+        self.exposure[payer] = current + amount
+        self.total_exposure += amount
+        return True
+
+    def release(self, payer: str, amount: int):
+        self.total_exposure = max(0, self.total_exposure - amount)
+        remaining = self.exposure.get(payer, 0) - amount
+        if remaining > 0:
+            self.exposure[payer] = remaining
+        else:
+            self.exposure.pop(payer, None)
+
+    def submit(self, payer: str, amount: int, job: Callable[[], Awaitable[bool]]):
+        self._ensure_workers()
+        self.served += 1
+        self._queue.put_nowait((payer, amount, job))
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(self._max_queue)
+        if not self._workers:
+            self._workers = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def _work(self):
+        while True:
+            payer, amount, job = await self._queue.get()
+            try:
+                ok = await job()
+            except Exception:
+                self.errors += 1
+            else:
+                if ok:
+                    self.settled += 1
+                else:
+                    self.failed += 1
+                    self.block(payer)
+            finally:
+                # Exposure is held only while settlement is pending, however it ends.
+                self.release(payer, amount)
+                self._queue.task_done()
+
+    async def drain(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        await self.drain()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'served': self.served,
+            'settled': self.settled,
+            'failed': self.failed,
+            'errors': self.errors,
+            'pending': self._queue.qsize() if self._queue is not None else 0,
+            'total_exposure': self.total_exposure,
+            'exposed_payers': len(self.exposure),
+            'blocked_payers': len(self.blocklist),
+        }
@@ -0,0 +1,118 @@
+from typing import Dict, Any, Optional, Tuple, Union
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+import json
+
+USDC_DECIMALS = 6
+
+NETWORK_REQUIREMENTS = {
+    'base': {
+        'scheme': 'x402+eip712',
+        'asset': '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913',
+        'extra': {'name': 'USDC', 'version': '2'},
+    },
+    'solana': {
+        'scheme': 'x402+solana',
+        'asset': 'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v',
+        'extra': None,
+    },
+}
+
+def to_micro_units(price: Union[str, int, Decimal], decimals: int = USDC_DECIMALS) -> int:
+    try:
+        value = Decimal(str(price).strip())
+    except InvalidOperation:
+        raise ValueError(f'Invalid price: {price!r}')
+
+    if not value.is_finite() or value < 0:
+        raise ValueError(f'Invalid price: {price!r}')
+
+    units = value.scaleb(decimals)
+    if units != units.to_integral_value():
+        raise ValueError(f'Price {price!r} has more than {decimals} decimal places')
+
+    return int(units)
+
+NETWORK_ALIASES = {
+    'solana-mainnet': 'solana',
+}
+
+def network_requirements(network: str) -> Dict[str, Any]:
+    requirements = NETWORK_REQUIREMENTS.get(NETWORK_ALIASES.get(network, network))
+    if requirements is None:
+        raise ValueError(f'Unsupported network: {network!r} (expected one of {", ".join(NETWORK_REQUIREMENTS)})')
+    return requirements
+
+@dataclass
+class RoutePrice:
+    price: str
+    network: str
+    merchant_address: str
+    description: Optional[str] = None
+    mime_type: str = 'application/json'
+    max_timeout_seconds: int = 60
+
+class CompiledRoute:
+    __slots__ = ('path', 'requirements', 'amount', '_prefix', '_suffix')
+
+    def __init__(self, path: str, route: RoutePrice):
+        if not route.merchant_address:
+            raise ValueError(f'Route {path} has no merchant address')
+
+        self.path = path
+        self.amount = to_micro_units(route.price)
+        network = network_requirements(route.network)
+        self.requirements = {
+            'scheme': network['scheme'],
+            'network': route.network,
+            'maxAmountRequired': str(self.amount),
+            'resource': None,
+            'description': route.description or f'Payment required for {path}',
+            'mimeType': route.mime_type,
+            'payTo': route.merchant_address,
+            'maxTimeoutSeconds': route.max_timeout_seconds,
+            'asset': network['asset'],
+            'extra': network['extra'],
+        }
+
+        marker = '\x00resource\x00'
+        body = json.dumps({
+            'x402Version': 1,
+            'accepts': [dict(self.requirements, resource=marker)],
+            'error': None,
+        }, separators=(',', ':'))
+        prefix, suffix = body.split(json.dumps(marker))
+        self._prefix = prefix.encode()
+        self._suffix = suffix.encode()
+
+    def challenge(self, resource: str) -> bytes:
+        return self._prefix + json.dumps(resource).encode() + self._suffix
+
+    def requirements_for(self, resource: str) -> Dict[str, Any]:
+        return dict(self.requirements, resource=resource)
+
+class PricingTable:
+    def __init__(self, routes: Dict[str, Union[RoutePrice, Dict[str, Any]]]):
+        self._routes: Dict[Tuple[Optional[str], str], CompiledRoute] = {}
+
+        for key, route in routes.items():
+            if isinstance(route, dict):
+                route = RoutePrice(**route)
+            method, path = self._parse_key(key)
+            self._routes[(method, path)] = CompiledRoute(path, route)
+
+    @staticmethod
+    def _parse_key(key: str) -> Tuple[Optional[str], str]:
+        parts = key.split(None, 1)
+        if len(parts) == 2:
+            return parts[0].upper(), parts[1]
+        if not key.startswith('/'):
+            raise ValueError(f'Invalid route: {key!r}')
+        return None, key
+
+    def match(self, method: str, path: str) -> Optional[CompiledRoute]:
+        routes = self._routes
+        return routes.get((method, path)) or routes.get((None, path))
+
+    def __len__(self) -> int:
+        return len(self._routes)
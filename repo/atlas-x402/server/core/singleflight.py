@@ -0,0 +1,60 @@
+from typing import Dict, Any, Optional, Callable, Awaitable, TypeVar
+import asyncio
+import hashlib
+import json
+from atlas_x402.metrics import SINGLE_FLIGHT_CALLS, get_default_metrics
+
+T = TypeVar('T')
+
+# Only fields that change whether a payment is valid are part of the key, so the same payment
+# presented on different URLs or query strings still shares one verification.
+_REQUIREMENT_FIELDS = ('scheme', 'network', 'asset', 'payTo', 'maxAmountRequired', 'maxTimeoutSeconds', 'extra')
+
+def payload_hash(payment_payload: Dict[str, Any], requirements: Optional[Dict[str, Any]] = None) -> str:
+    terms = None
+    if requirements is not None:
+        terms = {field: requirements.get(field) for field in _REQUIREMENT_FIELDS}
+        if isinstance(terms['payTo'], str):
+            terms['payTo'] = terms['payTo'].lower()
+        if isinstance(terms['asset'], str) and terms['asset'].startswith('0x'):
+            terms['asset'] = terms['asset'].lower()
+    encoded = json.dumps([payment_payload, terms], sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            self.upstream_calls += 1
+            get_default_metrics().inc(SINGLE_FLIGHT_CALLS, result='upstream')
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+        else:
+            self.coalesced_calls += 1
+            get_default_metrics().inc(SINGLE_FLIGHT_CALLS, result='coalesced')
+
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'in_flight': len(self._inflight),
+            'upstream_calls': self.upstream_calls,
+            'coalesced_calls': self.coalesced_calls,
+        }
+
+_default_single_flight: Optional[SingleFlight] = None
+
+def get_default_single_flight() -> SingleFlight:
+    global _default_single_flight
+    if _default_single_flight is None:
+        _default_single_flight = SingleFlight()
+    return _default_single_flight
@@ -1,57 +1,151 @@
 from typing import Dict, Any, Optional
-import aiohttp
+from functools import partial
+import base64
 import json
+from atlas_x402.metrics import CACHE_REQUESTS, get_default_metrics, instrument_verification
+from atlas_x402.rpc import RPCClient, get_default_rpc_client
+from atlas_x402.transport import HTTPTransport, get_default_transport
+from .authorization import is_authorization_payload, verify_authorization_async
+from .cache import SpentLedgerFull, VerificationCache, payment_key, replay_key, replay_window
+from .optimistic import payment_payer
+from .watcher import PaymentIndex
+from .singleflight import SingleFlight, get_default_single_flight, payload_hash
 
 async def verify_payment(
     payment_payload: Dict[str, Any],
     requirements: Dict[str, Any],
     facilitator_url: Optional[str] = None,
-    rpc_url: Optional[str] = None
+    rpc_url: Optional[str] = None,
+    transport: Optional[HTTPTransport] = None,
+    cache: Optional[VerificationCache] = None,
+    single_flight: Optional[SingleFlight] = None,
+    offline: bool = False,
+    index: Optional[PaymentIndex] = None,
+    rpc: Optional[RPCClient] = None
+) -> Dict[str, Any]:
+    if offline and requirements.get('scheme') == 'x402+eip712' and is_authorization_payload(payment_payload):
+        if cache is None:
+            return await verify_authorization_async(payment_payload, requirements)
+        spent_key = replay_key(payment_payload, requirements)
+        if cache.is_spent(spent_key):
+            return {
+                'isValid': False,
+                'invalidReason': 'Payment already used',
+            }
+        result = await verify_authorization_async(payment_payload, requirements)
+        return _consume(cache, spent_key, payment_payload, result)
+    
+    single_flight = single_flight or get_default_single_flight()
+    verify = partial(_verify_uncached, payment_payload, requirements, facilitator_url, rpc_url, transport, index, rpc)
+    
+    if cache is None:
+        return await single_flight.do(payload_hash(payment_payload, requirements), verify)
+    
+    key = payment_key(payment_payload)
+    spent_key = replay_key(payment_payload, requirements)
+    if cache.is_spent(spent_key):
+        return {
+            'isValid': False,
+            'invalidReason': 'Payment already used',
+        }
+    
+    cached = cache.get(key)
+    get_default_metrics().inc(CACHE_REQUESTS, cache='verification', result='miss' if cached is None else 'hit')
+    if cached is not None:
+        return _consume(cache, spent_key, payment_payload, cached)
+    
+    result = await single_flight.do(payload_hash(payment_payload, requirements), verify)
+    cache.put(key, result)
+    return _consume(cache, spent_key, payment_payload, result)
+
+def _consume(
+    cache: VerificationCache,
+    key: str,
+    payment_payload: Dict[str, Any],
+    result: Dict[str, Any]
+) -> Dict[str, Any]:
+    # A positive result spends the payment, whether it came from the cache or a fresh verification.
+    if not result.get('isValid'):
+        return result
+    try:
+        if cache.mark_spent(key, replay_window(payment_payload), payment_payer(payment_payload)):
+            return result
+    except SpentLedgerFull:
+        return {
+            'isValid': False,
+            'invalidReason': 'Replay ledger is full',
+        }
+    return {
+        'isValid': False,
+        'invalidReason': 'Payment already used',
+    }
+
+async def _verify_uncached(
+    payment_payload: Dict[str, Any],
+    requirements: Dict[str, Any],
+    facilitator_url: Optional[str],
+    rpc_url: Optional[str],
+    transport: Optional[HTTPTransport],
+    index: Optional[PaymentIndex] = None,
+    rpc: Optional[RPCClient] = None
 ) -> Dict[str, Any]:
     if facilitator_url:
-        return await verify_via_facilitator(payment_payload, requirements, facilitator_url)
+        return await verify_via_facilitator(payment_payload, requirements, facilitator_url, transport)
     
     scheme = requirements.get('scheme')
     if scheme == 'x402+eip712':
-        return await verify_eip712_payment(payment_payload, requirements, rpc_url)
+        return await verify_eip712_payment(payment_payload, requirements, rpc_url, transport, index, rpc)
     elif scheme == 'x402+solana':
-        return await verify_solana_payment(payment_payload, requirements, rpc_url)
+        return await verify_solana_payment(payment_payload, requirements, rpc_url, transport, rpc)
     
     return {
         'isValid': False,
         'invalidReason': f'Unsupported scheme: {scheme}',
     }
 
+@instrument_verification('facilitator')
 async def verify_via_facilitator(
     payment_payload: Dict[str, Any],
     requirements: Dict[str, Any],
-    facilitator_url: str
+    facilitator_url: str,
+    transport: Optional[HTTPTransport] = None
 ) -> Dict[str, Any]:
-    import base64
-    
-    payment_header = base64.b64encode(json.dumps(payment_payload).encode()).decode()
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            f'{facilitator_url}/verify',
-            json={
-                'x402Version': 1,
-                'paymentHeader': payment_header,
-                'paymentRequirements': requirements,
-            }
-        ) as response:
-            result = await response.json()
-            return {
-                'isValid': result.get('isValid', False),
-                'invalidReason': result.get('invalidReason'),
-            }
+    transport = transport or get_default_transport()
+    async with transport.post(
+        f'{facilitator_url}/verify',
+        json=_facilitator_request(payment_payload, requirements)
+    ) as response:
+        result = await response.json()
+        return _facilitator_result(result)
+
+async def settle_via_facilitator(
+    payment_payload: Dict[str, Any],
+    requirements: Dict[str, Any],
+    facilitator_url: str,
+    transport: Optional[HTTPTransport] = None
+) -> Dict[str, Any]:
+    transport = transport or get_default_transport()
+    async with transport.post(
+        f'{facilitator_url}/settle',
+        json=_facilitator_request(payment_payload, requirements)
+    ) as response:
+        result = await response.json()
+        return {
+            'success': result.get('success', False),
+            'error': result.get('error'),
+            'txHash': result.get('txHash'),
+            'networkId': result.get('networkId'),
+        }
 
+@instrument_verification('evm_rpc')
 async def verify_eip712_payment(
     payment_payload: Dict[str, Any],
     requirements: Dict[str, Any],
-    rpc_url: Optional[str]
+    rpc_url: Optional[str],
+    transport: Optional[HTTPTransport] = None,
+    index: Optional[PaymentIndex] = None,
+    rpc: Optional[RPCClient] = None
 ) -> Dict[str, Any]:
-    rpc = rpc_url or ('https://mainnet.base.org' if requirements.get('network') == 'base' else 'https://mainnet.infura.io/v3/...')
     tx_hash = payment_payload.get('payload', {}).get('transactionHash')
     
     if not tx_hash:
@@ -60,35 +154,38 @@ async def verify_eip712_payment(
             'invalidReason': 'Missing transaction hash',
         }
     
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            rpc,
-            json={
-                'jsonrpc': '2.0',
-                'method': 'eth_getTransactionReceipt',
-                'params': [tx_hash],
-                'id': 1,
-            }
-        ) as response:
-            result = await response.json()
-            receipt = result.get('result')
-            
-            if not receipt or receipt.get('status') != '0x1':
-                return {
-                    'isValid': False,
-                    'invalidReason': 'Transaction failed or not found',
-                }
-            
-            return {
-                'isValid': True,
-            }
+    if index is not None:
+        indexed = index.match(tx_hash, requirements)
+        get_default_metrics().inc(CACHE_REQUESTS, cache='index', result='miss' if indexed is None else 'hit')
+        if indexed is not None:
+            return indexed
+    
+    rpc = rpc or get_default_rpc_client()
+    if rpc_url is None and rpc.supports(requirements.get('network')):
+        receipt = await rpc.call('eth_getTransactionReceipt', [tx_hash], requirements['network'])
+        return _receipt_result(receipt)
+    
+    transport = transport or get_default_transport()
+    async with transport.post(
+        _evm_rpc_url(requirements, rpc_url),
+        json={
+            'jsonrpc': '2.0',
+            'method': 'eth_getTransactionReceipt',
+            'params': [tx_hash],
+            'id': 1,
+        }
+    ) as response:
+        result = await response.json()
+        return _receipt_result(result.get('result'))
 
+@instrument_verification('solana_rpc')
 async def verify_solana_payment(
     payment_payload: Dict[str, Any],
     requirements: Dict[str, Any],
-    rpc_url: Optional[str]
+    rpc_url: Optional[str],
+    transport: Optional[HTTPTransport] = None,
+    rpc: Optional[RPCClient] = None
 ) -> Dict[str, Any]:
-    rpc = rpc_url or 'https://api.mainnet-beta.solana.com'
     signature = payment_payload.get('payload', {}).get('signature')
     
     if not signature:
@@ -97,28 +194,65 @@ async def verify_solana_payment(
             'invalidReason': 'Missing transaction signature',
         }
     
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            rpc,
-            json={
-                'jsonrpc': '2.0',
-                'id': 1,
-                'method': 'getTransaction',
-                'params': [signature, {'encoding': 'json'}],
-            }
-        ) as response:
-            result = await response.json()
-            transaction = result.get('result')
-            
-            if not transaction or transaction.get('meta', {}).get('err'):
-                return {
-                    'isValid': False,
-                    'invalidReason': 'Transaction failed or not found',
-                }
-            
-            return {
-                'isValid': True,
-            }
+    rpc = rpc or get_default_rpc_client()
+    if rpc_url is None and rpc.supports('solana'):
+        transaction = await rpc.call('getTransaction', [signature, {'encoding': 'json'}], 'solana')
+        return _solana_transaction_result(transaction)
+    
+    transport = transport or get_default_transport()
+    async with transport.post(
+        _solana_rpc_url(rpc_url),
+        json={
+            'jsonrpc': '2.0',
+            'id': 1,
+            'method': 'getTransaction',
+            'params': [signature, {'encoding': 'json'}],
+        }
+    ) as response:
+        result = await response.json()
+        return _solana_transaction_result(result.get('result'))
+
+def _evm_rpc_url(requirements: Dict[str, Any], rpc_url: Optional[str] = None) -> str:
+    return rpc_url or ('https://mainnet.base.org' if requirements.get('network') == 'base' else 'https://mainnet.infura.io/v3/...')
+
+def _solana_rpc_url(rpc_url: Optional[str] = None) -> str:
+    return rpc_url or 'https://api.mainnet-beta.solana.com'
+
+def _facilitator_request(payment_payload: Dict[str, Any], requirements: Dict[str, Any]) -> Dict[str, Any]:
+    payment_header = base64.b64encode(json.dumps(payment_payload).encode()).decode()
+    return {
+        'x402Version': 1,
+        'paymentHeader': payment_header,
+        'paymentRequirements': requirements,
+    }
+
+def _facilitator_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'isValid': result.get('isValid', False),
+        'invalidReason': result.get('invalidReason'),
+    }
+
+def _receipt_result(receipt: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not receipt or receipt.get('status') != '0x1':
+        return {
+            'isValid': False,
+            'invalidReason': 'Transaction failed or not found',
+        }
+    
+    return {
+        'isValid': True,
+    }
+
+def _solana_transaction_result(transaction: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not transaction or transaction.get('meta', {}).get('err'):
+        return {
+            'isValid': False,
+            'invalidReason': 'Transaction failed or not found',
+        }
+    
+    return {
+        'isValid': True,
+    }
 
 
 
@@ -0,0 +1,243 @@
+from typing import Dict, Any, Optional, List, Callable
+from dataclasses import dataclass
+import asyncio
+import json
+import time
+from atlas_x402.eip712 import keccak256
+from atlas_x402.metrics import WATCHER_ERRORS, get_default_metrics
+from atlas_x402.transport import HTTPTransport, get_default_transport
+from .cache import _TTLStore
+
+TRANSFER_TOPIC = '0x' + keccak256(b'Transfer(address,address,uint256)').hex()
+BASE_USDC = '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913'
+
+@dataclass
+class IncomingTransfer:
+    tx_hash: str
+    from_address: str
+    to_address: str
+    value: int
+    asset: str
+    block_number: int
+    log_index: int
+
+def _topic_address(address: str) -> str:
+    return '0x' + address.lower().replace('0x', '').rjust(64, '0')
+
+def parse_transfer_log(log: Dict[str, Any]) -> Optional[IncomingTransfer]:
+    topics = log.get('topics') or []
+    if len(topics) != 3 or topics[0].lower() != TRANSFER_TOPIC:
+        return None
+    return IncomingTransfer(
+        tx_hash=log['transactionHash'].lower(),
+        from_address='0x' + topics[1][-40:].lower(),
+        to_address='0x' + topics[2][-40:].lower(),
+        value=int(log.get('data') or '0x0', 16),
+        asset=log['address'].lower(),
+        block_number=int(log.get('blockNumber') or '0x0', 16),
+        log_index=int(log.get('logIndex') or '0x0', 16),
+    )
+
+class PaymentIndex:
+    def __init__(
+        self,
+        max_entries: int = 100_000,
+        ttl: float = 3_600.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl
+        self._transfers = _TTLStore(max_entries, clock)
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, transfer: IncomingTransfer):
+        existing = self._transfers.get(transfer.tx_hash) or []
+        existing = [t for t in existing if t.log_index != transfer.log_index]
+        existing.append(transfer)
+        self._transfers.set(transfer.tx_hash, existing, self.ttl)
+
+    def remove(self, tx_hash: str, log_index: Optional[int] = None):
+        tx_hash = tx_hash.lower()
+        if log_index is None:
+            self._transfers.discard(tx_hash)
+            return
+        remaining = [t for t in self._transfers.get(tx_hash) or [] if t.log_index != log_index]
+        if remaining:
+            self._transfers.set(tx_hash, remaining, self.ttl)
+        else:
+            self._transfers.discard(tx_hash)
+
+    def get(self, tx_hash: str) -> Optional[List[IncomingTransfer]]:
+        transfers = self._transfers.get(tx_hash.lower())
+        if transfers is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return transfers
+
+    def match(self, tx_hash: str, requirements: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        transfers = self.get(tx_hash)
+        if transfers is None:
+            return None
+
+        pay_to = str(requirements.get('payTo', '')).lower()
+        asset = str(requirements.get('asset', '')).lower()
+        required = int(requirements.get('maxAmountRequired', 0))
+        for transfer in transfers:
+            if transfer.to_address == pay_to and transfer.value >= required and (not asset or transfer.asset == asset):
+                return {
+                    'isValid': True,
+                    'payer': transfer.from_address,
+                }
+
+        return {
+            'isValid': False,
+            'invalidReason': 'Transfer does not match payment requirements',
+        }
+
+    def __len__(self) -> int:
+        return len(self._transfers)
+
+class TransferWatcher:
+    def __init__(
+        self,
+        merchant_addresses: List[str],
+        rpc_url: str = 'https://mainnet.base.org',
+        ws_url: Optional[str] = None,
+        asset: str = BASE_USDC,
+        index: Optional[PaymentIndex] = None,
+        transport: Optional[HTTPTransport] = None,
+        poll_interval: float = 2.0,
+        lookback_blocks: int = 100,
+        max_block_range: int = 500,
+        confirmations: int = 2,
+        resubscribe_backoff: float = 5.0,
+        max_resubscribe_backoff: float = 300.0
+    ):
+        self.merchant_addresses = [address.lower() for address in merchant_addresses]
+        self.rpc_url = rpc_url
+        self.ws_url = ws_url
+        self.asset = asset
+        self.index = index if index is not None else PaymentIndex()
+        self.transport = transport or get_default_transport()
+        self.poll_interval = poll_interval
+        self.lookback_blocks = lookback_blocks
+        self.max_block_range = max_block_range
+        self.confirmations = confirmations
+        self.resubscribe_backoff = resubscribe_backoff
+        self.max_resubscribe_backoff = max_resubscribe_backoff
+        self.next_block: Optional[int] = None
+        self.mode: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self.errors = 0
+        self.last_error: Optional[BaseException] = None
+
+    @property
+    def log_filter(self) -> Dict[str, Any]:
+        return {
+            'address': self.asset,
+            'topics': [TRANSFER_TOPIC, None, [_topic_address(a) for a in self.merchant_addresses]],
+        }
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def ingest(self, log: Dict[str, Any]):
+        transfer = parse_transfer_log(log)
+        if transfer is None or transfer.to_address not in self.merchant_addresses:
+            return
+        if log.get('removed'):
+            self.index.remove(transfer.tx_hash, transfer.log_index)
+        else:
+            self.index.add(transfer)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        backoff = self.resubscribe_backoff
+        while True:
+            poll_until = None
+            if self.ws_url:
+                started = loop.time()
+                try:
+                    self.mode = 'subscribe'
+                    await self._subscribe()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._error(e)
+                # A subscription that held for a while earns a quick retry; one that keeps failing backs off.
+                if loop.time() - started > backoff:
+                    backoff = self.resubscribe_backoff
+                poll_until = loop.time() + backoff
+                backoff = min(self.max_resubscribe_backoff, backoff * 2)
+
+            # Polling covers the gap until the subscription is tried again (for good without a ws_url).
+            self.mode = 'poll'
+            while poll_until is None or loop.time() < poll_until:
+                try:
+                    await self.poll_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._error(e)
+                await asyncio.sleep(self.poll_interval)
+
+    def _error(self, error: BaseException):
+        self.errors += 1
+        self.last_error = error
+        get_default_metrics().inc(WATCHER_ERRORS, mode=self.mode)
+
+    async def _subscribe(self):
+        async with self.transport.session.ws_connect(self.ws_url) as ws:
+            await ws.send_json({
+                'jsonrpc': '2.0',
+                'id': 1,
+                'method': 'eth_subscribe',
+                'params': ['logs', self.log_filter],
+            })
+            async for message in ws:
+                data = json.loads(message.data)
+                if data.get('id') == 1 and data.get('error'):
+                    raise Exception(f"eth_subscribe failed: {data['error']}")
+                log = (data.get('params') or {}).get('result')
+                if isinstance(log, dict):
+                    self.ingest(log)
+        raise Exception('Log subscription closed')
+
+    async def _rpc(self, method: str, params: List[Any]) -> Any:
+        async with self.transport.post(
+            self.rpc_url,
+            json={'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params}
+        ) as response:
+            result = await response.json()
+        if result.get('error'):
+            raise Exception(f"{method} failed: {result['error']}")
+        return result.get('result')
+
+    async def poll_once(self) -> int:
+        # Polling never sees removed logs, so blocks are only read once they are deep enough not to reorg.
+        latest = int(await self._rpc('eth_blockNumber', []), 16) - self.confirmations
+        if self.next_block is None:
+            self.next_block = max(0, latest - self.lookback_blocks)
+
+        ingested = 0
+        while self.next_block <= latest:
+            to_block = min(latest, self.next_block + self.max_block_range - 1)
+            logs = await self._rpc('eth_getLogs', [dict(
+                self.log_filter,
+                fromBlock=hex(self.next_block),
+                toBlock=hex(to_block),
+            )])
+            for log in logs or []:
+                self.ingest(log)
+                ingested += 1
+            self.next_block = to_block + 1
+
+        return ingested
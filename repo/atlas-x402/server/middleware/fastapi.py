@@ -1,79 +1,462 @@
-from fastapi import Request, HTTPException
-from typing import Optional
+from fastapi import Request, HTTPException, Response
+from typing import Optional, Dict, Any, Union
+from functools import lru_cache, partial
+import asyncio
 import base64
 import json
+from atlas_x402.metrics import CACHE_REQUESTS, PAYMENTS, SETTLEMENTS, Metrics, get_default_metrics, instrument_verification
+from atlas_x402.transport import HTTPTransport, get_default_transport
+from ..core.authorization import is_authorization_payload, verify_authorization_async
+from ..core.batching import BatchVerifier
+from ..core.cache import PayerLedgerFull, SpentLedgerFull, VerificationCache, get_default_cache, payment_key, replay_key, replay_window
+from ..core.optimistic import OptimisticSettler, payment_payer
+from ..core.pricing import CompiledRoute, PricingTable, RoutePrice
+from ..core.singleflight import get_default_single_flight, payload_hash
+from ..core.verification import settle_via_facilitator
+from ..core.watcher import PaymentIndex
+
+DEFAULT_FACILITATOR_URL = 'https://facilitator.payai.network'
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class PaymentError(Exception):
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
 
 async def x402_middleware(
     request: Request,
     price: str,
     network: str,
     merchant_address: str,
-    facilitator_url: Optional[str] = None
+    facilitator_url: Optional[str] = None,
+    transport: Optional[HTTPTransport] = None,
+    cache: Optional[VerificationCache] = None,
+    verifier: Optional[BatchVerifier] = None,
+    offline: bool = False,
+    optimistic: Optional[OptimisticSettler] = None,
+    index: Optional[PaymentIndex] = None
 ):
     payment_header = request.headers.get('x-payment')
+    route = _compile_route(request.url.path, price, network, merchant_address)
     
     if not payment_header:
+        get_default_metrics().inc(PAYMENTS, outcome='challenged')
         raise HTTPException(
             status_code=402,
             detail={
                 'x402Version': 1,
-                'accepts': [{
-                    'scheme': 'x402+eip712' if network == 'base' else 'x402+solana',
-                    'network': network,
-                    'maxAmountRequired': str(int(float(price) * 1_000_000)),
-                    'resource': str(request.url),
-                    'description': f'Payment required for {request.url.path}',
-                    'mimeType': 'application/json',
-                    'payTo': merchant_address,
-                    'maxTimeoutSeconds': 60,
-                    'asset': '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913' if network == 'base' else 'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v',
-                    'extra': {'name': 'USDC', 'version': '2'} if network == 'base' else None,
-                }],
+                'accepts': [route.requirements_for(str(request.url))],
                 'error': None,
             }
         )
     
     try:
-        decoded = base64.b64decode(payment_header).decode('utf-8')
-        payment_payload = json.loads(decoded)
+        request.state.x402_payment = await check_payment(
+            payment_header,
+            network,
+            facilitator_url=facilitator_url,
+            transport=transport,
+            cache=cache,
+            requirements=route.requirements_for(str(request.url)),
+            verifier=verifier,
+            offline=offline,
+            optimistic=optimistic,
+            index=index
+        )
+    except PaymentError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@lru_cache(maxsize=1024)
+def _compile_route(path: str, price: str, network: str, merchant_address: str) -> CompiledRoute:
+    return CompiledRoute(path, RoutePrice(price=price, network=network, merchant_address=merchant_address))
+
+async def check_payment(
+    payment_header: str,
+    network: str,
+    facilitator_url: Optional[str] = None,
+    transport: Optional[HTTPTransport] = None,
+    cache: Optional[VerificationCache] = None,
+    requirements: Optional[Dict[str, Any]] = None,
+    verifier: Optional[BatchVerifier] = None,
+    offline: bool = False,
+    optimistic: Optional[OptimisticSettler] = None,
+    index: Optional[PaymentIndex] = None
+) -> Dict[str, Any]:
+    metrics = get_default_metrics()
+    with metrics.stage('payment'):
+        try:
+            payment = await _check_payment(
+                payment_header, network, facilitator_url, transport, cache,
+                requirements, verifier, offline, optimistic, index, metrics
+            )
+        except PaymentError as e:
+            metrics.inc(PAYMENTS, outcome='rejected' if e.status_code in (400, 402, 429) else 'error')
+            raise
+    metrics.inc(PAYMENTS, outcome='optimistic' if payment.get('optimistic') else 'verified')
+    return payment
+
+async def _check_payment(
+    payment_header: str,
+    network: str,
+    facilitator_url: Optional[str],
+    transport: Optional[HTTPTransport],
+    cache: Optional[VerificationCache],
+    requirements: Optional[Dict[str, Any]],
+    verifier: Optional[BatchVerifier],
+    offline: bool,
+    optimistic: Optional[OptimisticSettler],
+    index: Optional[PaymentIndex],
+    metrics: Metrics
+) -> Dict[str, Any]:
+    try:
+        with metrics.stage('decode'):
+            try:
+                decoded = base64.b64decode(payment_header, validate=True).decode('utf-8')
+                payment_payload = json.loads(decoded)
+            except ValueError:
+                raise PaymentError(400, {'error': 'Malformed X-PAYMENT header'})
+            if not isinstance(payment_payload, dict):
+                raise PaymentError(400, {'error': 'Malformed X-PAYMENT header'})
+        
+        cache = cache or get_default_cache()
+        key = payment_key(payment_payload)
+        spent_key = replay_key(payment_payload, requirements)
+        if cache.is_spent(spent_key):
+            raise PaymentError(402, {'error': 'Payment already used'})
+        
+        claimed_payer = payment_payer(payment_payload)
+        if claimed_payer is not None and cache.is_payer_blocked(claimed_payer):
+            raise PaymentError(402, {'error': 'Payer is blocked'})
         
-        verified = await verify_payment(
-            payment_payload,
-            network=network,
-            facilitator_url=facilitator_url or 'https://facilitator.payai.network'
+        local = (
+            offline
+            and requirements is not None
+            and requirements.get('scheme') == 'x402+eip712'
+            and is_authorization_payload(payment_payload)
         )
+        payer = None
+        
+        if optimistic is not None and requirements is not None:
+            payment = await _serve_optimistically(
+                optimistic, payment_payload, spent_key, cache, network,
+                facilitator_url, transport, requirements, verifier, local
+            )
+            if payment is not None:
+                return payment
+        
+        indexed = None
+        tx_hash = payment_payload.get('payload', {}).get('transactionHash')
+        if index is not None and requirements is not None and tx_hash:
+            indexed = index.match(tx_hash, requirements)
+            metrics.inc(CACHE_REQUESTS, cache='index', result='miss' if indexed is None else 'hit')
+        
+        cached = None
+        if not local and indexed is None:
+            cached = cache.get(key)
+            metrics.inc(CACHE_REQUESTS, cache='verification', result='miss' if cached is None else 'hit')
+        
+        if local:
+            result = await verify_authorization_async(payment_payload, requirements)
+            verified = result['isValid']
+            payer = result.get('payer')
+        elif indexed is not None:
+            verified = indexed['isValid']
+            payer = indexed.get('payer')
+        elif cached is not None:
+            verified = cached.get('isValid', False)
+        else:
+            with metrics.stage('verify'):
+                verified = await get_default_single_flight().do(
+                    payload_hash(payment_payload, requirements),
+                    partial(_verify_upstream, payment_payload, network, facilitator_url, transport, requirements, verifier)
+                )
+            cache.put(key, {'isValid': verified})
         
         if not verified:
-            raise HTTPException(
-                status_code=402,
-                detail={'error': 'Payment verification failed'}
+            raise PaymentError(402, {'error': 'Payment verification failed'})
+        
+        if not _mark_spent(cache, spent_key, payment_payload):
+            raise PaymentError(402, {'error': 'Payment already used'})
+        
+        if local:
+            _settle_in_background(
+                payment_payload, requirements, facilitator_url or DEFAULT_FACILITATOR_URL, transport, cache, payer
             )
         
-        request.state.x402_payment = {
+        payload = payment_payload.get('payload', {})
+        return {
             'verified': True,
-            'tx_hash': payment_payload.get('payload', {}).get('transactionHash') or payment_payload.get('payload', {}).get('signature'),
-            'amount': payment_payload.get('payload', {}).get('amount'),
+            'tx_hash': payload.get('transactionHash') or payload.get('signature'),
+            'amount': payload.get('amount') or (payload.get('authorization') or {}).get('value'),
+            'payer': payer,
         }
         
+    except PaymentError:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise PaymentError(500, str(e))
 
-async def verify_payment(payment_payload: dict, network: str, facilitator_url: str) -> bool:
-    import aiohttp
+async def _serve_optimistically(
+    optimistic: OptimisticSettler,
+    payment_payload: Dict[str, Any],
+    spent_key: str,
+    cache: VerificationCache,
+    network: str,
+    facilitator_url: Optional[str],
+    transport: Optional[HTTPTransport],
+    requirements: Dict[str, Any],
+    verifier: Optional[BatchVerifier],
+    local: bool
+) -> Optional[Dict[str, Any]]:
+    # Only signed EIP-3009 authorizations are served ahead of settlement: the signer is recovered
+    # before anything is reserved, so exposure and blocks never hang off a client-asserted address.
+    # Transaction hashes and Solana signatures carry no such proof and take the verified path.
+    if requirements.get('scheme') != 'x402+eip712' or not is_authorization_payload(payment_payload):
+        return None
     
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            f'{facilitator_url}/verify',
-            json={
-                'x402Version': 1,
-                'paymentHeader': payment_payload,
-                'paymentRequirements': {
-                    'network': network,
-                },
-            }
-        ) as response:
-            result = await response.json()
-            return result.get('isValid', False)
+    amount = int(requirements.get('maxAmountRequired', 0))
+    if amount > optimistic.max_amount:
+        return None
+    
+    result = await verify_authorization_async(payment_payload, requirements)
+    if not result['isValid']:
+        raise PaymentError(402, {'error': 'Payment verification failed'})
+    payer = result['payer'].lower()
+    
+    if optimistic.is_blocked(payer) or cache.is_payer_blocked(payer):
+        raise PaymentError(402, {'error': 'Payer is blocked'})
+    
+    if not optimistic.try_reserve(payer, amount):
+        return None
+    
+    try:
+        spent = _mark_spent(cache, spent_key, payment_payload)
+    except PaymentError:
+        optimistic.release(payer, amount)
+        raise
+    if not spent:
+        optimistic.release(payer, amount)
+        raise PaymentError(402, {'error': 'Payment already used'})
+    
+    async def settle() -> bool:
+        if local:
+            result = await settle_via_facilitator(
+                payment_payload, requirements, facilitator_url or DEFAULT_FACILITATOR_URL, transport
+            )
+            return result['success']
+        return await _verify_upstream(payment_payload, network, facilitator_url, transport, requirements, verifier)
+    
+    optimistic.submit(payer, amount, settle)
+    
+    payload = payment_payload.get('payload', {})
+    return {
+        'verified': False,
+        'optimistic': True,
+        'tx_hash': payload.get('signature'),
+        'amount': payload['authorization'].get('value'),
+        'payer': result['payer'],
+    }
+
+def _mark_spent(cache: VerificationCache, key: str, payment_payload: Dict[str, Any]) -> bool:
+    try:
+        return cache.mark_spent(key, replay_window(payment_payload), payment_payer(payment_payload))
+    except PayerLedgerFull:
+        raise PaymentError(429, {'error': 'Too many outstanding authorizations for this payer, retry later'})
+    except SpentLedgerFull:
+        # Failing closed: accepting a payment we cannot record would allow it to be replayed.
+        raise PaymentError(503, {'error': 'Payment ledger is full, retry later'})
+
+_settlement_tasks = set()
+
+def _settle_in_background(
+    payment_payload: Dict[str, Any],
+    requirements: Dict[str, Any],
+    facilitator_url: str,
+    transport: Optional[HTTPTransport],
+    cache: VerificationCache,
+    payer: Optional[str]
+):
+    task = asyncio.ensure_future(settle_via_facilitator(payment_payload, requirements, facilitator_url, transport))
+    _settlement_tasks.add(task)
+    task.add_done_callback(partial(_settlement_done, cache, payer))
+
+def _settlement_done(cache: VerificationCache, payer: Optional[str], task: asyncio.Future):
+    _settlement_tasks.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is None and task.result().get('success'):
+        get_default_metrics().inc(SETTLEMENTS, outcome='settled')
+        return
+    # The request was already served, so the payer is refused until the debt is settled by other means.
+    get_default_metrics().inc(SETTLEMENTS, outcome='failed' if error is None else 'error')
+    if payer:
+        cache.block_payer(payer)
+
+async def _verify_upstream(
+    payment_payload: Dict[str, Any],
+    network: str,
+    facilitator_url: Optional[str],
+    transport: Optional[HTTPTransport],
+    requirements: Optional[Dict[str, Any]],
+    verifier: Optional[BatchVerifier]
+) -> bool:
+    if verifier is not None:
+        result = await verifier.verify(payment_payload, requirements or {'network': network})
+        return result.get('isValid', False)
+    
+    return await verify_payment(
+        payment_payload,
+        network=network,
+        facilitator_url=facilitator_url or DEFAULT_FACILITATOR_URL,
+        transport=transport,
+        requirements=requirements
+    )
+
+class X402Middleware:
+    def __init__(
+        self,
+        app,
+        routes: Union[PricingTable, Dict[str, Union[RoutePrice, Dict[str, Any]]]],
+        facilitator_url: Optional[str] = None,
+        transport: Optional[HTTPTransport] = None,
+        cache: Optional[VerificationCache] = None,
+        verifier: Optional[BatchVerifier] = None,
+        offline: bool = False,
+        optimistic: Optional[OptimisticSettler] = None,
+        index: Optional[PaymentIndex] = None,
+        metrics_path: Optional[str] = None
+    ):
+        self.app = app
+        self.pricing = routes if isinstance(routes, PricingTable) else PricingTable(routes)
+        self.facilitator_url = facilitator_url
+        self.transport = transport
+        self.cache = cache
+        self.verifier = verifier
+        self.offline = offline
+        self.optimistic = optimistic
+        self.index = index
+        self.metrics_path = metrics_path
+        self.metrics = get_default_metrics()
+        if metrics_path:
+            self.metrics.enable()
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        if self.metrics_path and scope['path'] == self.metrics_path:
+            await _send_metrics(send, self.metrics)
+            return
+        
+        route = self.pricing.match(scope['method'], scope['path'])
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        
+        payment_header = None
+        for name, value in scope['headers']:
+            if name == b'x-payment':
+                payment_header = value.decode('latin-1')
+                break
+        
+        resource = _resource_url(scope)
+        if not payment_header:
+            self.metrics.inc(PAYMENTS, outcome='challenged')
+            await _send_json(send, 402, route.challenge(resource))
+            return
+        
+        try:
+            payment = await check_payment(
+                payment_header,
+                route.requirements['network'],
+                facilitator_url=self.facilitator_url,
+                transport=self.transport,
+                cache=self.cache,
+                requirements=route.requirements_for(resource),
+                verifier=self.verifier,
+                offline=self.offline,
+                optimistic=self.optimistic,
+                index=self.index
+            )
+        except PaymentError as e:
+            await _send_json(send, e.status_code, json.dumps({'detail': e.detail}).encode())
+            return
+        
+        scope.setdefault('state', {})['x402_payment'] = payment
+        with self.metrics.stage('handler'):
+            await self.app(scope, receive, send)
+
+def _resource_url(scope) -> str:
+    host = None
+    for name, value in scope['headers']:
+        if name == b'host':
+            host = value.decode('latin-1')
+            break
+    if host is None and scope.get('server'):
+        server_host, port = scope['server']
+        host = f'{server_host}:{port}'
+    
+    url = f"{scope.get('scheme', 'http')}://{host or 'localhost'}{scope.get('root_path', '')}{scope['path']}"
+    if scope.get('query_string'):
+        url += '?' + scope['query_string'].decode('latin-1')
+    return url
+
+async def _send_json(send, status: int, body: bytes):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _send_metrics(send, metrics: Metrics):
+    body = metrics.render().encode()
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', METRICS_CONTENT_TYPE.encode()),
+            (b'content-length', str(len(body)).encode()),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+def add_metrics_route(app, path: str = '/metrics', metrics: Optional[Metrics] = None):
+    metrics = metrics or get_default_metrics()
+    metrics.enable()
+    
+    async def metrics_endpoint():
+        return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+    
+    app.add_api_route(path, metrics_endpoint, methods=['GET'], include_in_schema=False)
+
+@instrument_verification('facilitator')
+async def verify_payment(
+    payment_payload: dict,
+    network: str,
+    facilitator_url: str,
+    transport: Optional[HTTPTransport] = None,
+    requirements: Optional[Dict[str, Any]] = None
+) -> bool:
+    transport = transport or get_default_transport()
+    async with transport.post(
+        f'{facilitator_url}/verify',
+        json={
+            'x402Version': 1,
+            'paymentHeader': payment_payload,
+            'paymentRequirements': requirements or {
+                'network': network,
+            },
+        }
+    ) as response:
+        result = await response.json()
+        return result.get('isValid', False)
 
 
 
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from aiohttp import web
+from atlas_x402.benchmarks.stubs import StubEVMRPC, StubFacilitator
+from atlas_x402.transport import HTTPTransport
+from atlas_x402.server.core.batching import BatchVerifier
+
+REQUIREMENTS = {'scheme': 'x402+eip712', 'network': 'base'}
+
+def payment(i):
+    return {'payload': {'transactionHash': '0x' + f'{i:064x}'}}
+
+async def start_batch_facilitator(respond):
+    async def handle(request):
+        return web.json_response(respond(await request.json()))
+    
+    app = web.Application()
+    app.router.add_post('/verify/batch', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, f'http://127.0.0.1:{runner.addresses[0][1]}'
+
+@pytest.mark.asyncio
+async def test_concurrent_checks_are_coalesced():
+    async with StubEVMRPC() as node, HTTPTransport() as transport:
+        verifier = BatchVerifier(rpc_url=node.url, transport=transport, window=0.01)
+        results = await asyncio.gather(*[verifier.verify(payment(i), REQUIREMENTS) for i in range(10)])
+        
+        assert all(r['isValid'] for r in results)
+        assert node.requests == 1
+        assert (verifier.batches_sent, verifier.items_sent) == (1, 10)
+
+@pytest.mark.asyncio
+async def test_batches_flush_on_size_and_after_the_window():
+    async with StubEVMRPC() as node, HTTPTransport() as transport:
+        verifier = BatchVerifier(rpc_url=node.url, transport=transport, window=10.0, max_batch_size=3)
+        results = await asyncio.wait_for(
+            asyncio.gather(*[verifier.verify(payment(i), REQUIREMENTS) for i in range(3)]), timeout=1
+        )
+        assert len(results) == 3 and verifier.batches_sent == 1
+        
+        verifier.window = 0.02
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert (await asyncio.wait_for(verifier.verify(payment(9), REQUIREMENTS), timeout=1))['isValid']
+        assert loop.time() - started >= 0.02
+        assert verifier.batches_sent == 2
+
+@pytest.mark.asyncio
+async def test_short_facilitator_response_fails_every_caller():
+    runner, url = await start_batch_facilitator(lambda items: [{'isValid': True}] * (len(items) - 1))
+    try:
+        async with HTTPTransport() as transport:
+            verifier = BatchVerifier(facilitator_url=url, transport=transport, facilitator_batch_path='/verify/batch')
+            results = await asyncio.wait_for(
+                asyncio.gather(*[verifier.verify(payment(i), REQUIREMENTS) for i in range(4)], return_exceptions=True),
+                timeout=2
+            )
+        assert all(isinstance(r, Exception) and 'expected 4 results, got 3' in str(r) for r in results)
+    finally:
+        await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_malformed_entries_fail_only_their_caller():
+    runner, url = await start_batch_facilitator(lambda items: [{'isValid': True}, 'oops', {'isValid': False}])
+    try:
+        async with HTTPTransport() as transport:
+            verifier = BatchVerifier(facilitator_url=url, transport=transport, facilitator_batch_path='/verify/batch')
+            results = await asyncio.wait_for(
+                asyncio.gather(*[verifier.verify(payment(i), REQUIREMENTS) for i in range(3)], return_exceptions=True),
+                timeout=2
+            )
+        assert results[0]['isValid'] is True
+        assert isinstance(results[1], Exception)
+        assert results[2]['isValid'] is False
+    finally:
+        await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_cancelled_callers_are_dropped_from_the_batch():
+    async with StubEVMRPC() as node, HTTPTransport() as transport:
+        verifier = BatchVerifier(rpc_url=node.url, transport=transport, window=0.02)
+        abandoned = asyncio.ensure_future(verifier.verify(payment(1), REQUIREMENTS))
+        kept = asyncio.ensure_future(verifier.verify(payment(2), REQUIREMENTS))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        
+        assert (await asyncio.wait_for(kept, timeout=1))['isValid']
+        assert abandoned.cancelled()
+        assert verifier.items_sent == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_dispatch_releases_waiting_callers():
+    async with StubEVMRPC(latency=1.0) as node, HTTPTransport() as transport:
+        verifier = BatchVerifier(rpc_url=node.url, transport=transport, window=0.001)
+        waiting = asyncio.ensure_future(verifier.verify(payment(1), REQUIREMENTS))
+        await asyncio.sleep(0.05)
+        for task in list(verifier._tasks):
+            task.cancel()
+        
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(waiting, timeout=1)
+
+@pytest.mark.asyncio
+async def test_facilitator_without_batch_endpoint_skips_the_window():
+    async with StubFacilitator() as facilitator, HTTPTransport() as transport:
+        verifier = BatchVerifier(facilitator_url=facilitator.url, transport=transport, window=10.0)
+        results = await asyncio.wait_for(
+            asyncio.gather(*[verifier.verify(payment(i), REQUIREMENTS) for i in range(3)]), timeout=1
+        )
+        
+        assert all(r['isValid'] for r in results)
+        assert facilitator.requests == 3
+        assert verifier.batches_sent == 0
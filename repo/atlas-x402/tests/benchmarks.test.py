@@ -0,0 +1,38 @@
+import pytest
+from atlas_x402.benchmarks.harness import compare_results, run_load
+from atlas_x402.benchmarks.stubs import StubFacilitator, StubServer
+from atlas_x402.server.core.verification import verify_payment
+from atlas_x402.transport import HTTPTransport
+
+REQUIREMENTS = {
+    'scheme': 'x402+eip712',
+    'network': 'base',
+    'maxAmountRequired': '50000',
+    'payTo': '0x8bee703d6214a266e245b0537085b1021e1ccaed',
+}
+
+@pytest.mark.asyncio
+async def test_load_against_stub_facilitator_with_failures():
+    async with StubFacilitator(failure_rate=0.5, seed=1) as facilitator:
+        async with HTTPTransport() as transport:
+            async def request(i):
+                payload = {'payload': {'transactionHash': '0x' + f'{i:064x}'}}
+                await verify_payment(payload, REQUIREMENTS, facilitator_url=facilitator.url, transport=transport)
+            
+            result = await run_load('verify', request, requests=40, concurrency=8)
+    
+    assert facilitator.requests == 40
+    assert result.errors == facilitator.failures > 0
+    assert result.p50_ms <= result.p99_ms
+
+def test_compare_results_flags_regressions():
+    baseline = {'results': [{'scenario': 'verify', 'rps': 1000, 'p99_ms': 10, 'peak_rss_mb': 50}]}
+    current = {'results': [{'scenario': 'verify', 'rps': 800, 'p99_ms': 10.5, 'peak_rss_mb': 50}]}
+    assert compare_results(baseline, current) == ['verify: rps 1000 -> 800']
+
+def test_stub_server_requires_routes():
+    class NoRoutes(StubServer):
+        pass
+    
+    with pytest.raises(TypeError):
+        NoRoutes()
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from aiohttp import web
+from atlas_x402.client.bulk import FetchRequest
+from atlas_x402.client.session import Budget, X402Client
+from atlas_x402.transport import HTTPTransport
+
+async def start_paywall(state, delay=0.01):
+    async def handle(request):
+        state['active'] += 1
+        state['peak'] = max(state['peak'], state['active'])
+        try:
+            await asyncio.sleep(delay)
+            path = request.path
+            if state['flaky'].pop(path, None):
+                return web.Response(status=503)
+            header = request.headers.get('x-payment')
+            if not header:
+                return web.json_response({
+                    'x402Version': 1,
+                    'accepts': [{'scheme': 'x402+eip712', 'network': 'base', 'maxAmountRequired': '50000', 'payTo': '0xaaa'}],
+                }, status=402)
+            state['headers'].append(header)
+            if state['flaky_paid'].pop(path, None):
+                return web.Response(status=503)
+            state['paid'] += 1
+            return web.json_response({'path': path})
+        finally:
+            state['active'] -= 1
+    
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, f'http://127.0.0.1:{runner.addresses[0][1]}'
+
+def new_state(**overrides):
+    return dict({'active': 0, 'peak': 0, 'paid': 0, 'flaky': {}, 'flaky_paid': {}, 'headers': []}, **overrides)
+
+@pytest.mark.asyncio
+async def test_fetch_many_bounds_per_host_concurrency_and_retries():
+    state = new_state(flaky={'/item/3': True})
+    runner, url = await start_paywall(state)
+    async with HTTPTransport() as transport:
+        client = X402Client('base', transport=transport)
+        results = [r async for r in client.fetch_many(
+            [f'{url}/item/{i}' for i in range(20)], per_host=3, backoff=0.001
+        )]
+    await runner.cleanup()
+    
+    assert sorted(r.index for r in results) == list(range(20))
+    assert all(r.ok for r in results)
+    assert state['peak'] <= 3
+    assert next(r for r in results if r.index == 3).attempts == 2
+
+@pytest.mark.asyncio
+async def test_fetch_many_stops_when_budget_is_exhausted():
+    state = new_state()
+    runner, url = await start_paywall(state)
+    async with HTTPTransport() as transport:
+        client = X402Client('base', transport=transport)
+        results = [r async for r in client.fetch_many(
+            [f'{url}/item/{i}' for i in range(10)], concurrency=1, budget=120_000
+        )]
+    await runner.cleanup()
+    
+    assert sum(r.ok for r in results) == 2
+    assert state['paid'] == 2
+    assert sum(r.skipped for r in results) == 7
+    assert len(results) == 10
+
+@pytest.mark.asyncio
+async def test_retries_resend_the_same_payment():
+    state = new_state(flaky_paid={'/item/0': True})
+    runner, url = await start_paywall(state)
+    async with HTTPTransport() as transport:
+        client = X402Client('base', transport=transport)
+        budget = Budget(1_000_000)
+        results = [r async for r in client.fetch_many([f'{url}/item/0'], backoff=0.001, budget=budget)]
+    await runner.cleanup()
+    
+    assert results[0].ok and results[0].attempts == 2
+    assert len(state['headers']) == 2 and state['headers'][0] == state['headers'][1]
+    assert client.stats()['payments'] == 1
+    assert budget.spent == 50_000
+
+@pytest.mark.asyncio
+async def test_non_idempotent_requests_are_not_retried_by_default():
+    state = new_state(flaky={'/item/0': True, '/item/1': True})
+    runner, url = await start_paywall(state)
+    async with HTTPTransport() as transport:
+        client = X402Client('base', transport=transport)
+        once = [r async for r in client.fetch_many([FetchRequest(f'{url}/item/0', 'POST')], backoff=0.001)]
+        opted_in = [r async for r in client.fetch_many(
+            [FetchRequest(f'{url}/item/1', 'POST')], backoff=0.001, retry_unsafe=True
+        )]
+    await runner.cleanup()
+    
+    assert (once[0].status, once[0].attempts) == (503, 1)
+    assert (opted_in[0].status, opted_in[0].attempts) == (200, 2)
+
+@pytest.mark.asyncio
+async def test_backoff_does_not_hold_a_concurrency_slot():
+    state = new_state(flaky={'/item/0': True})
+    runner, url = await start_paywall(state, delay=0)
+    async with HTTPTransport() as transport:
+        client = X402Client('base', transport=transport)
+        results = [r async for r in client.fetch_many(
+            [f'{url}/item/0', f'{url}/item/1'], concurrency=1, backoff=0.5, max_backoff=0.5
+        )]
+    await runner.cleanup()
+    
+    assert [r.index for r in results] == [1, 0]
+    assert all(r.ok for r in results)
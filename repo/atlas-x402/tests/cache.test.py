@@ -0,0 +1,122 @@
+import pytest
+from atlas_x402.benchmarks.stubs import StubFacilitator
+from atlas_x402.transport import HTTPTransport
+from atlas_x402.server.core.cache import PayerLedgerFull, SpentLedgerFull, VerificationCache, payment_key, replay_window
+from atlas_x402.server.core.verification import verify_payment
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def test_payment_key_uses_transaction_hash():
+    payload = {'payload': {'transactionHash': '0xABC'}}
+    assert payment_key(payload) == '0xabc'
+    assert payment_key({'payload': {'signature': 'sig'}}) == 'sig'
+    assert payment_key({'payload': {}}).startswith('sha256:')
+
+def test_cache_expires_entries():
+    clock = FakeClock()
+    cache = VerificationCache(ttl=10, clock=clock)
+    cache.put('tx', {'isValid': True})
+    assert cache.get('tx') == {'isValid': True}
+    
+    clock.now = 11
+    assert cache.get('tx') is None
+
+def test_cache_evicts_least_recently_used():
+    cache = VerificationCache(max_entries=2)
+    cache.put('a', {'isValid': True})
+    cache.put('b', {'isValid': True})
+    cache.get('a')
+    cache.put('c', {'isValid': True})
+    
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+
+def test_spent_ledger_rejects_replay():
+    cache = VerificationCache()
+    assert cache.mark_spent('tx') is True
+    assert cache.is_spent('tx') is True
+    assert cache.mark_spent('tx') is False
+    assert cache.stats()['replays'] == 2
+
+def test_spent_ledger_fails_closed_instead_of_evicting():
+    clock = FakeClock()
+    cache = VerificationCache(max_spent=2, clock=clock)
+    assert cache.mark_spent('a', ttl=10)
+    assert cache.mark_spent('b', ttl=100)
+    with pytest.raises(SpentLedgerFull):
+        cache.mark_spent('c', ttl=10)
+    assert cache.is_spent('a') and cache.is_spent('b')
+    
+    clock.now = 11
+    assert cache.mark_spent('c', ttl=10)
+    assert not cache.is_spent('a') and cache.is_spent('b')
+
+def test_spent_ledger_is_sized_from_throughput():
+    cache = VerificationCache(payments_per_second=50, authorization_window=120)
+    assert cache._spent.max_entries == 6_000
+
+def test_transaction_hashes_stay_spent_for_good():
+    clock = FakeClock()
+    cache = VerificationCache(max_spent=1, clock=clock)
+    assert cache.mark_spent('auth', ttl=10)
+    for i in range(100):
+        assert cache.mark_spent(f'0x{i:064x}')
+    
+    clock.now = 10 * 365 * 86_400
+    assert cache.is_spent('0x' + '0' * 64)
+    assert not cache.is_spent('auth')
+
+def test_one_payer_cannot_fill_the_ledger():
+    clock = FakeClock()
+    cache = VerificationCache(max_spent=10, max_spent_per_payer=2, clock=clock)
+    assert cache.mark_spent('a1', ttl=10, payer='0xA')
+    assert cache.mark_spent('a2', ttl=10, payer='0xa')
+    with pytest.raises(PayerLedgerFull):
+        cache.mark_spent('a3', ttl=10, payer='0xa')
+    assert cache.mark_spent('b1', ttl=10, payer='0xb')
+    
+    clock.now = 11
+    assert cache.mark_spent('a3', ttl=10, payer='0xa')
+
+def test_spent_transaction_hashes_survive_restarts(tmp_path):
+    path = str(tmp_path / 'spent')
+    cache = VerificationCache(spent_path=path)
+    assert cache.mark_spent('0xabc')
+    assert cache.mark_spent('auth', ttl=10)
+    cache.close()
+    
+    restarted = VerificationCache(spent_path=path)
+    assert restarted.is_spent('0xabc')
+    assert not restarted.is_spent('auth')
+    restarted.close()
+
+def test_first_use_is_not_counted_as_replay():
+    cache = VerificationCache()
+    assert not cache.is_spent('tx')
+    assert cache.mark_spent('tx')
+    assert cache.stats()['replays'] == 0
+
+def test_replay_window_follows_valid_before():
+    payload = {'payload': {'authorization': {'validBefore': '1100'}, 'signature': '0x01'}}
+    assert replay_window(payload, now=1000) == 160
+    assert replay_window({'payload': {'transactionHash': '0xabc'}}) is None
+
+@pytest.mark.asyncio
+async def test_core_verify_spends_cached_results():
+    async with StubFacilitator() as facilitator, HTTPTransport() as transport:
+        cache = VerificationCache()
+        payload = {'payload': {'transactionHash': '0x' + '11' * 32}}
+        requirements = {'scheme': 'x402+eip712', 'network': 'base'}
+        cache.put(payment_key(payload), {'isValid': True})
+        
+        first = await verify_payment(payload, requirements, facilitator_url=facilitator.url, transport=transport, cache=cache)
+        second = await verify_payment(payload, requirements, facilitator_url=facilitator.url, transport=transport, cache=cache)
+        
+        assert first['isValid'] is True
+        assert second == {'isValid': False, 'invalidReason': 'Payment already used'}
+        assert facilitator.requests == 0
@@ -0,0 +1,192 @@
+import asyncio
+import base64
+import json
+import time
+import pytest
+from atlas_x402 import eip712
+from atlas_x402.eip712 import (
+    hash_typed_data,
+    keccak256,
+    private_key_to_address,
+    recover_typed_data,
+    sign_typed_data,
+    transfer_with_authorization,
+)
+from atlas_x402.benchmarks.stubs import StubFacilitator
+from atlas_x402.metrics import SETTLEMENTS, get_default_metrics
+from atlas_x402.server.core.authorization import verify_authorization
+from atlas_x402.server.core.cache import VerificationCache
+from atlas_x402.server.core.verification import verify_payment
+from atlas_x402.server.middleware import fastapi
+from atlas_x402.transport import HTTPTransport
+
+MAIL = {
+    'types': {
+        'EIP712Domain': [
+            {'name': 'name', 'type': 'string'},
+            {'name': 'version', 'type': 'string'},
+            {'name': 'chainId', 'type': 'uint256'},
+            {'name': 'verifyingContract', 'type': 'address'},
+        ],
+        'Person': [
+            {'name': 'name', 'type': 'string'},
+            {'name': 'wallet', 'type': 'address'},
+        ],
+        'Mail': [
+            {'name': 'from', 'type': 'Person'},
+            {'name': 'to', 'type': 'Person'},
+            {'name': 'contents', 'type': 'string'},
+        ],
+    },
+    'primaryType': 'Mail',
+    'domain': {
+        'name': 'Ether Mail',
+        'version': '1',
+        'chainId': 1,
+        'verifyingContract': '0xCcCCccccCCCCcCCCCCCcCcCccCcCCCcCcccccccC',
+    },
+    'message': {
+        'from': {'name': 'Cow', 'wallet': '0xCD2a3d9F938E13CD947Ec05AbC7FE734Df8DD826'},
+        'to': {'name': 'Bob', 'wallet': '0xbBbBBBBbbBBBbbbBbbBbbbbBBbBbbbbBbBbbBBbB'},
+        'contents': 'Hello, Bob!',
+    },
+}
+
+MAIL_SIGNATURE = (
+    '0x4355c47d63924e8a72e509b65029052eb6c299d53a04e167c5775fd466751c9d'
+    '07299936d304c153f6443dfa05f40ff007d72911b6f72307f996231605b91562'
+    '1c'
+)
+
+PAYER_KEY = keccak256(b'cow')
+PAYER = '0xCD2a3d9F938E13CD947Ec05AbC7FE734Df8DD826'
+MERCHANT = '0x8bee703d6214a266e245b0537085b1021e1ccaed'
+USDC = '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913'
+NOW = 1_700_000_000
+
+REQUIREMENTS = {
+    'scheme': 'x402+eip712',
+    'network': 'base',
+    'maxAmountRequired': '50000',
+    'payTo': MERCHANT,
+    'maxTimeoutSeconds': 60,
+    'asset': USDC,
+    'extra': {'name': 'USDC', 'version': '2'},
+}
+
+def signed_payment(**overrides):
+    authorization = {
+        'from': PAYER,
+        'to': MERCHANT,
+        'value': '50000',
+        'validAfter': str(NOW - 10),
+        'validBefore': str(NOW + 60),
+        'nonce': '0x' + '11' * 32,
+    }
+    authorization.update(overrides)
+    typed_data = transfer_with_authorization(authorization, asset=USDC, network='base')
+    return {
+        'x402Version': 1,
+        'scheme': 'x402+eip712',
+        'network': 'base',
+        'payload': {
+            'signature': sign_typed_data(typed_data, PAYER_KEY),
+            'authorization': authorization,
+        },
+    }
+
+def test_keccak256_vector():
+    assert keccak256(b'').hex() == 'c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470'
+
+def test_eip712_mail_vector():
+    assert hash_typed_data(MAIL).hex() == 'be609aee343fb3c4b28e1df9e632fca64fcfaede20f02e86244efddf30957bd2'
+    assert private_key_to_address(PAYER_KEY) == PAYER
+    assert sign_typed_data(MAIL, PAYER_KEY) == MAIL_SIGNATURE
+    assert recover_typed_data(MAIL, MAIL_SIGNATURE) == PAYER
+
+def test_verify_authorization_accepts_valid_payment():
+    result = verify_authorization(signed_payment(), REQUIREMENTS, now=NOW)
+    assert result == {'isValid': True, 'payer': PAYER}
+
+def test_verify_authorization_rejects_tampered_amount():
+    payment = signed_payment()
+    payment['payload']['authorization']['value'] = '60000'
+    result = verify_authorization(payment, REQUIREMENTS, now=NOW)
+    assert result['isValid'] is False
+
+@pytest.mark.parametrize('overrides', [
+    {'value': '49999'},
+    {'to': '0x' + '22' * 20},
+    {'validBefore': str(NOW - 1)},
+    {'validAfter': str(NOW + 10)},
+    {'validBefore': str(NOW + 3600)},
+    {'nonce': '0x1234'},
+])
+def test_verify_authorization_rejects_requirement_mismatch(overrides):
+    result = verify_authorization(signed_payment(**overrides), REQUIREMENTS, now=NOW)
+    assert result['isValid'] is False
+
+def _drop_prefix(signature):
+    return signature[2:]
+
+def _zero_recovery_id(signature):
+    return signature[:-2] + '%02x' % (int(signature[-2:], 16) - 27)
+
+def _uppercase_without_prefix(signature):
+    return signature[2:].upper()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('reencode', [_drop_prefix, _zero_recovery_id, _uppercase_without_prefix])
+async def test_reencoded_signature_cannot_replay_authorization(reencode):
+    now = int(time.time())
+    payment = signed_payment(validAfter=str(now - 10), validBefore=str(now + 60))
+    replay = {**payment, 'payload': {**payment['payload'], 'signature': reencode(payment['payload']['signature'])}}
+    
+    assert (await verify_payment(replay, REQUIREMENTS, offline=True, cache=VerificationCache()))['isValid'] is True
+    
+    cache = VerificationCache()
+    assert (await verify_payment(payment, REQUIREMENTS, offline=True, cache=cache))['isValid'] is True
+    result = await verify_payment(replay, REQUIREMENTS, offline=True, cache=cache)
+    assert result == {'isValid': False, 'invalidReason': 'Payment already used'}
+
+def test_domain_separators_and_type_hashes_are_hashed_once(monkeypatch):
+    verify_authorization(signed_payment(), REQUIREMENTS, now=NOW)
+    payment = signed_payment(nonce='0x' + '22' * 32)
+    calls = []
+    
+    def counting(data):
+        calls.append(data)
+        return keccak256(data)
+    
+    monkeypatch.setattr(eip712, 'keccak256', counting)
+    assert verify_authorization(payment, REQUIREMENTS, now=NOW)['isValid'] is True
+    # Message struct, final digest, public key and address checksum; domain and type hashes are cached.
+    assert len(calls) == 4
+
+@pytest.mark.asyncio
+async def test_failed_background_settlement_blocks_payer():
+    now = int(time.time())
+    
+    def header(nonce):
+        payment = signed_payment(validAfter=str(now - 10), validBefore=str(now + 60), nonce='0x' + nonce * 32)
+        return base64.b64encode(json.dumps(payment).encode()).decode()
+    
+    metrics = get_default_metrics()
+    metrics.enable()
+    try:
+        async with StubFacilitator(invalid_rate=1.0) as facilitator, HTTPTransport() as transport:
+            cache = VerificationCache()
+            check = dict(facilitator_url=facilitator.url, transport=transport, cache=cache, requirements=REQUIREMENTS, offline=True)
+            
+            payment = await fastapi.check_payment(header('22'), 'base', **check)
+            assert payment['payer'] == PAYER
+            await asyncio.gather(*fastapi._settlement_tasks)
+            
+            assert metrics.counter(SETTLEMENTS, outcome='failed') == 1
+            assert cache.is_payer_blocked(PAYER)
+            with pytest.raises(fastapi.PaymentError) as rejected:
+                await fastapi.check_payment(header('33'), 'base', **check)
+            assert rejected.value.detail == {'error': 'Payer is blocked'}
+    finally:
+        metrics.disable()
+        metrics.reset()
@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+import pytest
+from atlas_x402.metrics import STAGE_SECONDS, VERIFICATIONS, Metrics, get_default_metrics, instrument_verification
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    with metrics.stage('decode'):
+        pass
+    metrics.inc(VERIFICATIONS, backend='facilitator', outcome='valid')
+    
+    assert metrics.histogram(STAGE_SECONDS, stage='decode') is None
+    assert metrics.render() == '\n'
+
+def test_render_prometheus_text():
+    ticks = iter([0.0, 0.003])
+    metrics = Metrics(enabled=True, buckets=(0.001, 0.01), clock=lambda: next(ticks))
+    with metrics.stage('decode'):
+        pass
+    metrics.inc(VERIFICATIONS, backend='facilitator', outcome='valid')
+    
+    text = metrics.render()
+    assert '# TYPE x402_stage_duration_seconds histogram' in text
+    assert 'x402_stage_duration_seconds_bucket{stage="decode",le="0.001"} 0' in text
+    assert 'x402_stage_duration_seconds_bucket{stage="decode",le="0.01"} 1' in text
+    assert 'x402_stage_duration_seconds_bucket{stage="decode",le="+Inf"} 1' in text
+    assert 'x402_stage_duration_seconds_count{stage="decode"} 1' in text
+    assert 'x402_verifications_total{backend="facilitator",outcome="valid"} 1' in text
+
+def test_tracers_receive_spans_without_metrics():
+    metrics = Metrics()
+    spans = []
+    
+    @contextmanager
+    def tracer(name, attributes):
+        spans.append((name, attributes))
+        yield
+    
+    metrics.add_tracer(tracer)
+    with metrics.backend('evm_rpc'):
+        pass
+    
+    assert spans == [('x402.verify.evm_rpc', {'backend': 'evm_rpc'})]
+    assert metrics.render() == '\n'
+
+@pytest.mark.asyncio
+async def test_instrumented_verification_counts_outcomes():
+    @instrument_verification('stub')
+    async def verify(valid):
+        return {'isValid': valid}
+    
+    metrics = get_default_metrics()
+    metrics.enable()
+    try:
+        await verify(True)
+        await verify(False)
+        assert metrics.counter(VERIFICATIONS, backend='stub', outcome='valid') == 1
+        assert metrics.counter(VERIFICATIONS, backend='stub', outcome='invalid') == 1
+        assert metrics.histogram('x402_backend_duration_seconds', backend='stub')['count'] == 2
+    finally:
+        metrics.disable()
+        metrics.reset()
@@ -0,0 +1,139 @@
+import base64
+import json
+import time
+import pytest
+from atlas_x402.benchmarks.stubs import StubFacilitator
+from atlas_x402.eip712 import keccak256, sign_typed_data, transfer_with_authorization
+from atlas_x402.metrics import PAYMENTS, get_default_metrics
+from atlas_x402.server.core.cache import VerificationCache
+from atlas_x402.server.core.optimistic import OptimisticSettler
+from atlas_x402.server.core.pricing import RoutePrice
+from atlas_x402.server.middleware import fastapi
+from atlas_x402.transport import HTTPTransport
+
+PAYER_KEY = keccak256(b'cow')
+PAYER = '0xCD2a3d9F938E13CD947Ec05AbC7FE734Df8DD826'
+VICTIM = '0x' + 'cd' * 20
+MERCHANT = '0x8bee703d6214a266e245b0537085b1021e1ccaed'
+USDC = '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913'
+
+REQUIREMENTS = {
+    'scheme': 'x402+eip712',
+    'network': 'base',
+    'maxAmountRequired': '50000',
+    'payTo': MERCHANT,
+    'asset': USDC,
+    'maxTimeoutSeconds': 300,
+}
+
+def authorization(nonce: str, sender: str = PAYER):
+    now = int(time.time())
+    return {
+        'from': sender,
+        'to': MERCHANT,
+        'value': '50000',
+        'validAfter': str(now - 10),
+        'validBefore': str(now + 60),
+        'nonce': '0x' + nonce * 32,
+    }
+
+def header(payload):
+    return base64.b64encode(json.dumps({'x402Version': 1, 'scheme': 'x402+eip712', 'network': 'base', 'payload': payload}).encode()).decode()
+
+def signed(nonce: str) -> str:
+    auth = authorization(nonce)
+    typed_data = transfer_with_authorization(auth, asset=USDC, network='base')
+    return header({'signature': sign_typed_data(typed_data, PAYER_KEY), 'authorization': auth})
+
+def forged(nonce: str) -> str:
+    return header({'signature': '0x' + '00' * 65, 'authorization': authorization(nonce, VICTIM)})
+
+async def call(middleware, payment_header=None):
+    headers = [(b'host', b'example.com')]
+    if payment_header is not None:
+        headers.append((b'x-payment', payment_header.encode()))
+    scope = {'type': 'http', 'method': 'GET', 'path': '/api/data', 'headers': headers, 'query_string': b''}
+    messages = []
+    
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+    
+    async def send(message):
+        messages.append(message)
+    
+    await middleware(scope, receive, send)
+    return messages[0]['status'], json.loads(messages[1]['body'])
+
+async def app(scope, receive, send):
+    body = json.dumps({'payer': scope['state']['x402_payment']['payer']}).encode()
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': body})
+
+@pytest.mark.asyncio
+async def test_malformed_payment_headers_are_rejected_not_errors():
+    metrics = get_default_metrics()
+    metrics.enable()
+    try:
+        for header in ['not-base64!', 'abc', base64.b64encode(b'\xff\xfe').decode(), base64.b64encode(b'{').decode(), base64.b64encode(b'[1]').decode()]:
+            with pytest.raises(fastapi.PaymentError) as rejected:
+                await fastapi.check_payment(header, 'base', cache=VerificationCache(), requirements=REQUIREMENTS)
+            assert rejected.value.status_code == 400
+            assert rejected.value.detail == {'error': 'Malformed X-PAYMENT header'}
+        
+        assert metrics.counter(PAYMENTS, outcome='rejected') == 5
+        assert metrics.counter(PAYMENTS, outcome='error') == 0
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+@pytest.mark.asyncio
+async def test_optimistic_serve_is_keyed_on_the_recovered_signer():
+    async with StubFacilitator(invalid_rate=1.0) as facilitator, HTTPTransport() as transport:
+        settler = OptimisticSettler(max_exposure=1_000_000, max_amount=100_000)
+        cache = VerificationCache()
+        middleware = fastapi.X402Middleware(
+            app,
+            {'/api/data': RoutePrice(price='0.05', network='base', merchant_address=MERCHANT)},
+            facilitator_url=facilitator.url,
+            transport=transport,
+            cache=cache,
+            offline=True,
+            optimistic=settler
+        )
+        
+        # A zero signature asserting someone else's address is neither served nor recorded against them.
+        status, body = await call(middleware, forged('11'))
+        assert (status, body) == (402, {'detail': {'error': 'Payment verification failed'}})
+        assert settler.stats()['served'] == 0
+        assert cache.stats()['spent'] == 0
+        
+        status, body = await call(middleware, signed('22'))
+        assert (status, body) == (200, {'payer': PAYER})
+        assert settler.exposure == {PAYER.lower(): 50_000}
+        await settler.drain()
+        
+        # The facilitator refused to settle, so the signer (and only the signer) is blocked.
+        assert settler.is_blocked(PAYER.lower())
+        assert not settler.is_blocked(VICTIM)
+        status, body = await call(middleware, signed('33'))
+        assert (status, body) == (402, {'detail': {'error': 'Payer is blocked'}})
+        await settler.close()
+
+@pytest.mark.asyncio
+async def test_transaction_hashes_are_never_served_optimistically():
+    async with StubFacilitator() as facilitator, HTTPTransport() as transport:
+        settler = OptimisticSettler()
+        middleware = fastapi.X402Middleware(
+            app,
+            {'/api/data': RoutePrice(price='0.05', network='base', merchant_address=MERCHANT)},
+            facilitator_url=facilitator.url,
+            transport=transport,
+            cache=VerificationCache(),
+            optimistic=settler
+        )
+        
+        status, _ = await call(middleware, header({'transactionHash': '0x' + 'ab' * 32, 'from': VICTIM}))
+        assert status == 200
+        assert settler.stats()['served'] == 0
+        assert facilitator.requests == 1
+        await settler.close()
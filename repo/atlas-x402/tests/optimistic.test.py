@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from atlas_x402.server.core.optimistic import OptimisticSettler, payment_payer
+
+def test_payment_payer_reads_authorization_sender():
+    payload = {'payload': {'authorization': {'from': '0xABC'}}}
+    assert payment_payer(payload) == '0xabc'
+    assert payment_payer({'payload': {'transactionHash': '0x1'}}) is None
+
+def test_exposure_is_bounded_per_payer_and_in_total():
+    settler = OptimisticSettler(max_exposure=100, max_amount=60, max_total_exposure=150)
+    assert settler.try_reserve('a', 60) is True
+    assert settler.try_reserve('a', 60) is False
+    assert settler.try_reserve('b', 60) is True
+    assert settler.try_reserve('c', 60) is False
+    assert settler.try_reserve('c', 61) is False
+    
+    settler.release('a', 60)
+    assert settler.try_reserve('c', 60) is True
+
+@pytest.mark.asyncio
+async def test_failed_settlement_blocklists_payer():
+    settler = OptimisticSettler(max_exposure=100, max_amount=100)
+    
+    async def fails():
+        return False
+    
+    async def succeeds():
+        return True
+    
+    assert settler.try_reserve('good', 10)
+    settler.submit('good', 10, succeeds)
+    assert settler.try_reserve('bad', 10)
+    settler.submit('bad', 10, fails)
+    await settler.close()
+    
+    assert settler.is_blocked('bad') is True
+    assert settler.is_blocked('good') is False
+    assert settler.exposure == {}
+    assert settler.stats()['settled'] == 1
+
+@pytest.mark.asyncio
+async def test_settlement_errors_release_exposure():
+    settler = OptimisticSettler(max_exposure=100, max_amount=100, max_total_exposure=100)
+    
+    async def raises():
+        raise RuntimeError('facilitator unreachable')
+    
+    for _ in range(3):
+        assert settler.try_reserve('payer', 100)
+        settler.submit('payer', 100, raises)
+        await settler.drain()
+    await settler.close()
+    
+    assert settler.exposure == {} and settler.total_exposure == 0
+    assert settler.stats()['errors'] == 3
@@ -0,0 +1,45 @@
+import json
+import pytest
+from atlas_x402.server.core.pricing import PricingTable, RoutePrice, to_micro_units
+
+def test_to_micro_units_is_exact():
+    assert to_micro_units('0.05') == 50_000
+    assert to_micro_units('0.000001') == 1
+    assert to_micro_units('10') == 10_000_000
+
+def test_to_micro_units_rejects_invalid_prices():
+    for price in ['abc', '-1', '0.0000001', 'NaN']:
+        with pytest.raises(ValueError):
+            to_micro_units(price)
+
+def test_pricing_table_matches_method_and_path():
+    table = PricingTable({
+        'GET /api/weather': RoutePrice(price='0.05', network='base', merchant_address='0xabc'),
+        '/api/data': {'price': '1', 'network': 'solana', 'merchant_address': 'merchant'},
+    })
+    
+    assert table.match('GET', '/api/weather') is not None
+    assert table.match('POST', '/api/weather') is None
+    assert table.match('POST', '/api/data') is not None
+    assert table.match('GET', '/unpriced') is None
+
+def test_challenge_fills_in_resource():
+    table = PricingTable({
+        '/api/weather': RoutePrice(price='0.05', network='base', merchant_address='0xabc'),
+    })
+    route = table.match('GET', '/api/weather')
+    body = json.loads(route.challenge('https://example.com/api/weather'))
+    
+    accept = body['accepts'][0]
+    assert accept['resource'] == 'https://example.com/api/weather'
+    assert accept['maxAmountRequired'] == '50000'
+    assert accept['scheme'] == 'x402+eip712'
+    assert body['error'] is None
+
+def test_unknown_networks_are_rejected_when_compiling():
+    for network in ['base-sepolia', 'bsae', '']:
+        with pytest.raises(ValueError):
+            PricingTable({'/api/data': RoutePrice(price='1', network=network, merchant_address='0xabc')})
+    
+    table = PricingTable({'/api/data': RoutePrice(price='1', network='solana-mainnet', merchant_address='merchant')})
+    assert table.match('GET', '/api/data').requirements['scheme'] == 'x402+solana'
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from aiohttp import web
+from atlas_x402.rpc import RPCClient, EndpointUnavailable
+from atlas_x402.transport import HTTPTransport, TransportConfig
+
+async def start_stub_rpc(delay=0.0, status=200):
+    calls = []
+    
+    async def handle(request):
+        body = await request.json()
+        calls.append(body['method'])
+        await asyncio.sleep(delay)
+        if status != 200:
+            return web.Response(status=status)
+        return web.json_response({'jsonrpc': '2.0', 'id': body['id'], 'result': '0x1'})
+    
+    app = web.Application()
+    app.router.add_post('/', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://127.0.0.1:{port}/', calls
+
+@pytest.mark.asyncio
+async def test_slow_endpoint_is_hedged():
+    slow, slow_url, slow_calls = await start_stub_rpc(delay=1.0)
+    fast, fast_url, fast_calls = await start_stub_rpc()
+    async with HTTPTransport() as transport:
+        rpc = RPCClient({'base': [slow_url, fast_url]}, transport=transport, max_hedge_delay=0.05)
+        assert await asyncio.wait_for(rpc.call('eth_blockNumber', []), 0.5) == '0x1'
+    await slow.cleanup()
+    await fast.cleanup()
+    
+    assert rpc.hedged == 1
+    assert fast_calls == ['eth_blockNumber']
+
+@pytest.mark.asyncio
+async def test_failing_endpoint_fails_over_and_is_demoted():
+    bad, bad_url, bad_calls = await start_stub_rpc(status=503)
+    good, good_url, good_calls = await start_stub_rpc()
+    async with HTTPTransport() as transport:
+        rpc = RPCClient({'base': [bad_url, good_url]}, transport=transport)
+        for _ in range(4):
+            assert await rpc.call('eth_blockNumber', []) == '0x1'
+    await bad.cleanup()
+    await good.cleanup()
+    
+    assert len(bad_calls) == 1
+    assert len(good_calls) == 4
+    assert rpc.ranked('base')[0].url == good_url
+
+@pytest.mark.asyncio
+async def test_all_endpoints_failing_raises():
+    bad, bad_url, _ = await start_stub_rpc(status=429)
+    async with HTTPTransport() as transport:
+        rpc = RPCClient({'base': [bad_url]}, transport=transport, failure_threshold=1)
+        with pytest.raises(EndpointUnavailable):
+            await rpc.call('eth_blockNumber', [])
+    await bad.cleanup()
+    
+    assert rpc.stats()['base'][0]['open'] is True
+
+@pytest.mark.asyncio
+async def test_timed_out_writes_are_not_sent_to_another_endpoint():
+    slow, slow_url, slow_calls = await start_stub_rpc(delay=0.5)
+    fast, fast_url, fast_calls = await start_stub_rpc()
+    async with HTTPTransport(TransportConfig(read_timeout=0.1)) as transport:
+        rpc = RPCClient({'base': [slow_url, fast_url]}, transport=transport, max_hedge_delay=0.01)
+        with pytest.raises(EndpointUnavailable):
+            await rpc.call('eth_sendRawTransaction', ['0x01'])
+        assert await rpc.call('eth_blockNumber', []) == '0x1'
+    await slow.cleanup()
+    await fast.cleanup()
+    
+    assert slow_calls == ['eth_sendRawTransaction']
+    assert fast_calls == ['eth_blockNumber']
+    assert rpc.hedged == 0
+
+@pytest.mark.asyncio
+async def test_writes_fail_over_when_the_endpoint_was_never_reached():
+    unreachable, unreachable_url, _ = await start_stub_rpc()
+    await unreachable.cleanup()
+    good, good_url, good_calls = await start_stub_rpc()
+    async with HTTPTransport() as transport:
+        rpc = RPCClient({'base': [unreachable_url, good_url]}, transport=transport)
+        assert await rpc.call('eth_sendRawTransaction', ['0x01']) == '0x1'
+    await good.cleanup()
+    
+    assert good_calls == ['eth_sendRawTransaction']
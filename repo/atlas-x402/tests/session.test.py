@@ -0,0 +1,81 @@
+import base64
+import json
+import aiohttp
+import pytest
+from aiohttp import web
+from atlas_x402.client.session import Budget, X402Client
+from atlas_x402.transport import HTTPTransport
+
+async def start_paywall(state):
+    async def handle(request):
+        state['requests'] += 1
+        header = request.headers.get('x-payment')
+        if header and json.loads(base64.b64decode(header))['payload']['payTo'] == state['pay_to']:
+            return web.json_response({'ok': True})
+        return web.json_response({
+            'x402Version': 1,
+            'accepts': [{'scheme': 'x402+eip712', 'network': 'base', 'maxAmountRequired': '50000', 'payTo': state['pay_to']}],
+            'error': None,
+        }, status=402)
+    
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, f'http://127.0.0.1:{runner.addresses[0][1]}'
+
+@pytest.mark.asyncio
+async def test_cached_requirements_pay_on_first_request():
+    state = {'requests': 0, 'pay_to': '0xaaa'}
+    runner, url = await start_paywall(state)
+    async with HTTPTransport() as transport:
+        client = X402Client('base', transport=transport)
+        first = await client.get(f'{url}/data?page=1')
+        second = await client.get(f'{url}/data?page=2')
+        assert await second.json() == {'ok': True}
+        assert first.status == second.status == 200
+        assert state['requests'] == 3
+        
+        state['pay_to'] = '0xbbb'
+        third = await client.get(f'{url}/data')
+    await runner.cleanup()
+    
+    assert third.status == 200
+    assert state['requests'] == 5
+    assert client.stats()['invalidations'] == 1
+    assert client.requirements.get(client.key('GET', f'{url}/data'))['payTo'] == '0xbbb'
+
+@pytest.mark.asyncio
+async def test_requirements_expire_after_ttl():
+    now = [0.0]
+    state = {'requests': 0, 'pay_to': '0xaaa'}
+    runner, url = await start_paywall(state)
+    async with HTTPTransport() as transport:
+        client = X402Client('base', transport=transport, requirements_ttl=10, clock=lambda: now[0])
+        await client.get(f'{url}/data')
+        now[0] = 11
+        await client.get(f'{url}/data')
+    await runner.cleanup()
+    
+    assert state['requests'] == 4
+
+@pytest.mark.asyncio
+async def test_budget_is_charged_once_when_cached_requirements_go_stale():
+    state = {'requests': 0, 'pay_to': '0xaaa'}
+    runner, url = await start_paywall(state)
+    async with HTTPTransport() as transport:
+        client = X402Client('base', transport=transport)
+        await client.get(f'{url}/data')
+        
+        budget = Budget(100_000)
+        state['pay_to'] = '0xbbb'
+        response = await client.get(f'{url}/data', budget=budget)
+        assert response.status == 200
+        assert budget.spent == 50_000
+        
+        await runner.cleanup()
+        with pytest.raises(aiohttp.ClientError):
+            await client.get(f'{url}/data', budget=budget)
+        assert budget.spent == 50_000
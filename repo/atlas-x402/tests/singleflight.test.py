@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from atlas_x402.metrics import SINGLE_FLIGHT_CALLS, get_default_metrics
+from atlas_x402.server.core.singleflight import SingleFlight, payload_hash
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_upstream_call():
+    flight = SingleFlight()
+    calls = 0
+    
+    async def verify():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {'isValid': True}
+    
+    key = payload_hash({'payload': {'transactionHash': '0x1'}})
+    results = await asyncio.gather(*[flight.do(key, verify) for _ in range(10)])
+    
+    assert calls == 1
+    assert all(result == {'isValid': True} for result in results)
+    assert flight.stats() == {'in_flight': 0, 'upstream_calls': 1, 'coalesced_calls': 9}
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    
+    async def verify():
+        await asyncio.sleep(0.01)
+        return {'isValid': True}
+    
+    first = asyncio.ensure_future(flight.do('key', verify))
+    second = asyncio.ensure_future(flight.do('key', verify))
+    await asyncio.sleep(0)
+    first.cancel()
+    
+    assert await second == {'isValid': True}
+
+def test_key_ignores_the_resource_url():
+    payment = {'payload': {'transactionHash': '0x1'}}
+    requirements = {'scheme': 'x402+eip712', 'network': 'base', 'maxAmountRequired': '1000', 'payTo': '0xAB'}
+    
+    on_a = payload_hash(payment, dict(requirements, resource='https://api.example.com/a?x=1'))
+    on_b = payload_hash(payment, dict(requirements, resource='https://api.example.com/b', payTo='0xab'))
+    assert on_a == on_b
+    assert payload_hash(payment, dict(requirements, maxAmountRequired='2000')) != on_a
+
+@pytest.mark.asyncio
+async def test_calls_are_exported_as_metrics():
+    metrics = get_default_metrics()
+    metrics.enable()
+    try:
+        flight = SingleFlight()
+        
+        async def verify():
+            await asyncio.sleep(0.01)
+            return True
+        
+        await asyncio.gather(*[flight.do('key', verify) for _ in range(3)])
+        assert metrics.counter(SINGLE_FLIGHT_CALLS, result='upstream') == 1
+        assert metrics.counter(SINGLE_FLIGHT_CALLS, result='coalesced') == 2
+    finally:
+        metrics.disable()
+        metrics.reset()
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from aiohttp import web
+from atlas_x402.client.fetch import x402_fetch, x402_stream
+from atlas_x402.client.session import X402Client
+from atlas_x402.client.streaming import iter_chunks, iter_ndjson, iter_sse
+from atlas_x402.transport import HTTPTransport
+
+async def start_stream_server(body_parts):
+    async def handle(request):
+        if not request.headers.get('x-payment'):
+            return web.json_response({
+                'x402Version': 1,
+                'accepts': [{'scheme': 'x402+eip712', 'network': 'base', 'maxAmountRequired': '1', 'payTo': '0xaaa'}],
+            }, status=402)
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for part in body_parts:
+            await response.write(part)
+            await asyncio.sleep(0)
+        await response.write_eof()
+        return response
+    
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, f'http://127.0.0.1:{runner.addresses[0][1]}/stream'
+
+@pytest.mark.asyncio
+async def test_paid_stream_yields_ndjson_records():
+    runner, url = await start_stream_server([b'{"a": 1}\n{"a"', b': 2}\r\n\n', b'{"a": 3}'])
+    async with HTTPTransport() as transport:
+        async with x402_stream(url, 'base', transport=transport) as response:
+            records = [record async for record in iter_ndjson(response)]
+    await runner.cleanup()
+    
+    assert records == [{'a': 1}, {'a': 2}, {'a': 3}]
+
+@pytest.mark.asyncio
+async def test_session_stream_parses_server_sent_events():
+    body = b': comment\nevent: delta\ndata: {"text": "hel"}\n\ndata: line one\ndata: line two\nid: 7\n\ndata: incomplete'
+    runner, url = await start_stream_server([body[:20], body[20:]])
+    async with HTTPTransport() as transport:
+        client = X402Client('base', transport=transport)
+        async with client.stream('GET', url) as response:
+            events = [event async for event in iter_sse(response)]
+    await runner.cleanup()
+    
+    assert [(e.event, e.data, e.id) for e in events] == [
+        ('delta', '{"text": "hel"}', None),
+        ('message', 'line one\nline two', '7'),
+    ]
+    assert events[0].json() == {'text': 'hel'}
+
+@pytest.mark.asyncio
+async def test_fetch_returns_readable_body_and_chunks_stream():
+    runner, url = await start_stream_server([b'x' * 1000, b'y' * 1000])
+    async with HTTPTransport() as transport:
+        response = await x402_fetch(url, 'base', transport=transport)
+        assert len(await response.read()) == 2000
+        async with x402_stream(url, 'base', transport=transport) as streamed:
+            sizes = [len(chunk) async for chunk in iter_chunks(streamed, 512)]
+    await runner.cleanup()
+    
+    assert sum(sizes) == 2000 and max(sizes) <= 512
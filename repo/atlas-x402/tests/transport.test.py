@@ -0,0 +1,40 @@
+import asyncio
+import gc
+import warnings
+from atlas_x402.benchmarks.stubs import StubFacilitator
+from atlas_x402.transport import HTTPTransport
+
+def test_session_from_a_finished_loop_is_closed_when_replaced():
+    transport = HTTPTransport()
+    
+    async def fetch():
+        async with StubFacilitator(services=1) as facilitator:
+            async with transport.get(f'{facilitator.url}/discovery/resources') as response:
+                await response.read()
+        return transport.session
+    
+    first = asyncio.run(fetch())
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        second = asyncio.run(fetch())
+        assert first.closed and second is not first
+        assert transport.stale_sessions == 1
+        del first
+        gc.collect()
+    assert not [w for w in caught if 'Unclosed' in str(w.message)]
+    asyncio.run(transport.close())
+
+def test_install_binds_the_transport_to_the_app_lifespan():
+    from fastapi import FastAPI
+    
+    transport = HTTPTransport()
+    app = FastAPI()
+    transport.install(app)
+    
+    async def run():
+        async with app.router.lifespan_context(app):
+            session = transport.session
+            assert not session.closed
+        return session
+    
+    assert asyncio.run(run()).closed
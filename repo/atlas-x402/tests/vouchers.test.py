@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from atlas_x402.client.vouchers import VoucherPool, VoucherTier
+from atlas_x402.eip712 import keccak256
+from atlas_x402.server.core.authorization import verify_authorization
+
+MERCHANT = '0x8bee703d6214a266e245b0537085b1021e1ccaed'
+USDC = '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913'
+NOW = 1_700_000_000
+
+REQUIREMENTS = {
+    'scheme': 'x402+eip712',
+    'network': 'base',
+    'maxAmountRequired': '50000',
+    'payTo': MERCHANT,
+    'maxTimeoutSeconds': 60,
+    'asset': USDC,
+    'extra': {'name': 'USDC', 'version': '2'},
+}
+
+def new_pool(now, **options):
+    tier = VoucherTier.from_requirement(REQUIREMENTS)
+    return VoucherPool(keccak256(b'cow'), [tier], clock=lambda: now[0], **options)
+
+@pytest.mark.asyncio
+async def test_pool_serves_verifiable_vouchers_with_unique_nonces():
+    now = [NOW]
+    pool = new_pool(now, size=3)
+    await pool.refill()
+    
+    payments = [pool.take(REQUIREMENTS) for _ in range(3)]
+    assert pool.take(REQUIREMENTS) is None
+    assert len({p['payload']['authorization']['nonce'] for p in payments}) == 3
+    for payment in payments:
+        assert verify_authorization(payment, REQUIREMENTS, now=NOW)['isValid'] is True
+    assert pool.stats()['hits'] == 3
+
+@pytest.mark.asyncio
+async def test_vouchers_close_to_expiry_are_discarded():
+    now = [NOW]
+    pool = new_pool(now, size=2, validity=60, min_remaining=10)
+    await pool.refill()
+    
+    now[0] = NOW + 51
+    assert pool.take(REQUIREMENTS) is None
+    assert pool.stats()['expired'] == 2
+    
+    await pool.refill()
+    assert verify_authorization(pool.take(REQUIREMENTS), REQUIREMENTS, now=now[0])['isValid'] is True
+
+@pytest.mark.asyncio
+async def test_unknown_tier_is_signed_on_demand_and_learned():
+    now = [NOW]
+    pool = VoucherPool(keccak256(b'cow'), size=1, clock=lambda: now[0], sweep_interval=0.01)
+    requirement = dict(REQUIREMENTS, maxAmountRequired='10000')
+    
+    async with pool:
+        payment = await pool.payment_factory(requirement, 'base')
+        assert verify_authorization(payment, requirement, now=NOW)['isValid'] is True
+        for _ in range(100):
+            if pool.stats()['ready']:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.take(requirement) is not None
+
+@pytest.mark.asyncio
+async def test_hand_built_tiers_match_checksummed_requirements():
+    now = [NOW]
+    tier = VoucherTier(network='base', asset=USDC, pay_to='0x8BEE703D6214A266E245B0537085B1021E1CCAED', amount=50000)
+    pool = VoucherPool(keccak256(b'cow'), [tier], size=1, clock=lambda: now[0])
+    await pool.refill()
+    
+    assert tier == VoucherTier.from_requirement(REQUIREMENTS)
+    payment = pool.take(REQUIREMENTS)
+    assert verify_authorization(payment, REQUIREMENTS, now=NOW)['isValid'] is True
+
+@pytest.mark.asyncio
+async def test_close_is_not_lost_when_a_wakeup_races_it():
+    now = [NOW]
+    for _ in range(50):
+        pool = new_pool(now, size=1, sweep_interval=60)
+        await pool.start()
+        for _ in range(100):
+            if pool.stats()['ready']:
+                break
+            await asyncio.sleep(0.01)
+        # The wakeup completes the refill loop's wait in the same iteration the cancellation lands.
+        pool.take(REQUIREMENTS)
+        await asyncio.wait_for(pool.close(), timeout=1)
+
+@pytest.mark.asyncio
+async def test_voucher_validity_follows_the_route_timeout():
+    now = [NOW]
+    pool = new_pool(now, size=1)
+    await pool.refill()
+    first = pool.take(REQUIREMENTS)
+    assert int(first['payload']['authorization']['validBefore']) == NOW + 60
+    
+    long_route = dict(REQUIREMENTS, maxTimeoutSeconds=300)
+    pool.take(long_route)
+    await pool.refill()
+    tier = VoucherTier.from_requirement(long_route)
+    assert (pool.tier_validity(tier), pool.tier_min_remaining(tier)) == (300, 50)
+    
+    now[0] = NOW + 200
+    payment = pool.take(long_route)
+    assert int(payment['payload']['authorization']['validBefore']) == NOW + 300
+    assert verify_authorization(payment, long_route, now=now[0])['isValid'] is True
+
+def test_pool_does_not_keep_the_raw_key():
+    key = keccak256(b'cow')
+    pool = new_pool([NOW])
+    raw = [value for value in vars(pool).values() if isinstance(value, (bytes, str, int))]
+    assert key not in raw and key.hex() not in raw and int.from_bytes(key, 'big') not in raw
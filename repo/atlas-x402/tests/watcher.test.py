@@ -0,0 +1,166 @@
+import asyncio
+import pytest
+from aiohttp import web
+from atlas_x402.server.core.verification import verify_payment
+from atlas_x402.server.core.watcher import TRANSFER_TOPIC, PaymentIndex, TransferWatcher
+from atlas_x402.transport import HTTPTransport
+
+MERCHANT = '0x8bee703d6214a266e245b0537085b1021e1ccaed'
+PAYER = '0xcd2a3d9f938e13cd947ec05abc7fe734df8dd826'
+USDC = '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913'
+TX_HASH = '0x' + 'ab' * 32
+
+def transfer_log(tx_hash, value, to=MERCHANT):
+    return {
+        'address': USDC,
+        'topics': [TRANSFER_TOPIC, '0x' + PAYER[2:].rjust(64, '0'), '0x' + to[2:].rjust(64, '0')],
+        'data': hex(value),
+        'transactionHash': tx_hash,
+        'blockNumber': '0x64',
+        'logIndex': '0x0',
+    }
+
+async def start_stub_rpc(logs):
+    calls = []
+    
+    async def handle(request):
+        body = await request.json()
+        calls.append(body['method'])
+        if body['method'] == 'eth_blockNumber':
+            result = '0x64'
+        elif body['method'] == 'eth_getLogs':
+            result = logs
+        else:
+            result = None
+        return web.json_response({'jsonrpc': '2.0', 'id': body['id'], 'result': result})
+    
+    app = web.Application()
+    app.router.add_post('/', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://127.0.0.1:{port}/', calls
+
+@pytest.mark.asyncio
+async def test_poll_indexes_incoming_transfers():
+    runner, rpc_url, calls = await start_stub_rpc([transfer_log(TX_HASH, 50_000)])
+    async with HTTPTransport() as transport:
+        watcher = TransferWatcher([MERCHANT], rpc_url=rpc_url, transport=transport, confirmations=0)
+        assert await watcher.poll_once() == 1
+    await runner.cleanup()
+    
+    assert watcher.index.get(TX_HASH)[0].value == 50_000
+    assert watcher.next_block == 101
+
+@pytest.mark.asyncio
+async def test_verify_payment_uses_index_before_rpc():
+    runner, rpc_url, calls = await start_stub_rpc([])
+    index = PaymentIndex()
+    watcher = TransferWatcher([MERCHANT], index=index)
+    watcher.ingest(transfer_log(TX_HASH, 50_000))
+    requirements = {
+        'scheme': 'x402+eip712',
+        'network': 'base',
+        'maxAmountRequired': '50000',
+        'payTo': MERCHANT,
+        'asset': USDC,
+    }
+    
+    async with HTTPTransport() as transport:
+        result = await verify_payment(
+            {'payload': {'transactionHash': TX_HASH}},
+            requirements,
+            rpc_url=rpc_url,
+            transport=transport,
+            index=index
+        )
+        underpaid = await verify_payment(
+            {'payload': {'transactionHash': TX_HASH}},
+            dict(requirements, maxAmountRequired='60000'),
+            rpc_url=rpc_url,
+            transport=transport,
+            index=index
+        )
+    await runner.cleanup()
+    
+    assert result == {'isValid': True, 'payer': PAYER}
+    assert underpaid['isValid'] is False
+    assert calls == []
+
+def test_removed_logs_are_dropped():
+    watcher = TransferWatcher([MERCHANT])
+    watcher.ingest(transfer_log(TX_HASH, 50_000))
+    watcher.ingest(dict(transfer_log(TX_HASH, 50_000), removed=True))
+    assert watcher.index.get(TX_HASH) is None
+
+@pytest.mark.asyncio
+async def test_poll_waits_for_confirmations():
+    runner, rpc_url, calls = await start_stub_rpc([])
+    async with HTTPTransport() as transport:
+        watcher = TransferWatcher([MERCHANT], rpc_url=rpc_url, transport=transport, confirmations=5, lookback_blocks=10)
+        await watcher.poll_once()
+    await runner.cleanup()
+    
+    assert watcher.next_block == 0x64 - 5 + 1
+
+@pytest.mark.asyncio
+async def test_poll_errors_are_counted():
+    runner, rpc_url, _ = await start_stub_rpc([])
+    await runner.cleanup()
+    async with HTTPTransport() as transport:
+        watcher = TransferWatcher([MERCHANT], rpc_url=rpc_url, transport=transport, poll_interval=0.01)
+        await watcher.start()
+        for _ in range(100):
+            if watcher.errors >= 2:
+                break
+            await asyncio.sleep(0.01)
+        await watcher.close()
+    
+    assert watcher.errors >= 2 and watcher.mode == 'poll'
+    assert watcher.last_error is not None
+
+@pytest.mark.asyncio
+async def test_subscription_is_retried_after_a_failure():
+    runner, rpc_url, calls = await start_stub_rpc([])
+    subscribes = []
+    
+    async def handle_ws(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        message = await ws.receive_json()
+        subscribes.append(message['method'])
+        if len(subscribes) == 1:
+            await ws.send_json({'jsonrpc': '2.0', 'id': 1, 'error': {'code': -32000, 'message': 'unavailable'}})
+        else:
+            await ws.send_json({'jsonrpc': '2.0', 'id': 1, 'result': '0x1'})
+            await ws.send_json({'jsonrpc': '2.0', 'method': 'eth_subscription', 'params': {'result': transfer_log(TX_HASH, 50_000)}})
+            await ws.receive()
+        await ws.close()
+        return ws
+    
+    app = web.Application()
+    app.router.add_get('/ws', handle_ws)
+    ws_runner = web.AppRunner(app)
+    await ws_runner.setup()
+    await web.TCPSite(ws_runner, '127.0.0.1', 0).start()
+    ws_url = f'ws://127.0.0.1:{ws_runner.addresses[0][1]}/ws'
+    
+    async with HTTPTransport() as transport:
+        watcher = TransferWatcher(
+            [MERCHANT], rpc_url=rpc_url, ws_url=ws_url, transport=transport, poll_interval=0.01, resubscribe_backoff=0.05
+        )
+        await watcher.start()
+        for _ in range(200):
+            if watcher.index.get(TX_HASH):
+                break
+            await asyncio.sleep(0.01)
+        await watcher.close()
+    await ws_runner.cleanup()
+    await runner.cleanup()
+    
+    assert subscribes == ['eth_subscribe', 'eth_subscribe']
+    assert watcher.index.get(TX_HASH)[0].value == 50_000
+    assert watcher.mode == 'subscribe' and watcher.errors == 1
+    assert 'eth_getLogs' in calls
@@ -0,0 +1,128 @@
+from typing import Optional, Dict, Any
+from dataclasses import dataclass
+from contextlib import asynccontextmanager
+import asyncio
+import aiohttp
+
+@dataclass
+class TransportConfig:
+    limit: int = 100
+    limit_per_host: int = 20
+    keepalive_timeout: float = 30.0
+    ttl_dns_cache: int = 300
+    connect_timeout: float = 5.0
+    read_timeout: float = 15.0
+    total_timeout: float = 30.0
+    headers: Optional[Dict[str, str]] = None
+
+class HTTPTransport:
+    def __init__(self, config: Optional[TransportConfig] = None):
+        self.config = config or TransportConfig()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stale_sessions = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._session is not None and not self._session.closed:
+                self._discard(self._session, self._loop)
+            self._session = self._create_session()
+            self._loop = loop
+        return self._session
+
+    def _discard(self, session: aiohttp.ClientSession, loop: Optional[asyncio.AbstractEventLoop]):
+        # A session belongs to the loop that created it. Close it there if that loop is still running,
+        # otherwise release the connector directly so its sockets are not leaked.
+        self.stale_sessions += 1
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        connector = session.connector
+        session.detach()
+        if connector is not None:
+            try:
+                connector.close()
+            except RuntimeError:
+                pass
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.config.limit,
+            limit_per_host=self.config.limit_per_host,
+            ttl_dns_cache=self.config.ttl_dns_cache,
+            use_dns_cache=True,
+            keepalive_timeout=self.config.keepalive_timeout,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.config.total_timeout,
+            sock_connect=self.config.connect_timeout,
+            sock_read=self.config.read_timeout,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers=self.config.headers,
+        )
+
+    def request(self, method: str, url: str, **kwargs: Any):
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any):
+        return self.session.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any):
+        return self.session.post(url, **kwargs)
+
+    async def start(self):
+        self.session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    async def __aenter__(self) -> 'HTTPTransport':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def install(self, app):
+        router = getattr(app, 'router', app)
+        inner = router.lifespan_context
+        
+        @asynccontextmanager
+        async def lifespan(app):
+            async with self.lifespan(app):
+                async with inner(app) as state:
+                    yield state
+        
+        router.lifespan_context = lifespan
+
+    @asynccontextmanager
+    async def lifespan(self, app):
+        await self.start()
+        try:
+            yield
+        finally:
+            await self.close()
+
+_default_transport: Optional[HTTPTransport] = None
+
+def get_default_transport() -> HTTPTransport:
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = HTTPTransport()
+    return _default_transport
+
+def set_default_transport(transport: HTTPTransport):
+    global _default_transport
+    _default_transport = transport
+
+async def close_default_transport():
+    if _default_transport is not None:
+        await _default_transport.close()